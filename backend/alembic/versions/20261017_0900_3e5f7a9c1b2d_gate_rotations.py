@@ -0,0 +1,46 @@
+"""Add gate rotations for pre-generated QR windows.
+
+Revision ID: 3e5f7a9c1b2d
+Revises: 1c2d6b8f9a0e
+Create Date: 2026-10-17 09:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3e5f7a9c1b2d"
+down_revision = "1c2d6b8f9a0e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "gate_rotations",
+        sa.Column("id", sa.String(length=36), primary_key=True),
+        sa.Column("activity_id", sa.String(length=36), sa.ForeignKey("activity_cases.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("gate_id", sa.String(length=50), nullable=False),
+        sa.Column("code_type", sa.String(length=20), nullable=False),
+        sa.Column("window_seconds", sa.Integer(), nullable=False),
+        sa.Column("windows_ahead", sa.Integer(), nullable=False),
+        sa.Column("generated_until", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("created_by_id", sa.String(length=36), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.UniqueConstraint("activity_id", "gate_id", name="uq_gate_rotation_activity_gate"),
+    )
+    op.create_index("ix_gate_rotations_activity_id", "gate_rotations", ["activity_id"])
+    op.create_index("idx_gate_rotation_due", "gate_rotations", ["is_active", "generated_until"])
+
+    op.create_index("idx_qrcode_gate_window", "qr_codes", ["activity_id", "gate_id", "valid_from"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_qrcode_gate_window", table_name="qr_codes")
+
+    op.drop_index("idx_gate_rotation_due", table_name="gate_rotations")
+    op.drop_index("ix_gate_rotations_activity_id", table_name="gate_rotations")
+    op.drop_table("gate_rotations")
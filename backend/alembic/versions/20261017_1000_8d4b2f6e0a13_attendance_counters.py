@@ -0,0 +1,48 @@
+"""Add per-activity attendance counters.
+
+Revision ID: 8d4b2f6e0a13
+Revises: 3e5f7a9c1b2d
+Create Date: 2026-10-17 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "8d4b2f6e0a13"
+down_revision = "3e5f7a9c1b2d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "attendance_counters",
+        sa.Column("activity_id", sa.String(length=36), sa.ForeignKey("activity_cases.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("total", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("checked_in", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("checked_out", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("absent", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("reconciled_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+    # Backfill from the existing records.
+    op.execute(
+        """
+        INSERT INTO attendance_counters (activity_id, total, checked_in, checked_out, absent, reconciled_at)
+        SELECT activity_id,
+               count(*),
+               count(*) FILTER (WHERE status = 'CHECKED_IN'),
+               count(*) FILTER (WHERE status = 'CHECKED_OUT'),
+               count(*) FILTER (WHERE status = 'ABSENT'),
+               now()
+        FROM attendance_records
+        GROUP BY activity_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("attendance_counters")
@@ -0,0 +1,27 @@
+"""Index attendance records in registration order per activity.
+
+Revision ID: 5a9c3e7b1f24
+Revises: 8d4b2f6e0a13
+Create Date: 2026-10-17 11:00:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "5a9c3e7b1f24"
+down_revision = "8d4b2f6e0a13"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "idx_attendance_activity_registered",
+        "attendance_records",
+        ["activity_id", "registered_at", "id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_attendance_activity_registered", table_name="attendance_records")
@@ -0,0 +1,23 @@
+"""Index activity cases by (created_at, id) for keyset pagination.
+
+Revision ID: b7e1d4a2c968
+Revises: 5a9c3e7b1f24
+Create Date: 2026-10-17 12:00:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "b7e1d4a2c968"
+down_revision = "5a9c3e7b1f24"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("idx_activity_created_id", "activity_cases", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_activity_created_id", table_name="activity_cases")
@@ -0,0 +1,48 @@
+"""Full-text search for activities and trigram search for users.
+
+Adding the stored generated column rewrites activity_cases once, under an
+exclusive lock; run it in a maintenance window on large tables.
+
+Revision ID: c3f8a6d0e215
+Revises: b7e1d4a2c968
+Create Date: 2026-10-17 13:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "c3f8a6d0e215"
+down_revision = "b7e1d4a2c968"
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', title || ' ' || location), 'A') || "
+    "setweight(to_tsvector('simple', description), 'B')"
+)
+
+
+def upgrade() -> None:
+    op.add_column(
+        "activity_cases",
+        sa.Column("search_vector", postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR_SQL, persisted=True)),
+    )
+    op.create_index("idx_activity_search", "activity_cases", ["search_vector"], postgresql_using="gin")
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "idx_users_search_trgm",
+        "users",
+        ["username", "email", "full_name"],
+        postgresql_using="gin",
+        postgresql_ops={"username": "gin_trgm_ops", "email": "gin_trgm_ops", "full_name": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_users_search_trgm", table_name="users")
+    op.drop_index("idx_activity_search", table_name="activity_cases")
+    op.drop_column("activity_cases", "search_vector")
@@ -0,0 +1,35 @@
+"""Allocate activity case numbers from a sequence.
+
+Revision ID: e4a7c2b9d351
+Revises: c3f8a6d0e215
+Create Date: 2026-10-17 14:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e4a7c2b9d351"
+down_revision = "c3f8a6d0e215"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(sa.schema.CreateSequence(sa.Sequence("activity_case_number_seq")))
+    # Continue after the highest number handed out by the old COUNT-based allocator.
+    op.execute(
+        """
+        SELECT setval(
+            'activity_case_number_seq',
+            COALESCE(MAX(substring(case_number FROM '^C-([0-9]+)$')::bigint), 0) + 1,
+            false
+        )
+        FROM activity_cases
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(sa.schema.DropSequence(sa.Sequence("activity_case_number_seq")))
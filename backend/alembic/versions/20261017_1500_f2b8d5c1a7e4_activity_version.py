@@ -0,0 +1,28 @@
+"""Add a version column to activity cases for optimistic locking.
+
+Revision ID: f2b8d5c1a7e4
+Revises: e4a7c2b9d351
+Create Date: 2026-10-17 15:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f2b8d5c1a7e4"
+down_revision = "e4a7c2b9d351"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # A constant default, so PostgreSQL adds the column without rewriting the table.
+    op.add_column(
+        "activity_cases",
+        sa.Column("version", sa.Integer(), server_default="1", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("activity_cases", "version")
@@ -1,7 +1,7 @@
 """API dependencies for authentication and authorization."""
 
-from typing import Annotated, Callable
-from fastapi import Depends, HTTPException, status
+from typing import Annotated, Callable, Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -9,7 +9,10 @@ from sqlalchemy.orm import selectinload
 
 from app.core.database import get_db
 from app.core.security import decode_token
+from app.core.config import settings
 from app.models.user import User
+from app.services.principal_cache import Principal, principal_cache
+from app.services.resource_loader import LoadedResources
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/v1/auth/login")
@@ -18,8 +21,8 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/v1/auth/login")
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
     db: Annotated[AsyncSession, Depends(get_db)],
-) -> User:
-    """Validate JWT access token and return the current user."""
+) -> Principal:
+    """Validate JWT access token and return the current user's principal."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -34,6 +37,15 @@ async def get_current_user(
     if not user_id:
         raise credentials_exception
 
+    generation = None
+    if settings.PRINCIPAL_CACHE_ENABLED:
+        principal = principal_cache.get(user_id)
+        if principal is not None:
+            return principal
+        # Read before loading, so an invalidation committed while the User
+        # is being loaded keeps this principal out of the cache.
+        generation = principal_cache.generation(user_id)
+
     result = await db.execute(
         select(User)
         .options(selectinload(User.roles))
@@ -44,12 +56,15 @@ async def get_current_user(
     if not user:
         raise credentials_exception
 
-    return user
+    principal = Principal.from_user(user)
+    if settings.PRINCIPAL_CACHE_ENABLED:
+        principal_cache.set(principal, generation)
+    return principal
 
 
 async def get_current_active_user(
-    current_user: Annotated[User, Depends(get_current_user)],
-) -> User:
+    current_user: Annotated[Principal, Depends(get_current_user)],
+) -> Principal:
     """Ensure the current user is active."""
     if not current_user.is_active:
         raise HTTPException(
@@ -63,8 +78,8 @@ def require_roles(allowed_roles: list[str]) -> Callable:
     """Dependency factory for role-based access control."""
 
     async def role_checker(
-        current_user: Annotated[User, Depends(get_current_active_user)],
-    ) -> User:
+        current_user: Annotated[Principal, Depends(get_current_active_user)],
+    ) -> Principal:
         user_roles = [role.name for role in current_user.roles]
         if not any(role in allowed_roles for role in user_roles):
             raise HTTPException(
@@ -76,7 +91,13 @@ def require_roles(allowed_roles: list[str]) -> Callable:
     return role_checker
 
 
-CurrentUser = Annotated[User, Depends(get_current_user)]
-ActiveUser = Annotated[User, Depends(get_current_active_user)]
-AdminUser = Annotated[User, Depends(require_roles(["ADMIN"]))]
+def get_preloaded_resources(request: Request) -> Optional[LoadedResources]:
+    """Return the rows the PEP already loaded for this request, if any."""
+    return getattr(request.state, "loaded_resources", None)
+
+
+CurrentUser = Annotated[Principal, Depends(get_current_user)]
+ActiveUser = Annotated[Principal, Depends(get_current_active_user)]
+AdminUser = Annotated[Principal, Depends(require_roles(["ADMIN"]))]
 DbSession = Annotated[AsyncSession, Depends(get_db)]
+PreloadedResources = Annotated[Optional[LoadedResources], Depends(get_preloaded_resources)]
@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.api.deps import ActiveUser
 from app.services import activity_service
+from app.services.activity_transitions import ActivityConflict, InvalidTransition
 from app.models.activity import ActivityStatus
 from app.schemas.activity import (
     ActivityCaseCreate,
@@ -58,6 +59,7 @@ async def create_activity(
     description="Get paginated list of activities with filtering",
     responses={
         200: {"description": "Activities retrieved successfully"},
+        400: {"description": "Invalid cursor"},
     }
 )
 async def list_activities(
@@ -65,33 +67,47 @@ async def list_activities(
     db: AsyncSession = Depends(get_db),
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (takes precedence over page)"),
+    count_mode: str = Query(
+        "exact",
+        pattern="^(exact|estimated|cached)$",
+        description="How total is computed: exact, estimated (planner estimate) or cached (short-lived exact count)",
+    ),
     status: Optional[ActivityStatusEnum] = Query(None, description="Filter by status"),
     creator_id: Optional[str] = Query(None, description="Filter by creator"),
-    search: Optional[str] = Query(None, description="Search in title and description"),
+    search: Optional[str] = Query(None, description="Full-text search in title, location and description; words match as prefixes"),
 ):
     """
     List activities with pagination and filtering
 
-    - Supports filtering by status, creator, and search query
+    - Supports filtering by status, creator, and search query (ranked by relevance)
     - Returns paginated results with metadata
+    - Follow pagination.next_cursor for constant-time deep pages
     - Requires authentication
     """
-    activities, total = await activity_service.list_activities(
-        db=db,
-        page=page,
-        per_page=per_page,
-        status=ActivityStatus(status) if status else None,
-        creator_id=creator_id,
-        search=search,
-    )
+    try:
+        activities, total, next_cursor = await activity_service.list_activities(
+            db=db,
+            per_page=per_page,
+            page=page,
+            cursor=cursor,
+            status=ActivityStatus(status) if status else None,
+            creator_id=creator_id,
+            search=search,
+            count_mode=count_mode,
+        )
+    except ValueError as exc:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=400, detail=str(exc))
     total_pages = (total + per_page - 1) // per_page if total else 0
     pagination = {
         "page": page,
         "per_page": per_page,
         "total": total,
         "total_pages": total_pages,
-        "has_next": page < total_pages,
-        "has_prev": page > 1,
+        "has_next": next_cursor is not None,
+        "has_prev": page > 1 or cursor is not None,
+        "next_cursor": next_cursor,
     }
 
     return PaginatedResponse(
@@ -153,6 +169,7 @@ async def get_activity(
         200: {"description": "Activity updated successfully"},
         403: {"description": "Cannot modify activity in current status"},
         404: {"description": "Activity not found"},
+        409: {"description": "Activity was changed concurrently"},
     }
 )
 async def update_activity(
@@ -176,6 +193,9 @@ async def update_activity(
     except PermissionError as exc:
         from fastapi import HTTPException
         raise HTTPException(status_code=403, detail=str(exc))
+    except ActivityConflict as exc:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=409, detail=str(exc))
 
     return SuccessResponse(data=ActivityCaseResponse.model_validate(activity))
 
@@ -189,6 +209,7 @@ async def update_activity(
         200: {"description": "Activity deleted successfully"},
         403: {"description": "Cannot delete activity in current status"},
         404: {"description": "Activity not found"},
+        409: {"description": "Activity was changed concurrently"},
     }
 )
 async def delete_activity(
@@ -205,12 +226,18 @@ async def delete_activity(
     """
     try:
         activity = await activity_service.delete_activity(db, activity_id, current_user)
+    except InvalidTransition as exc:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=403, detail=str(exc))
     except ValueError as exc:
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail=str(exc))
     except PermissionError as exc:
         from fastapi import HTTPException
         raise HTTPException(status_code=403, detail=str(exc))
+    except ActivityConflict as exc:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=409, detail=str(exc))
 
     return SuccessResponse(data={"id": activity.id, "status": activity.status})
 
@@ -224,6 +251,7 @@ async def delete_activity(
         200: {"description": "Activity approved successfully"},
         403: {"description": "Cannot approve own activity (SoD violation)"},
         404: {"description": "Activity not found"},
+        409: {"description": "Activity was changed concurrently"},
     }
 )
 async def approve_activity(
@@ -245,7 +273,6 @@ async def approve_activity(
         approver_id=current_user.id,
         comment=approval_data.comment,
     )
-    activity = await activity_service.get_activity(db, activity.id)
     return SuccessResponse(data=ActivityCaseResponse.model_validate(activity))
 
 
@@ -258,6 +285,7 @@ async def approve_activity(
         200: {"description": "Activity rejected successfully"},
         403: {"description": "Cannot reject own activity"},
         404: {"description": "Activity not found"},
+        409: {"description": "Activity was changed concurrently"},
     }
 )
 async def reject_activity(
@@ -279,7 +307,6 @@ async def reject_activity(
         rejector_id=current_user.id,
         reason=rejection_data.reason,
     )
-    activity = await activity_service.get_activity(db, activity.id)
     return SuccessResponse(data=ActivityCaseResponse.model_validate(activity))
 
 
@@ -292,6 +319,7 @@ async def reject_activity(
         200: {"description": "Activity submitted successfully"},
         400: {"description": "Activity not in DRAFT status"},
         404: {"description": "Activity not found"},
+        409: {"description": "Activity was changed concurrently"},
     }
 )
 async def submit_activity(
@@ -314,6 +342,9 @@ async def submit_activity(
     except PermissionError as exc:
         from fastapi import HTTPException
         raise HTTPException(status_code=403, detail=str(exc))
+    except ActivityConflict as exc:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=409, detail=str(exc))
 
     return SuccessResponse(data=ActivityCaseResponse.model_validate(activity))
 
@@ -328,6 +359,7 @@ async def submit_activity(
         400: {"description": "Activity not in APPROVED status"},
         403: {"description": "Not authorized to start this activity"},
         404: {"description": "Activity not found"},
+        409: {"description": "Activity was changed concurrently"},
     }
 )
 async def start_activity(
@@ -349,6 +381,9 @@ async def start_activity(
     except PermissionError as exc:
         from fastapi import HTTPException
         raise HTTPException(status_code=403, detail=str(exc))
+    except ActivityConflict as exc:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=409, detail=str(exc))
 
     return SuccessResponse(data=ActivityCaseResponse.model_validate(activity))
 
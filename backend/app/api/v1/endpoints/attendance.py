@@ -1,17 +1,40 @@
-from fastapi import APIRouter, Depends, Path, status
+import asyncio
+import csv
+import io
+import json
+from typing import AsyncIterator, Optional, Sequence
+import zlib
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
 from app.core.database import get_db
-from app.api.deps import ActiveUser
+from app.api.deps import ActiveUser, PreloadedResources
 from app.services import attendance_service
+from app.services.attendance_stream import Subscription, attendance_broker
+from app.services.gate_sync_service import (
+    SYNC_CHECKED_IN,
+    SYNC_DUPLICATE,
+    SYNC_REJECTED,
+    ScanEvent,
+    gate_sync_key,
+)
 from app.schemas.attendance import (
     AttendanceRecordCreate,
     AttendanceRecordResponse,
     AttendanceCheckIn,
     QRCodeCreate,
     QRCodeResponse,
+    GateRotationCreate,
+    GateRotationResponse,
+    GateSyncRequest,
+    GateSyncItemResult,
+    GateSyncResponse,
     AttendanceStatsResponse,
 )
-from app.schemas.common import SuccessResponse
+from app.schemas.common import CursorPaginatedResponse, SuccessResponse
 
 router = APIRouter()
 
@@ -31,6 +54,7 @@ router = APIRouter()
 async def register_for_activity(
     registration_data: AttendanceRecordCreate,
     current_user: ActiveUser,
+    preloaded: PreloadedResources,
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -45,6 +69,7 @@ async def register_for_activity(
         activity_id=registration_data.activity_id,
         user=current_user,
         notes=registration_data.notes,
+        preloaded=preloaded,
     )
     return SuccessResponse(data=AttendanceRecordResponse.model_validate(record))
 
@@ -58,11 +83,13 @@ async def register_for_activity(
         200: {"description": "Check-in successful"},
         400: {"description": "Invalid QR code or not registered"},
         404: {"description": "Activity or attendance record not found"},
+        409: {"description": "Already checked in, or checked in by a concurrent scan"},
     }
 )
 async def check_in(
     check_in_data: AttendanceCheckIn,
     current_user: ActiveUser,
+    preloaded: PreloadedResources,
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -77,6 +104,7 @@ async def check_in(
         user=current_user,
         qr_code=check_in_data.qr_code,
         notes=check_in_data.notes,
+        preloaded=preloaded,
     )
     return SuccessResponse(data=AttendanceRecordResponse.model_validate(record))
 
@@ -90,11 +118,13 @@ async def check_in(
         200: {"description": "Check-out successful"},
         400: {"description": "Invalid QR code or not checked in"},
         404: {"description": "Activity or attendance record not found"},
+        409: {"description": "Checked out by a concurrent scan"},
     }
 )
 async def check_out(
     check_out_data: AttendanceCheckIn,
     current_user: ActiveUser,
+    preloaded: PreloadedResources,
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -109,33 +139,105 @@ async def check_out(
         user=current_user,
         qr_code=check_out_data.qr_code,
         notes=check_out_data.notes,
+        preloaded=preloaded,
     )
     return SuccessResponse(data=AttendanceRecordResponse.model_validate(record))
 
 
 @router.get(
     "/activity/{activity_id}",
-    response_model=SuccessResponse[list[AttendanceRecordResponse]],
+    response_model=CursorPaginatedResponse[AttendanceRecordResponse],
     summary="Get activity attendance records",
-    description="Get all attendance records for an activity",
+    description="Get a page of attendance records for an activity",
     responses={
         200: {"description": "Attendance records retrieved successfully"},
+        400: {"description": "Invalid cursor"},
         404: {"description": "Activity not found"},
     }
 )
 async def get_activity_attendance(
     current_user: ActiveUser,
+    preloaded: PreloadedResources,
     db: AsyncSession = Depends(get_db),
     activity_id: str = Path(..., description="Activity ID"),
+    limit: int = Query(100, ge=1, le=1000, description="Records per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
 ):
     """
     Get attendance records for activity
 
-    Returns all attendance records for the specified activity
+    Returns records in registration order, one page at a time; pass
+    next_cursor back as cursor to get the next page
     Requires ADMIN role or activity creator
     """
-    records = await attendance_service.get_attendance_records(db, activity_id)
-    return SuccessResponse(data=[AttendanceRecordResponse.model_validate(item) for item in records])
+    records, next_cursor = await attendance_service.get_attendance_records(
+        db, activity_id, limit=limit, cursor=cursor, preloaded=preloaded
+    )
+    return CursorPaginatedResponse(
+        data=[AttendanceRecordResponse.model_validate(item) for item in records],
+        next_cursor=next_cursor,
+    )
+
+
+EXPORT_FIELDS = list(AttendanceRecordResponse.model_fields)
+
+
+async def _ndjson_rows(batches: AsyncIterator[Sequence]) -> AsyncIterator[str]:
+    async for batch in batches:
+        yield "".join(AttendanceRecordResponse.model_validate(record).model_dump_json() + "\n" for record in batch)
+
+
+async def _csv_rows(batches: AsyncIterator[Sequence]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    async for batch in batches:
+        writer.writerows(
+            AttendanceRecordResponse.model_validate(record).model_dump(mode="json") for record in batch
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+@router.get(
+    "/activity/{activity_id}/export",
+    summary="Export activity attendance records",
+    description="Stream every attendance record of an activity as NDJSON or CSV",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Records in registration order",
+            "content": {"application/x-ndjson": {}, "text/csv": {}},
+        },
+        404: {"description": "Activity not found"},
+    }
+)
+async def export_activity_attendance(
+    current_user: ActiveUser,
+    preloaded: PreloadedResources,
+    db: AsyncSession = Depends(get_db),
+    activity_id: str = Path(..., description="Activity ID"),
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+):
+    """
+    Export attendance records
+
+    Rows are read through a server-side cursor and written as they
+    arrive, so memory use does not grow with the number of records
+    """
+    batches = await attendance_service.export_attendance_records(db, activity_id, preloaded)
+    if export_format == "csv":
+        body, media_type = _csv_rows(batches), "text/csv"
+    else:
+        body, media_type = _ndjson_rows(batches), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="attendance-{activity_id}.{export_format}"'},
+    )
 
 
 @router.get(
@@ -150,6 +252,7 @@ async def get_activity_attendance(
 )
 async def get_attendance_stats(
     current_user: ActiveUser,
+    preloaded: PreloadedResources,
     db: AsyncSession = Depends(get_db),
     activity_id: str = Path(..., description="Activity ID"),
 ):
@@ -163,10 +266,61 @@ async def get_attendance_stats(
     - Absent count
     - Attendance rate
     """
-    stats = await attendance_service.get_attendance_stats(db, activity_id)
+    stats = await attendance_service.get_attendance_stats(db, activity_id, preloaded)
     return SuccessResponse(data=AttendanceStatsResponse(**stats))
 
 
+async def _server_sent_events(subscription: Subscription) -> AsyncIterator[str]:
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(
+                    subscription.get(), timeout=settings.ATTENDANCE_STREAM_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if item is None:
+                return
+            event_name, data = item
+            yield f"event: {event_name}\ndata: {json.dumps(data)}\n\n"
+    finally:
+        await attendance_broker.unsubscribe(subscription)
+
+
+@router.get(
+    "/activity/{activity_id}/stream",
+    summary="Stream live attendance",
+    description="Server-sent events with attendance deltas and periodic statistics snapshots",
+    response_class=StreamingResponse,
+    responses={
+        200: {"description": "text/event-stream of snapshot and delta events", "content": {"text/event-stream": {}}},
+        404: {"description": "Activity not found"},
+    }
+)
+async def stream_attendance(
+    current_user: ActiveUser,
+    preloaded: PreloadedResources,
+    db: AsyncSession = Depends(get_db),
+    activity_id: str = Path(..., description="Activity ID"),
+):
+    """
+    Stream live attendance
+
+    Access is checked once, when the stream is opened. Events:
+    - snapshot: the same statistics as /stats, sent on connect and every
+      ATTENDANCE_STREAM_SNAPSHOT_SECONDS
+    - delta: changes to total_registered (as total), checked_in,
+      checked_out and absent committed since, to add to the last snapshot
+    """
+    subscription = await attendance_service.subscribe_attendance(db, activity_id, preloaded)
+    return StreamingResponse(
+        _server_sent_events(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post(
     "/qr-code",
     response_model=SuccessResponse[QRCodeResponse],
@@ -181,6 +335,7 @@ async def get_attendance_stats(
 async def generate_qr_code(
     current_user: ActiveUser,
     qr_data: QRCodeCreate,
+    preloaded: PreloadedResources,
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -197,10 +352,224 @@ async def generate_qr_code(
         code_type=qr_data.code_type,
         max_uses=qr_data.max_uses,
         gate_id=qr_data.gate_id,
+        preloaded=preloaded,
     )
     return SuccessResponse(data=QRCodeResponse.model_validate(qr))
 
 
+@router.post(
+    "/gates",
+    response_model=SuccessResponse[GateRotationResponse],
+    status_code=status.HTTP_201_CREATED,
+    summary="Register gate",
+    description="Register a gate whose QR codes rotate automatically",
+    responses={
+        201: {"description": "Gate registered and first windows generated"},
+        400: {"description": "Activity is not in progress"},
+        403: {"description": "Not authorized to manage gates"},
+        409: {"description": "Gate is already registered"},
+    }
+)
+async def register_gate(
+    current_user: ActiveUser,
+    gate_data: GateRotationCreate,
+    preloaded: PreloadedResources,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Register a rotating gate
+
+    - Only activity creator or ADMIN can register gates
+    - Activity must be IN_PROGRESS
+    - The next windows_ahead QR codes are generated up front and kept
+      topped up by a background job until the gate is closed
+    - The response carries the gate's sync_key for signing offline scans
+    """
+    rotation = await attendance_service.register_gate(
+        db=db,
+        activity_id=gate_data.activity_id,
+        gate_id=gate_data.gate_id,
+        user=current_user,
+        code_type=gate_data.code_type,
+        window_seconds=gate_data.window_seconds,
+        windows_ahead=gate_data.windows_ahead,
+        preloaded=preloaded,
+    )
+    data = GateRotationResponse.model_validate(rotation)
+    data.sync_key = gate_sync_key(rotation.activity_id, rotation.gate_id)
+    return SuccessResponse(data=data)
+
+
+@router.get(
+    "/gates/{activity_id}/{gate_id}/current",
+    response_model=SuccessResponse[QRCodeResponse],
+    summary="Get current gate QR code",
+    description="Get the QR code a gate display should show right now",
+    responses={
+        200: {"description": "Current QR code"},
+        404: {"description": "No current QR code for this gate"},
+    }
+)
+async def get_current_gate_code(
+    current_user: ActiveUser,
+    db: AsyncSession = Depends(get_db),
+    activity_id: str = Path(..., description="Activity ID"),
+    gate_id: str = Path(..., description="Gate ID"),
+):
+    """
+    Get current gate QR code
+
+    Read-only lookup of the pre-generated window covering the current time
+    """
+    qr = await attendance_service.get_current_gate_code(db, activity_id, gate_id)
+    return SuccessResponse(data=QRCodeResponse.model_validate(qr))
+
+
+@router.delete(
+    "/gates/{activity_id}/{gate_id}",
+    response_model=SuccessResponse[GateRotationResponse],
+    summary="Close gate",
+    description="Stop rotating a gate and revoke its unexpired QR codes",
+    responses={
+        200: {"description": "Gate closed"},
+        403: {"description": "Not authorized to manage gates"},
+        404: {"description": "Gate is not registered"},
+    }
+)
+async def close_gate(
+    current_user: ActiveUser,
+    preloaded: PreloadedResources,
+    db: AsyncSession = Depends(get_db),
+    activity_id: str = Path(..., description="Activity ID"),
+    gate_id: str = Path(..., description="Gate ID"),
+):
+    """
+    Close a rotating gate
+
+    - Only activity creator or ADMIN can close gates
+    - The current and all pre-generated codes of the gate stop working
+    """
+    rotation = await attendance_service.close_gate(db, activity_id, gate_id, current_user, preloaded)
+    return SuccessResponse(data=GateRotationResponse.model_validate(rotation))
+
+
+async def _read_sync_body(request: Request) -> bytes:
+    """Request body, gunzipped if needed, capped at GATE_SYNC_MAX_BODY_BYTES.
+
+    The body is read as it arrives and rejected as soon as either the bytes
+    received or the bytes they decompress to exceed the limit, so an
+    oversized upload is never buffered whole.
+    """
+    limit = settings.GATE_SYNC_MAX_BODY_BYTES
+    too_large = HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Upload is too large")
+    invalid_gzip = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid gzip body")
+    encoding = request.headers.get("content-encoding", "identity").strip().lower()
+    if encoding not in ("identity", "gzip"):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Unsupported Content-Encoding"
+        )
+    content_length = request.headers.get("content-length", "")
+    # gzip only grows data it cannot compress, and then by a few bytes, so
+    # the bytes received are capped by the same limit for both encodings.
+    if content_length.isdigit() and int(content_length) > limit:
+        raise too_large
+
+    decompressor = zlib.decompressobj(wbits=31) if encoding == "gzip" else None
+    chunks: list[bytes] = []
+    received = size = 0
+    async for chunk in request.stream():
+        if not chunk:
+            continue
+        received += len(chunk)
+        if received > limit:
+            raise too_large
+        if decompressor is not None:
+            if decompressor.eof:
+                # Data after the end of the gzip member.
+                raise invalid_gzip
+            try:
+                # One byte over the remaining budget is enough to tell the
+                # body is too large.
+                chunk = decompressor.decompress(chunk, limit - size + 1)
+            except zlib.error as exc:
+                raise invalid_gzip from exc
+        size += len(chunk)
+        if size > limit:
+            raise too_large
+        chunks.append(chunk)
+
+    if decompressor is not None and (not decompressor.eof or decompressor.unused_data):
+        raise invalid_gzip
+    return b"".join(chunks)
+
+
+@router.post(
+    "/activity/{activity_id}/sync",
+    response_model=SuccessResponse[GateSyncResponse],
+    summary="Sync offline gate scans",
+    description="Upload scans a gate device recorded while offline",
+    responses={
+        200: {"description": "Per-scan results"},
+        400: {"description": "Activity has not started or the body is not valid gzip"},
+        403: {"description": "Not authorized to sync gate scans"},
+        413: {"description": "Too many events or body too large"},
+    },
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "description": "GateSyncRequest as JSON, optionally sent with Content-Encoding: gzip",
+            "content": {"application/json": {"schema": {"type": "object"}}},
+        }
+    },
+)
+async def sync_gate_scans(
+    request: Request,
+    current_user: ActiveUser,
+    preloaded: PreloadedResources,
+    db: AsyncSession = Depends(get_db),
+    activity_id: str = Path(..., description="Activity ID"),
+):
+    """
+    Sync offline gate scans
+
+    - Only activity creator or ADMIN can sync
+    - Each scan must carry the HMAC of its gate's sync_key (returned when the
+      gate is registered) and a QR code that was valid at scanned_at
+    - All scans are applied in one transaction; replaying an upload is safe,
+      scans that are already applied come back as DUPLICATE
+    """
+    try:
+        sync_data = GateSyncRequest.model_validate_json(await _read_sync_body(request))
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors()) from exc
+    if len(sync_data.events) > settings.GATE_SYNC_MAX_EVENTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.GATE_SYNC_MAX_EVENTS} events per upload",
+        )
+
+    results = await attendance_service.sync_gate_scans(
+        db=db,
+        activity_id=activity_id,
+        user=current_user,
+        events=[ScanEvent(**event.model_dump()) for event in sync_data.events],
+        preloaded=preloaded,
+    )
+    counts = {SYNC_CHECKED_IN: 0, SYNC_DUPLICATE: 0, SYNC_REJECTED: 0}
+    for result in results:
+        counts[result.status] += 1
+    return SuccessResponse(
+        data=GateSyncResponse(
+            activity_id=activity_id,
+            total=len(results),
+            checked_in=counts[SYNC_CHECKED_IN],
+            duplicates=counts[SYNC_DUPLICATE],
+            rejected=counts[SYNC_REJECTED],
+            items=[GateSyncItemResult.model_validate(result) for result in results],
+        )
+    )
+
+
 @router.get(
     "/qr-code/{qr_code}",
     response_model=SuccessResponse[QRCodeResponse],
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
-from sqlalchemy import func, select
+from sqlalchemy import case, func, select
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
@@ -54,20 +54,28 @@ async def update_current_user(
 
     Users can update their own profile information (name, phone, department, image)
     """
+    result = await db.execute(
+        select(User)
+        .options(selectinload(User.roles))
+        .where(User.id == current_user.id)
+    )
+    user = result.scalar_one()
+
     if user_data.full_name is not None:
-        current_user.full_name = user_data.full_name
+        user.full_name = user_data.full_name
     if user_data.phone is not None:
-        current_user.phone = user_data.phone
+        user.phone = user_data.phone
     if user_data.department is not None:
-        current_user.department = user_data.department
+        user.department = user_data.department
     if user_data.profile_image_url is not None:
-        current_user.profile_image_url = user_data.profile_image_url
+        user.profile_image_url = user_data.profile_image_url
 
+    # The cached principal is invalidated when this transaction commits.
     await db.flush()
-    await db.refresh(current_user)
+    await db.refresh(user)
 
     return SuccessResponse(
-        data=UserResponse.model_validate(current_user),
+        data=UserResponse.model_validate(user),
         message="Profile updated",
     )
 
@@ -98,12 +106,24 @@ async def list_users(
     query = select(User).options(selectinload(User.roles))
 
     if search:
+        # Served by the idx_users_search_trgm trigram index
         pattern = f"%{search}%"
         query = query.where(
             (User.username.ilike(pattern))
             | (User.email.ilike(pattern))
             | (User.full_name.ilike(pattern))
         )
+        # Prefix matches first, for type-ahead
+        prefix = f"{search}%"
+        query = query.order_by(
+            case(
+                (User.username.ilike(prefix), 0),
+                (User.full_name.ilike(prefix), 1),
+                (User.email.ilike(prefix), 2),
+                else_=3,
+            ),
+            User.username,
+        )
 
     if role:
         query = query.join(User.roles).where(Role.name == role)
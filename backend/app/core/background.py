@@ -0,0 +1,66 @@
+"""In-process periodic background jobs."""
+
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+
+class PeriodicJob:
+    """Run ``func`` every ``interval_seconds`` until stopped.
+
+    Each run is awaited before the next interval starts, so runs of the
+    same job never overlap. A failing run is logged and retried on the
+    next tick. Jobs that must not run concurrently across workers are
+    expected to coordinate through the database (e.g. row locks).
+    """
+
+    def __init__(self, name: str, interval_seconds: float, func: Callable[[], Awaitable[object]]) -> None:
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self.runs = 0
+        self.failures = 0
+        self.last_result: object = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._loop(), name=f"periodic-job:{self.name}")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def run_once(self) -> object:
+        try:
+            self.last_result = await self.func()
+        except Exception as exc:
+            self.failures += 1
+            print(f"Background job '{self.name}' failed: {exc}")
+            return None
+        finally:
+            self.runs += 1
+        return self.last_result
+
+    async def _loop(self) -> None:
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval_seconds,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_result": self.last_result,
+        }
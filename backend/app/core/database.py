@@ -1,15 +1,96 @@
-from typing import AsyncGenerator
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+import time
+from typing import AsyncGenerator, AsyncIterator, Optional
+from sqlalchemy import event, exc, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 from .config import settings
 
+
+@dataclass
+class PoolMetrics:
+    """Checkout counters for the engine's connection pool."""
+    checkouts: int = 0
+    connections_opened: int = 0
+    timeouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        if seconds > self.wait_seconds_max:
+            self.wait_seconds_max = seconds
+
+    def snapshot(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "connections_opened": self.connections_opened,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": round(self.wait_seconds_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waits for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            pool_metrics.record_wait(time.perf_counter() - started)
+
+
+POOL_MODES = ("queue", "null")
+
+
+def _engine_options() -> dict:
+    if settings.DB_POOL_MODE not in POOL_MODES:
+        raise ValueError(
+            f"Unknown DB_POOL_MODE '{settings.DB_POOL_MODE}', expected one of: {', '.join(POOL_MODES)}"
+        )
+
+    options = {
+        "echo": settings.DB_ECHO,
+        "future": True,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_POOL_MODE == "null":
+        # Behind pgbouncer the bouncer owns pooling; open a connection per checkout.
+        options["poolclass"] = NullPool
+    else:
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        )
+
+    if settings.DATABASE_URL.startswith("postgresql+asyncpg"):
+        options["connect_args"] = {"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    return options
+
+
 # Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DB_ECHO,
-    poolclass=NullPool,  # Use NullPool for development, configure for production
-    future=True,
-)
+engine = create_async_engine(settings.DATABASE_URL, **_engine_options())
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _count_connection(dbapi_connection, connection_record) -> None:
+    pool_metrics.connections_opened += 1
+
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -21,14 +102,151 @@ AsyncSessionLocal = async_sessionmaker(
 )
 
 
+@dataclass
+class SessionMetrics:
+    """Connections and statements used per request scope."""
+    requests: int = 0
+    requests_with_db: int = 0
+    connections: int = 0
+    max_connections: int = 0
+    statements: int = 0
+    max_statements: int = 0
+
+    def record(self, connections: int, statements: int = 0) -> None:
+        self.requests += 1
+        if connections:
+            self.requests_with_db += 1
+            self.connections += connections
+            self.max_connections = max(self.max_connections, connections)
+        self.statements += statements
+        self.max_statements = max(self.max_statements, statements)
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "requests_with_db": self.requests_with_db,
+            "connections_per_request": (
+                round(self.connections / self.requests_with_db, 3) if self.requests_with_db else 0.0
+            ),
+            "max_connections_per_request": self.max_connections,
+            # Total is exact, so sequential requests can be diffed to count
+            # the statements (round trips) of each.
+            "statements": self.statements,
+            "statements_per_request": (
+                round(self.statements / self.requests_with_db, 3) if self.requests_with_db else 0.0
+            ),
+            "max_statements_per_request": self.max_statements,
+        }
+
+
+session_metrics = SessionMetrics()
+
+
+class RequestSessionScope:
+    """One lazily-opened session shared by everything that handles a request."""
+
+    __slots__ = ("session", "connections", "statements")
+
+    def __init__(self) -> None:
+        self.session: Optional[AsyncSession] = None
+        self.connections = 0
+        self.statements = 0
+
+    def get_session(self) -> AsyncSession:
+        if self.session is None:
+            self.session = AsyncSessionLocal()
+        return self.session
+
+    async def close(self) -> None:
+        if self.session is not None:
+            session, self.session = self.session, None
+            await session.close()
+
+
+_request_scope: ContextVar[Optional[RequestSessionScope]] = ContextVar(
+    "request_session_scope", default=None
+)
+
+
+@event.listens_for(Session, "after_begin")
+def _count_request_connection(session, transaction, connection) -> None:
+    scope = _request_scope.get()
+    if scope is not None:
+        scope.connections += 1
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count_request_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    scope = _request_scope.get()
+    if scope is not None:
+        scope.statements += 1
+
+
+@asynccontextmanager
+async def request_session_scope() -> AsyncIterator[RequestSessionScope]:
+    """Share one session between the PEP, ``get_db`` and the endpoint."""
+    scope = RequestSessionScope()
+    token = _request_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _request_scope.reset(token)
+        await scope.close()
+        session_metrics.record(scope.connections, scope.statements)
+
+
+def get_request_session() -> Optional[AsyncSession]:
+    """Session of the current request scope, or None outside of one."""
+    scope = _request_scope.get()
+    return scope.get_session() if scope is not None else None
+
+
+async def warm_up_pool(count: int | None = None) -> int:
+    """Open ``count`` pooled connections up front so first requests skip the connect."""
+    if settings.DB_POOL_MODE == "null":
+        return 0
+    count = min(settings.DB_POOL_WARMUP if count is None else count, settings.DB_POOL_SIZE)
+
+    connections = []
+    try:
+        for _ in range(count):
+            connection = await engine.connect()
+            connections.append(connection)
+            await connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            await connection.close()
+    return len(connections)
+
+
+def pool_status() -> dict:
+    """Current pool occupancy plus checkout counters."""
+    pool = engine.pool
+    status = {"mode": settings.DB_POOL_MODE, **pool_metrics.snapshot()}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+        )
+    return status
+
+
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    """Dependency for getting async database session"""
-    async with AsyncSessionLocal() as session:
-        try:
-            yield session
-            await session.commit()
-        except Exception:
-            await session.rollback()
-            raise
-        finally:
+    """Dependency for getting async database session
+
+    Inside a request scope this is the request's shared session; it is
+    committed here once and closed when the scope ends.
+    """
+    scope = _request_scope.get()
+    session = scope.get_session() if scope is not None else AsyncSessionLocal()
+    try:
+        yield session
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        if scope is None:
             await session.close()
@@ -0,0 +1,99 @@
+"""Opaque cursors for keyset pagination."""
+
+import base64
+import binascii
+from datetime import datetime
+import json
+from typing import Any, Callable, Optional, Sequence, TypeVar
+from sqlalchemy import ColumnElement, Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+T = TypeVar("T")
+
+# How a paginated listing computes its total:
+# - exact: COUNT(*) of the filtered query
+# - estimated: the planner's row estimate for it (no rows are read)
+# - cached: an exact count reused for a short TTL
+COUNT_MODES = ("exact", "estimated", "cached")
+
+
+class InvalidCursor(ValueError):
+    """Cursor is malformed or does not match the listing's sort key."""
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode a row's sort key values (str, int or datetime) as a URL-safe cursor."""
+    data = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> tuple:
+    """Sort key values encoded in ``cursor``, checked against ``types``."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursor("Malformed cursor") from exc
+    if not isinstance(data, list) or len(data) != len(types):
+        raise InvalidCursor("Cursor does not match this listing")
+
+    values = []
+    for value, type_ in zip(data, types):
+        if type_ is datetime and isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError as exc:
+                raise InvalidCursor("Malformed cursor") from exc
+        if not isinstance(value, type_) or isinstance(value, bool):
+            raise InvalidCursor("Cursor does not match this listing")
+        values.append(value)
+    return tuple(values)
+
+
+def after_cursor(
+    columns: Sequence[ColumnElement],
+    values: Sequence[Any],
+    descending: bool = False,
+) -> ColumnElement[bool]:
+    """Rows strictly after ``values`` in ``ORDER BY columns`` (all ASC or all DESC).
+
+    A row-value comparison, so PostgreSQL can seek on a composite index
+    over the same columns instead of skipping rows like OFFSET does.
+    """
+    key, position = tuple_(*columns), tuple_(*values)
+    return key < position if descending else key > position
+
+
+def cursor_page(
+    rows: Sequence[T],
+    limit: int,
+    sort_key: Callable[[T], Sequence[Any]],
+) -> tuple[list[T], Optional[str]]:
+    """Split ``limit + 1`` fetched rows into the page and the next page's cursor."""
+    page = list(rows[:limit])
+    if len(rows) <= limit or not page:
+        return page, None
+    return page, encode_cursor(sort_key(page[-1]))
+
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Select) -> None:
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element: _Explain, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def estimate_row_count(db: AsyncSession, query: Select) -> int:
+    """Planner's estimate of the rows ``query`` returns, from EXPLAIN."""
+    plan = (await db.execute(_Explain(query))).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return max(int(plan[0]["Plan"]["Plan Rows"]), 0)
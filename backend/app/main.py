@@ -2,9 +2,22 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.core.config import settings
+from app.core.database import engine, pool_status, session_metrics, warm_up_pool
 from app.api.v1 import api_router
+from app.middleware.db_session import RequestSessionMiddleware
 from app.middleware.pep import PEPMiddleware
 from app.schemas.common import HealthCheckResponse
+from app.services.activity_transitions import activity_autocomplete_job
+from app.services.attendance_counters import counter_reconcile_job
+from app.services.attendance_stream import attendance_broker
+from app.services.checkin_batcher import checkin_batcher
+from app.services.count_cache import activity_count_cache
+from app.services.decision_cache import decision_cache
+from app.services.gate_rotation_service import gate_rotation_job
+from app.services.opa_client import opa_client
+from app.services.principal_cache import principal_cache
+from app.services.qr_payload_cache import qr_payload_cache
+from app.services.session_registry import session_registry
 from datetime import datetime
 
 # Create FastAPI application
@@ -56,8 +69,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Policy enforcement middleware
-app.add_middleware(PEPMiddleware)
+# Policy enforcement middleware. ``app.routes`` is read when the middleware
+# stack is built on startup, after every router below has been included.
+app.add_middleware(PEPMiddleware, routes=app.routes)
+
+# Request-scoped DB session shared by the PEP and endpoint dependencies.
+# Added last so it wraps the PEP.
+app.add_middleware(RequestSessionMiddleware)
 
 
 # Health check endpoint
@@ -82,6 +100,37 @@ async def health_check():
     )
 
 
+# Runtime metrics endpoint
+@app.get(
+    "/metrics",
+    tags=["Health"],
+    summary="Runtime metrics",
+    description="Connection and cache counters for internal monitoring (ADMIN only)",
+)
+async def runtime_metrics():
+    """
+    Runtime metrics endpoint
+
+    Returns in-process counters for the policy engine and other pooled resources.
+    Requires the ADMIN role ('system:metrics').
+    """
+    return {
+        "policy_engine": opa_client.snapshot(),
+        "policy_cache": decision_cache.stats(),
+        "db_pool": pool_status(),
+        "db_sessions": session_metrics.snapshot(),
+        "principal_cache": principal_cache.stats(),
+        "activity_count_cache": activity_count_cache.stats(),
+        "checkin_batcher": checkin_batcher.stats(),
+        "session_registry": session_registry.stats(),
+        "qr_payload_cache": qr_payload_cache.stats(),
+        "gate_rotation_job": gate_rotation_job.stats(),
+        "counter_reconcile_job": counter_reconcile_job.stats(),
+        "activity_autocomplete_job": activity_autocomplete_job.stats(),
+        "attendance_stream": attendance_broker.stats(),
+    }
+
+
 # Include API v1 router
 app.include_router(
     api_router,
@@ -113,6 +162,15 @@ async def startup_event():
     print(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
     print(f"Documentation available at: /docs")
     print(f"OpenAPI schema available at: /openapi.json")
+    await opa_client.start()
+    try:
+        warmed = await warm_up_pool()
+        print(f"Database pool warmed with {warmed} connection(s)")
+    except Exception as exc:
+        print(f"Database pool warm-up failed: {exc}")
+    gate_rotation_job.start()
+    counter_reconcile_job.start()
+    activity_autocomplete_job.start()
 
 
 # Shutdown event
@@ -120,6 +178,13 @@ async def startup_event():
 async def shutdown_event():
     """Application shutdown tasks"""
     print("Shutting down application...")
+    await gate_rotation_job.stop()
+    await counter_reconcile_job.stop()
+    await activity_autocomplete_job.stop()
+    await attendance_broker.close()
+    await opa_client.close()
+    await checkin_batcher.close()
+    await engine.dispose()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,24 @@
+"""Request-scoped database session middleware."""
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.database import request_session_scope
+
+
+class RequestSessionMiddleware:
+    """Open a request session scope around each HTTP request.
+
+    The session itself is only created on first use, so requests that never
+    touch the database do not check out a connection.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async with request_session_scope():
+            await self.app(scope, receive, send)
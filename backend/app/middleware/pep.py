@@ -1,30 +1,27 @@
 """Policy Enforcement Point (PEP) middleware."""
 
-from typing import Callable, Optional
+from typing import Iterable, Optional
 import json
-from fastapi import Request, status
+from fastapi import status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core.security import decode_token
-from app.core.config import settings
-from app.core.database import AsyncSessionLocal
-from sqlalchemy import select
-from app.models.activity import ActivityCase
-from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.core.database import AsyncSessionLocal, get_request_session
+from app.models.attendance import AttendanceStatus
 from app.services.opa_client import opa_client, PolicyInput
-import jwt
+from app.services.qrcode_service import QRCodeError, decode_qr_code
+from app.services.resource_loader import LoadedResources, load_activity_resources
+from app.middleware.route_table import (
+    RESOURCE_FROM_BODY,
+    RESOURCE_FROM_PATH,
+    RESOURCE_FROM_QR,
+    RouteMatch,
+    RouteTable,
+)
 
 
-METHOD_ACTION_MAP = {
-    "GET": "read",
-    "POST": "create",
-    "PUT": "update",
-    "PATCH": "update",
-    "DELETE": "delete",
-}
-
 PUBLIC_ROUTES = [
     "/v1/auth/login",
     "/v1/auth/register",
@@ -36,44 +33,134 @@ PUBLIC_ROUTES = [
     "/openapi.json",
 ]
 
-ROUTE_RESOURCE_MAP = {
-    "/v1/activities": "activity",
-    "/v1/users": "user",
-    "/v1/attendance": "attendance",
-}
-
 
-class PEPMiddleware(BaseHTTPMiddleware):
-    """Intercept requests and enforce OPA policy decisions."""
-
-    def __init__(self, app: ASGIApp, skip_paths: Optional[list[str]] = None) -> None:
-        super().__init__(app)
+class PEPRequest:
+    """Minimal view of an HTTP scope used while making a policy decision.
+
+    The body is read from ``receive`` at most once, and only when a policy
+    input needs it; ``replay_receive`` hands the same bytes to the
+    downstream application.
+    """
+
+    __slots__ = ("scope", "receive", "headers", "body", "_json")
+
+    def __init__(self, scope: Scope, receive: Receive) -> None:
+        self.scope = scope
+        self.receive = receive
+        self.headers = Headers(scope=scope)
+        self.body: Optional[bytes] = None
+        self._json: Optional[dict] = None
+
+    @property
+    def method(self) -> str:
+        return self.scope["method"]
+
+    @property
+    def path(self) -> str:
+        return self.scope["path"]
+
+    @property
+    def state(self) -> dict:
+        return self.scope.setdefault("state", {})
+
+    @property
+    def client_host(self) -> Optional[str]:
+        client = self.scope.get("client")
+        return client[0] if client else None
+
+    async def read_body(self) -> bytes:
+        if self.body is None:
+            chunks = []
+            more_body = True
+            while more_body:
+                message = await self.receive()
+                if message["type"] != "http.request":
+                    break
+                chunks.append(message.get("body", b""))
+                more_body = message.get("more_body", False)
+            self.body = chunks[0] if len(chunks) == 1 else b"".join(chunks)
+        return self.body
+
+    def replay_receive(self) -> Receive:
+        if self.body is None:
+            return self.receive
+
+        body = self.body
+        receive = self.receive
+        replayed = False
+
+        async def replay() -> Message:
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return replay
+
+
+class PEPMiddleware:
+    """Intercept requests and enforce OPA policy decisions.
+
+    Implemented as plain ASGI so policy checks add no task or stream
+    wrapping around the downstream application. Actions are resolved through
+    a ``RouteTable`` compiled from ``routes`` when the middleware stack is
+    built; requests that match no mapped route are denied.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        skip_paths: Optional[list[str]] = None,
+        routes: Optional[Iterable] = None,
+    ) -> None:
+        self.app = app
         self.skip_paths = skip_paths or PUBLIC_ROUTES
-
-    async def dispatch(self, request: Request, call_next: Callable):
-        if request.method == "OPTIONS":
-            return await call_next(request)
-        if self._should_skip(request.url.path):
-            return await call_next(request)
-
-        user_context = await self._extract_user_context(request)
+        if routes is None:
+            self.route_table = RouteTable.from_actions()
+        else:
+            self.route_table = RouteTable.build(routes, is_public=self._should_skip)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        if self._should_skip(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        request = PEPRequest(scope, receive)
+        user_context = self._extract_user_context(request)
         if not user_context:
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 content={"detail": "Not authenticated"},
             )
+            await response(scope, receive, send)
+            return
+
+        match = self.route_table.match(request.method, request.path)
+        if match is None:
+            response = JSONResponse(
+                status_code=status.HTTP_403_FORBIDDEN,
+                content={
+                    "detail": "Permission denied",
+                    "reasons": ["No policy action is mapped for this route"],
+                },
+            )
+            await response(scope, receive, send)
+            return
 
-        action = self._determine_action(request)
-        resource_context = await self._get_resource_context(request)
-        attendance_context = await self._get_attendance_context(request, user_context)
+        resource_context = await self._get_resource_context(request, match, user_context)
+        attendance_context = self._get_attendance_context(request, match)
 
         policy_input = PolicyInput(
             subject=user_context,
-            action=action,
+            action=match.route_action.action,
             resource=resource_context,
             context={
                 "timestamp": request.headers.get("x-request-time"),
-                "ip_address": request.client.host if request.client else None,
+                "ip_address": request.client_host,
                 "user_agent": request.headers.get("user-agent"),
                 **attendance_context,
             },
@@ -81,23 +168,25 @@ class PEPMiddleware(BaseHTTPMiddleware):
 
         decision = await opa_client.evaluate(policy_input)
         if not decision.allow:
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=status.HTTP_403_FORBIDDEN,
                 content={
                     "detail": "Permission denied",
                     "reasons": decision.reasons,
                 },
             )
+            await response(scope, request.replay_receive(), send)
+            return
 
-        request.state.policy_decision = decision
-        request.state.user_context = user_context
+        request.state["policy_decision"] = decision
+        request.state["user_context"] = user_context
 
-        return await call_next(request)
+        await self.app(scope, request.replay_receive(), send)
 
     def _should_skip(self, path: str) -> bool:
         return any(path.startswith(skip_path) for skip_path in self.skip_paths)
 
-    async def _extract_user_context(self, request: Request) -> Optional[dict]:
+    def _extract_user_context(self, request: PEPRequest) -> Optional[dict]:
         auth_header = request.headers.get("Authorization")
         if not auth_header or not auth_header.startswith("Bearer "):
             return None
@@ -114,187 +203,95 @@ class PEPMiddleware(BaseHTTPMiddleware):
             "department": payload.get("department"),
         }
 
-    def _determine_action(self, request: Request) -> str:
-        method = request.method
-        path = request.url.path
-
-        if path == "/v1/users/me":
-            if method == "GET":
-                return "user:read_self"
-            if method in ["PUT", "PATCH"]:
-                return "user:update_self"
-
-        if path == "/v1/users" and method == "GET":
-            return "user:list"
-        if path == "/v1/activities" and method == "GET":
-            return "activity:list"
-        if path == "/v1/activities/types" and method == "GET":
-            return "activity:list"
-
-        base_action = METHOD_ACTION_MAP.get(method, "read")
-
-        resource_type = "unknown"
-        for route_prefix, res_type in ROUTE_RESOURCE_MAP.items():
-            if path.startswith(route_prefix):
-                resource_type = res_type
-                break
-
-        if "/submit" in path:
-            return f"{resource_type}:submit"
-        if "/start" in path:
-            return f"{resource_type}:start"
-        if "/approve" in path:
-            return f"{resource_type}:approve"
-        if "/reject" in path:
-            return f"{resource_type}:reject"
-        if "/check-in" in path:
-            return "attendance:checkin"
-        if "/check-out" in path:
-            return "attendance:checkout"
-        if "/register" in path and path.startswith("/v1/attendance"):
-            return "attendance:register"
-        if "/qr-code" in path and method == "POST":
-            return "attendance:generate_qr"
-        if "/qr-code" in path and method == "GET":
-            return "attendance:validate_qr"
-        if path.startswith("/v1/attendance/activity") and method == "GET":
-            return "attendance:view"
-
-        return f"{resource_type}:{base_action}"
-
-    async def _get_resource_context(self, request: Request) -> dict:
-        path = request.url.path
-        parts = path.strip("/").split("/")
-        method = request.method
-
-        if path.startswith("/v1/attendance/qr-code") and method == "POST":
+    async def _get_resource_context(
+        self,
+        request: PEPRequest,
+        match: RouteMatch,
+        user_context: dict,
+    ) -> dict:
+        route_action = match.route_action
+        source = route_action.resource_source
+        if source == RESOURCE_FROM_PATH:
+            activity_id = match.path_params.get("activity_id")
+        elif source == RESOURCE_FROM_BODY:
             body = await self._get_request_json(request)
             activity_id = body.get("activity_id")
-            if activity_id:
-                async with AsyncSessionLocal() as session:
-                    result = await session.execute(
-                        select(ActivityCase).where(ActivityCase.id == activity_id)
-                    )
-                    activity = result.scalar_one_or_none()
-                    if activity:
-                        return {
-                            "id": activity.id,
-                            "creator_id": activity.creator_id,
-                            "status": getattr(activity.status, "value", activity.status),
-                        }
-
-        if path == "/v1/attendance/register" and method == "POST":
-            body = await self._get_request_json(request)
-            activity_id = body.get("activity_id")
-            if activity_id:
-                async with AsyncSessionLocal() as session:
-                    result = await session.execute(
-                        select(ActivityCase).where(ActivityCase.id == activity_id)
-                    )
-                    activity = result.scalar_one_or_none()
-                    if activity:
-                        return {
-                            "id": activity.id,
-                            "creator_id": activity.creator_id,
-                            "status": getattr(activity.status, "value", activity.status),
-                            "activity_status": getattr(activity.status, "value", activity.status),
-                        }
-
-        if path.startswith("/v1/attendance/activity") and len(parts) >= 4:
-            activity_id = parts[3]
-            async with AsyncSessionLocal() as session:
-                result = await session.execute(
-                    select(ActivityCase).where(ActivityCase.id == activity_id)
-                )
-                activity = result.scalar_one_or_none()
-                if activity:
-                    return {
-                        "id": activity.id,
-                        "creator_id": activity.creator_id,
-                        "status": getattr(activity.status, "value", activity.status),
-                        "activity_status": getattr(activity.status, "value", activity.status),
-                    }
-
-        if path in ["/v1/attendance/check-in", "/v1/attendance/check-out"]:
+        elif source == RESOURCE_FROM_QR:
             payload = await self._decode_qr_payload(request)
             activity_id = payload.get("event_id") or payload.get("activity_id")
-            if activity_id:
-                async with AsyncSessionLocal() as session:
-                    result = await session.execute(
-                        select(ActivityCase).where(ActivityCase.id == activity_id)
-                    )
-                    activity = result.scalar_one_or_none()
-                    if activity:
-                        return {
-                            "id": activity.id,
-                            "creator_id": activity.creator_id,
-                            "activity_status": getattr(activity.status, "value", activity.status),
-                        }
-
-        if len(parts) >= 3 and parts[0] == "v1" and parts[1] == "activities":
-            activity_id = parts[2]
-            if activity_id != "types":
-                async with AsyncSessionLocal() as session:
-                    result = await session.execute(
-                        select(ActivityCase).where(ActivityCase.id == activity_id)
-                    )
-                    activity = result.scalar_one_or_none()
-                    if activity:
-                        return {
-                            "id": activity.id,
-                            "creator_id": activity.creator_id,
-                            "status": getattr(activity.status, "value", activity.status),
-                            "risk_level": getattr(activity.risk_level, "value", activity.risk_level),
-                        }
-        return {}
-
-    async def _get_attendance_context(self, request: Request, user_context: dict) -> dict:
-        path = request.url.path
-        if path not in ["/v1/attendance/check-in", "/v1/attendance/check-out"]:
+        else:
             return {}
 
-        payload = await self._decode_qr_payload(request)
-        activity_id = payload.get("event_id") or payload.get("activity_id")
-        if not activity_id or not user_context:
+        user_id = user_context.get("id") if route_action.load_attendance else None
+        loaded = await self._load_resources(request, activity_id, user_id)
+        if not loaded or not loaded.activity:
             return {}
 
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(AttendanceRecord).where(
-                    (AttendanceRecord.activity_id == activity_id)
-                    & (AttendanceRecord.user_id == user_context.get("id"))
-                )
-            )
-            record = result.scalar_one_or_none()
+        activity = loaded.activity
+        activity_status = getattr(activity.status, "value", activity.status)
+        return {
+            "id": activity.id,
+            "creator_id": activity.creator_id,
+            "status": activity_status,
+            "activity_status": activity_status,
+            "risk_level": getattr(activity.risk_level, "value", activity.risk_level),
+        }
+
+    def _get_attendance_context(self, request: PEPRequest, match: RouteMatch) -> dict:
+        if not match.route_action.load_attendance:
+            return {}
+
+        loaded: Optional[LoadedResources] = request.state.get("loaded_resources")
+        if not loaded or loaded.user_id is None:
+            return {}
 
+        record = loaded.attendance
         return {
             "is_registered": record is not None,
             "is_checked_in": record is not None and record.status == AttendanceStatus.CHECKED_IN,
         }
 
-    async def _get_request_json(self, request: Request) -> dict:
-        if request.method in ["POST", "PUT", "PATCH"]:
-            body = await request.body()
-            request._body = body
-            if not body:
-                return {}
+    async def _load_resources(
+        self,
+        request: PEPRequest,
+        activity_id: Optional[str],
+        user_id: Optional[str] = None,
+    ) -> Optional[LoadedResources]:
+        """Load the activity (and caller's attendance) once per request."""
+        if not activity_id:
+            return None
+
+        loaded: Optional[LoadedResources] = request.state.get("loaded_resources")
+        if loaded and loaded.matches(activity_id, user_id):
+            return loaded
+
+        session = get_request_session()
+        if session is not None:
+            loaded = await load_activity_resources(session, activity_id, user_id)
+        else:
+            async with AsyncSessionLocal() as session:
+                loaded = await load_activity_resources(session, activity_id, user_id)
+        request.state["loaded_resources"] = loaded
+        return loaded
+
+    async def _get_request_json(self, request: PEPRequest) -> dict:
+        if request.method not in ["POST", "PUT", "PATCH"]:
+            return {}
+        if request._json is None:
+            body = await request.read_body()
             try:
-                return json.loads(body.decode("utf-8"))
-            except json.JSONDecodeError:
-                return {}
-        return {}
+                parsed = json.loads(body) if body else {}
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                parsed = {}
+            request._json = parsed if isinstance(parsed, dict) else {}
+        return request._json
 
-    async def _decode_qr_payload(self, request: Request) -> dict:
+    async def _decode_qr_payload(self, request: PEPRequest) -> dict:
         body = await self._get_request_json(request)
         qr_code = body.get("qr_code")
-        if not qr_code:
+        if not qr_code or not isinstance(qr_code, str):
             return {}
         try:
-            return jwt.decode(
-                qr_code,
-                settings.SECRET_KEY,
-                algorithms=[settings.ALGORITHM],
-                options={"verify_exp": False},
-            )
-        except jwt.InvalidTokenError:
+            return decode_qr_code(qr_code, verify_exp=False)
+        except QRCodeError:
             return {}
@@ -0,0 +1,195 @@
+"""Precompiled route-to-action table used by the PEP middleware."""
+
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional
+from fastapi.routing import APIRoute
+
+
+# Where the PEP finds the activity a request is about.
+RESOURCE_FROM_PATH = "path"
+RESOURCE_FROM_BODY = "body"
+RESOURCE_FROM_QR = "qr"
+
+
+@dataclass(frozen=True)
+class RouteAction:
+    """Policy action for one (method, route template) pair."""
+    action: str
+    resource_source: Optional[str] = None
+    load_attendance: bool = False
+
+
+# Every non-public API route must have an entry here. ``RouteTable.build``
+# refuses to start the application when a registered route is missing.
+ROUTE_ACTIONS: dict[tuple[str, str], RouteAction] = {
+    ("GET", "/v1/activities"): RouteAction("activity:list"),
+    ("POST", "/v1/activities"): RouteAction("activity:create"),
+    ("GET", "/v1/activities/types"): RouteAction("activity:list"),
+    ("GET", "/v1/activities/{activity_id}"): RouteAction("activity:read", RESOURCE_FROM_PATH),
+    ("PUT", "/v1/activities/{activity_id}"): RouteAction("activity:update", RESOURCE_FROM_PATH),
+    ("DELETE", "/v1/activities/{activity_id}"): RouteAction("activity:delete", RESOURCE_FROM_PATH),
+    ("POST", "/v1/activities/{activity_id}/submit"): RouteAction("activity:submit", RESOURCE_FROM_PATH),
+    ("POST", "/v1/activities/{activity_id}/approve"): RouteAction("activity:approve", RESOURCE_FROM_PATH),
+    ("POST", "/v1/activities/{activity_id}/reject"): RouteAction("activity:reject", RESOURCE_FROM_PATH),
+    ("POST", "/v1/activities/{activity_id}/start"): RouteAction("activity:start", RESOURCE_FROM_PATH),
+    ("GET", "/v1/activities/{activity_id}/participants"): RouteAction("activity:read", RESOURCE_FROM_PATH),
+    ("POST", "/v1/attendance/register"): RouteAction(
+        "attendance:register", RESOURCE_FROM_BODY, load_attendance=True
+    ),
+    ("POST", "/v1/attendance/check-in"): RouteAction(
+        "attendance:checkin", RESOURCE_FROM_QR, load_attendance=True
+    ),
+    ("POST", "/v1/attendance/check-out"): RouteAction(
+        "attendance:checkout", RESOURCE_FROM_QR, load_attendance=True
+    ),
+    ("GET", "/v1/attendance/activity/{activity_id}"): RouteAction("attendance:view", RESOURCE_FROM_PATH),
+    ("GET", "/v1/attendance/activity/{activity_id}/stats"): RouteAction("attendance:view", RESOURCE_FROM_PATH),
+    ("GET", "/v1/attendance/activity/{activity_id}/export"): RouteAction("attendance:view", RESOURCE_FROM_PATH),
+    ("GET", "/v1/attendance/activity/{activity_id}/stream"): RouteAction("attendance:view", RESOURCE_FROM_PATH),
+    ("POST", "/v1/attendance/qr-code"): RouteAction("attendance:generate_qr", RESOURCE_FROM_BODY),
+    ("GET", "/v1/attendance/qr-code/{qr_code}"): RouteAction("attendance:validate_qr"),
+    ("POST", "/v1/attendance/gates"): RouteAction("attendance:manage_gates", RESOURCE_FROM_BODY),
+    ("GET", "/v1/attendance/gates/{activity_id}/{gate_id}/current"): RouteAction(
+        "attendance:manage_gates", RESOURCE_FROM_PATH
+    ),
+    ("DELETE", "/v1/attendance/gates/{activity_id}/{gate_id}"): RouteAction(
+        "attendance:manage_gates", RESOURCE_FROM_PATH
+    ),
+    ("POST", "/v1/attendance/activity/{activity_id}/sync"): RouteAction("attendance:sync", RESOURCE_FROM_PATH),
+    ("GET", "/v1/users"): RouteAction("user:list"),
+    ("GET", "/v1/users/me"): RouteAction("user:read_self"),
+    ("PUT", "/v1/users/me"): RouteAction("user:update_self"),
+    ("GET", "/v1/users/{user_id}"): RouteAction("user:read"),
+    ("GET", "/metrics"): RouteAction("system:metrics"),
+}
+
+
+@dataclass(slots=True)
+class RouteMatch:
+    """A resolved request: its policy action, template and path parameters."""
+    route_action: RouteAction
+    template: str
+    path_params: dict[str, str]
+
+
+@dataclass(eq=False)
+class _Node:
+    literals: dict[str, "_Node"] = field(default_factory=dict)
+    param: Optional["_Node"] = None
+    param_name: Optional[str] = None
+    methods: dict[str, tuple[RouteAction, str]] = field(default_factory=dict)
+
+
+def _segments(path: str) -> list[str]:
+    path = path.strip("/")
+    return path.split("/") if path else []
+
+
+class RouteTable:
+    """Segment trie mapping (method, path) to a ``RouteAction``.
+
+    Templates without parameters are also kept in a flat dict so static
+    routes resolve with a single lookup. Literal segments are preferred over
+    parameters, mirroring how the FastAPI router resolves
+    ``/activities/types`` before ``/activities/{activity_id}``.
+    """
+
+    def __init__(self) -> None:
+        self._root = _Node()
+        self._static: dict[tuple[str, str], RouteMatch] = {}
+
+    def add(self, method: str, template: str, route_action: RouteAction) -> None:
+        node = self._root
+        for segment in _segments(template):
+            if segment.startswith("{") and segment.endswith("}"):
+                name = segment[1:-1].split(":", 1)[0]
+                if node.param is None:
+                    node.param = _Node()
+                    node.param_name = name
+                elif node.param_name != name:
+                    raise ValueError(
+                        f"Conflicting path parameters '{node.param_name}' and '{name}' in {template}"
+                    )
+                node = node.param
+            else:
+                node = node.literals.setdefault(segment, _Node())
+        node.methods[method] = (route_action, template)
+        if "{" not in template:
+            key = (method, "/" + "/".join(_segments(template)))
+            self._static[key] = RouteMatch(route_action, template, {})
+
+    def match(self, method: str, path: str) -> Optional[RouteMatch]:
+        static = self._static.get((method, path.rstrip("/") or "/"))
+        if static is not None:
+            return static
+        return self._walk(self._root, _segments(path), 0, method, {})
+
+    def _walk(
+        self,
+        node: _Node,
+        segments: list[str],
+        index: int,
+        method: str,
+        params: dict[str, str],
+    ) -> Optional[RouteMatch]:
+        for position in range(index, len(segments)):
+            segment = segments[position]
+            child = node.literals.get(segment)
+            if node.param is not None and segment:
+                if child is not None:
+                    # Try the literal branch first; fall back to the parameter.
+                    found = self._walk(child, segments, position + 1, method, dict(params))
+                    if found is not None:
+                        return found
+                params[node.param_name] = segment
+                node = node.param
+            elif child is not None:
+                node = child
+            else:
+                return None
+
+        found = node.methods.get(method)
+        if found is None:
+            return None
+        return RouteMatch(found[0], found[1], params)
+
+    @classmethod
+    def from_actions(
+        cls, actions: Optional[dict[tuple[str, str], RouteAction]] = None
+    ) -> "RouteTable":
+        """Compile ``actions`` as-is, without checking them against an app."""
+        table = cls()
+        for (method, template), route_action in (actions or ROUTE_ACTIONS).items():
+            table.add(method, template, route_action)
+        return table
+
+    @classmethod
+    def build(
+        cls,
+        routes: Iterable,
+        is_public: Callable[[str], bool],
+        actions: Optional[dict[tuple[str, str], RouteAction]] = None,
+    ) -> "RouteTable":
+        """Compile the table for the application's routes.
+
+        Raises ``RuntimeError`` if a non-public ``APIRoute`` has no entry in
+        ``actions``, so a new endpoint cannot ship without a policy action.
+        """
+        actions = ROUTE_ACTIONS if actions is None else actions
+        table = cls()
+        unmapped = []
+        for route in routes:
+            if not isinstance(route, APIRoute) or is_public(route.path):
+                continue
+            for method in sorted(route.methods):
+                route_action = actions.get((method, route.path))
+                if route_action is None:
+                    unmapped.append(f"{method} {route.path}")
+                    continue
+                table.add(method, route.path, route_action)
+
+        if unmapped:
+            raise RuntimeError(
+                "PEP route table has no policy action for: " + ", ".join(unmapped)
+            )
+        return table
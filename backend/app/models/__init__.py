@@ -1,7 +1,7 @@
 from .base import Base
 from .user import User, Role, Permission, UserRole
 from .activity import ActivityCase, ActivityType
-from .attendance import AttendanceRecord, AttendanceSession, QRCode
+from .attendance import AttendanceCounter, AttendanceRecord, AttendanceSession, GateRotation, QRCode
 from .approval import ApprovalWorkflow
 from .audit import AuditLog
 from .policy import PolicyRule
@@ -14,8 +14,10 @@ __all__ = [
     "UserRole",
     "ActivityCase",
     "ActivityType",
+    "AttendanceCounter",
     "AttendanceRecord",
     "AttendanceSession",
+    "GateRotation",
     "QRCode",
     "ApprovalWorkflow",
     "AuditLog",
@@ -1,7 +1,8 @@
 from datetime import datetime
 from typing import List, Optional
 from uuid import uuid4
-from sqlalchemy import String, Text, Integer, DateTime, Enum as SQLEnum, ForeignKey, CheckConstraint
+from sqlalchemy import String, Text, Integer, DateTime, Enum as SQLEnum, ForeignKey, CheckConstraint, Column, Computed, Index, Sequence
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from enum import Enum
 from .base import Base, TimestampMixin
@@ -26,6 +27,19 @@ class RiskLevel(str, Enum):
     CRITICAL = "CRITICAL"
 
 
+# Title and location rank above description. The "simple" configuration
+# only lowercases, so prefix queries match words exactly as typed.
+SEARCH_CONFIG = "simple"
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', title || ' ' || location), 'A') || "
+    "setweight(to_tsvector('simple', description), 'B')"
+)
+
+
+# Allocates the number in each case's C-XXXX case number
+CASE_NUMBER_SEQUENCE = Sequence("activity_case_number_seq", metadata=Base.metadata)
+
+
 class ActivityCase(Base, TimestampMixin):
     """ActivityCase model - represents activity cases"""
 
@@ -68,6 +82,10 @@ class ActivityCase(Base, TimestampMixin):
     rejected_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     rejection_reason: Mapped[Optional[str]] = mapped_column(Text)
 
+    # Optimistic locking: bumped by every change to the case itself
+    # (participant counts excluded), checked by every UPDATE of it.
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
+
     # Relationships
     creator: Mapped["User"] = relationship(
         "User",
@@ -82,10 +100,24 @@ class ActivityCase(Base, TimestampMixin):
     qr_codes: Mapped[List["QRCode"]] = relationship("QRCode", back_populates="activity")
 
     __table_args__ = (
+        # Full-text search document, computed by PostgreSQL on every write.
+        # A table column only, left out of the mapper, so that it is never
+        # loaded or sent back by RETURNING; query it as
+        # ActivityCase.__table__.c.search_vector.
+        Column("search_vector", TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True)),
         CheckConstraint("current_participants >= 0", name="check_participants_positive"),
         CheckConstraint("current_participants <= max_participants", name="check_participants_limit"),
         CheckConstraint("end_date >= start_date", name="check_date_order"),
+        Index("idx_activity_created_id", "created_at", "id"),
+        Index("idx_activity_search", "search_vector", postgresql_using="gin"),
     )
+    # Server-generated values (timestamps) come back through RETURNING on
+    # INSERT and UPDATE, so a flushed activity needs no refresh.
+    __mapper_args__ = {
+        "eager_defaults": True,
+        "exclude_properties": ["search_vector"],
+        "version_id_col": version,
+    }
 
 
 class ActivityType(Base, TimestampMixin):
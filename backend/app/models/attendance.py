@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List, Optional
 from uuid import uuid4
-from sqlalchemy import String, DateTime, Enum as SQLEnum, ForeignKey, Text, Boolean, Index, UniqueConstraint
+from sqlalchemy import String, DateTime, Enum as SQLEnum, ForeignKey, Text, Boolean, Index, Integer, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from enum import Enum
 from .base import Base, TimestampMixin
@@ -57,10 +57,26 @@ class AttendanceRecord(Base, TimestampMixin):
     __table_args__ = (
         Index("idx_attendance_activity_user", "activity_id", "user_id"),
         Index("idx_attendance_status", "status"),
+        Index("idx_attendance_activity_registered", "activity_id", "registered_at", "id"),
         UniqueConstraint("activity_id", "user_id", name="uq_attendance_activity_user"),
     )
 
 
+class AttendanceCounter(Base):
+    """AttendanceCounter model - per-activity attendance totals kept in step with status changes"""
+
+    __tablename__ = "attendance_counters"
+
+    activity_id: Mapped[str] = mapped_column(ForeignKey("activity_cases.id", ondelete="CASCADE"), primary_key=True)
+    total: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    checked_in: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    checked_out: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    absent: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    reconciled_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+
+
 class QRCode(Base, TimestampMixin):
     """QRCode model - stores QR codes for activity check-in"""
 
@@ -97,6 +113,7 @@ class QRCode(Base, TimestampMixin):
     __table_args__ = (
         Index("idx_qrcode_validity", "valid_from", "valid_until"),
         Index("idx_qrcode_active", "is_active"),
+        Index("idx_qrcode_gate_window", "activity_id", "gate_id", "valid_from"),
     )
 
 
@@ -112,3 +129,29 @@ class AttendanceSession(Base, TimestampMixin):
     expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
 
     activity: Mapped["ActivityCase"] = relationship("ActivityCase")
+
+
+class GateRotation(Base, TimestampMixin):
+    """GateRotation model - a gate whose QR codes are pre-generated in rotation windows"""
+
+    __tablename__ = "gate_rotations"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    activity_id: Mapped[str] = mapped_column(ForeignKey("activity_cases.id", ondelete="CASCADE"), nullable=False, index=True)
+    gate_id: Mapped[str] = mapped_column(String(50), nullable=False)
+    code_type: Mapped[str] = mapped_column(String(20), nullable=False)  # 'CHECK_IN', 'CHECK_OUT', 'BOTH'
+
+    # Rotation schedule
+    window_seconds: Mapped[int] = mapped_column(Integer, nullable=False)
+    windows_ahead: Mapped[int] = mapped_column(Integer, nullable=False)
+    generated_until: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    is_active: Mapped[bool] = mapped_column(default=True, nullable=False)
+
+    created_by_id: Mapped[str] = mapped_column(ForeignKey("users.id"), nullable=False)
+
+    activity: Mapped["ActivityCase"] = relationship("ActivityCase")
+
+    __table_args__ = (
+        UniqueConstraint("activity_id", "gate_id", name="uq_gate_rotation_activity_gate"),
+        Index("idx_gate_rotation_due", "is_active", "generated_until"),
+    )
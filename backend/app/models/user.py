@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List, Optional
 from uuid import uuid4
-from sqlalchemy import String, Boolean, Text, ForeignKey, Table, Column, UniqueConstraint, DateTime
+from sqlalchemy import String, Boolean, Text, ForeignKey, Table, Column, UniqueConstraint, DateTime, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .base import Base, TimestampMixin
 
@@ -60,6 +60,18 @@ class User(Base, TimestampMixin):
         back_populates="user"
     )
 
+    __table_args__ = (
+        # Trigram index so substring search (ILIKE '%term%') does not scan the table
+        Index(
+            "idx_users_search_trgm",
+            "username",
+            "email",
+            "full_name",
+            postgresql_using="gin",
+            postgresql_ops={"username": "gin_trgm_ops", "email": "gin_trgm_ops", "full_name": "gin_trgm_ops"},
+        ),
+    )
+
 
 class Role(Base, TimestampMixin):
     """Role model - defines user roles (ADMIN, USER, GUEST)"""
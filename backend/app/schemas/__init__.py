@@ -23,6 +23,7 @@ from .attendance import (
     QRCodeResponse,
 )
 from .common import (
+    CursorPaginatedResponse,
     PaginatedResponse,
     SuccessResponse,
     ErrorResponse,
@@ -51,6 +52,7 @@ __all__ = [
     "QRCodeCreate",
     "QRCodeResponse",
     # Common schemas
+    "CursorPaginatedResponse",
     "PaginatedResponse",
     "SuccessResponse",
     "ErrorResponse",
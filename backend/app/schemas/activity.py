@@ -157,6 +157,7 @@ class ActivityCaseResponse(ActivityCaseBase):
     risk_level: RiskLevelEnum = Field(..., description="Risk level")
     risk_assessment: Optional[str] = Field(None, description="AI risk assessment")
     current_participants: int = Field(..., description="Current participant count")
+    version: int = Field(..., description="Row version, incremented on every change to the case")
 
     # Timestamps
     created_at: datetime = Field(..., description="Creation timestamp")
@@ -191,6 +192,7 @@ class ActivityCaseResponse(ActivityCaseBase):
                 "venue_details": "Meet at main entrance",
                 "max_participants": 30,
                 "current_participants": 15,
+                "version": 3,
                 "creator_id": "user-uuid",
                 "approved_by_id": "admin-uuid",
                 "approved_at": "2024-05-20T10:00:00Z",
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 from enum import Enum
-from pydantic import BaseModel, Field
+from pydantic import AwareDatetime, BaseModel, Field
 
 
 class AttendanceStatusEnum(str, Enum):
@@ -148,6 +148,107 @@ class QRCodeResponse(BaseModel):
         }
 
 
+class GateRotationCreate(BaseModel):
+    """Schema for registering a gate with rotating QR codes"""
+
+    activity_id: str = Field(..., description="Activity case ID")
+    gate_id: str = Field(..., max_length=50, description="Gate ID")
+    code_type: str = Field("CHECK_IN", description="Code type (CHECK_IN, CHECK_OUT, BOTH)")
+    window_seconds: Optional[int] = Field(None, ge=15, le=3600, description="Lifetime of each code in seconds")
+    windows_ahead: Optional[int] = Field(None, ge=1, le=120, description="Number of windows generated ahead")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "activity_id": "activity-uuid",
+                "gate_id": "main",
+                "code_type": "CHECK_IN",
+                "window_seconds": 60,
+                "windows_ahead": 10
+            }
+        }
+
+
+class GateRotationResponse(BaseModel):
+    """Gate rotation response schema"""
+
+    id: str = Field(..., description="Gate rotation ID")
+    activity_id: str = Field(..., description="Activity case ID")
+    gate_id: str = Field(..., description="Gate ID")
+    code_type: str = Field(..., description="Code type (CHECK_IN, CHECK_OUT, BOTH)")
+    window_seconds: int = Field(..., description="Lifetime of each code in seconds")
+    windows_ahead: int = Field(..., description="Number of windows kept generated ahead")
+    generated_until: datetime = Field(..., description="End of the last generated window")
+    is_active: bool = Field(..., description="Whether the gate is rotating")
+    created_by_id: str = Field(..., description="User ID who registered the gate")
+    sync_key: Optional[str] = Field(
+        None, description="Key the gate device signs offline scans with (returned on registration only)"
+    )
+
+    class Config:
+        from_attributes = True
+        json_schema_extra = {
+            "example": {
+                "id": "rotation-uuid",
+                "activity_id": "activity-uuid",
+                "gate_id": "main",
+                "code_type": "CHECK_IN",
+                "window_seconds": 60,
+                "windows_ahead": 10,
+                "generated_until": "2024-06-15T08:10:00Z",
+                "is_active": True,
+                "created_by_id": "admin-uuid"
+            }
+        }
+
+
+class GateScanEvent(BaseModel):
+    """A scan recorded by a gate device while offline"""
+
+    event_id: str = Field(..., max_length=64, description="Device-generated scan ID")
+    user_id: str = Field(..., description="Scanned user ID")
+    qr_code: str = Field(..., description="QR code displayed at the gate when scanned")
+    scanned_at: AwareDatetime = Field(..., description="Scan timestamp (with timezone)")
+    gate_id: str = Field(..., max_length=50, description="Gate ID")
+    signature: str = Field(
+        ...,
+        pattern="^[0-9a-fA-F]{64}$",
+        description="Hex HMAC-SHA256 with the gate's sync key over "
+                    "event_id, user_id, gate_id, scanned_at (Unix ms) and qr_code joined by newlines",
+    )
+
+
+class GateSyncRequest(BaseModel):
+    """Batch of offline gate scans (the body may be gzip-compressed)"""
+
+    events: list[GateScanEvent] = Field(..., min_length=1, description="Scan events")
+
+
+class GateSyncItemResult(BaseModel):
+    """Outcome of one uploaded scan"""
+
+    index: int = Field(..., description="Position of the event in the upload")
+    event_id: str = Field(..., description="Device-generated scan ID")
+    user_id: str = Field(..., description="Scanned user ID")
+    status: str = Field(..., description="CHECKED_IN, DUPLICATE (already applied) or REJECTED")
+    reason: Optional[str] = Field(None, description="Why the scan was a duplicate or rejected")
+    record_id: Optional[str] = Field(None, description="Attendance record ID")
+
+    class Config:
+        from_attributes = True
+
+
+class GateSyncResponse(BaseModel):
+    """Result of an offline gate scan upload"""
+
+    activity_id: str = Field(..., description="Activity case ID")
+    total: int = Field(..., description="Events received")
+    checked_in: int = Field(..., description="Events that checked a user in")
+    duplicates: int = Field(..., description="Events already reflected in attendance")
+    rejected: int = Field(..., description="Events that were not applied")
+    items: list[GateSyncItemResult] = Field(..., description="Per-event results, in upload order")
+
+
 class AttendanceStatsResponse(BaseModel):
     """Attendance statistics response"""
 
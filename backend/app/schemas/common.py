@@ -58,6 +58,7 @@ class PaginationMeta(BaseModel):
     total_pages: int = Field(..., description="Total number of pages", ge=0)
     has_next: bool = Field(..., description="Whether there is a next page")
     has_prev: bool = Field(..., description="Whether there is a previous page")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, where supported")
 
 
 class PaginatedResponse(BaseModel, Generic[T]):
@@ -78,12 +79,30 @@ class PaginatedResponse(BaseModel, Generic[T]):
                     "total": 100,
                     "total_pages": 5,
                     "has_next": True,
-                    "has_prev": False
+                    "has_prev": False,
+                    "next_cursor": "WyIyMDI0LTA1LTIwVDEwOjAwOjAwKzAwOjAwIiwidXVpZCJd"
                 }
             }
         }
 
 
+class CursorPaginatedResponse(BaseModel, Generic[T]):
+    """Keyset-paginated response wrapper"""
+
+    success: bool = Field(True, description="Indicates request was successful")
+    data: list[T] = Field(..., description="List of items")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page; null on the last page")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "success": True,
+                "data": [],
+                "next_cursor": "WyIyMDI0LTA1LTIwVDEwOjAwOjAwKzAwOjAwIiwidXVpZCJd"
+            }
+        }
+
+
 class HealthCheckResponse(BaseModel):
     """Health check response"""
 
@@ -1,41 +1,34 @@
 """Activity service layer for core business logic."""
 
 from datetime import datetime, timezone
+import re
 from typing import Optional
-from sqlalchemy import func, select
+from sqlalchemy import Double, cast, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.exc import StaleDataError
 
-from app.models.activity import ActivityCase, ActivityStatus, ActivityType, RiskLevel
+from app.core.pagination import COUNT_MODES, after_cursor, cursor_page, decode_cursor, estimate_row_count
+from app.models.activity import CASE_NUMBER_SEQUENCE, SEARCH_CONFIG, ActivityCase, ActivityStatus, ActivityType, RiskLevel
 from app.models.attendance import AttendanceRecord
 from app.models.user import User
+from app.services.activity_transitions import ActivityConflict, transition_activity
+from app.services.count_cache import activity_count_cache
+from app.services.principal_cache import Principal
 
 
-VALID_TRANSITIONS = {
-    ActivityStatus.DRAFT: [ActivityStatus.PENDING_APPROVAL, ActivityStatus.CANCELLED],
-    ActivityStatus.PENDING_APPROVAL: [ActivityStatus.APPROVED, ActivityStatus.REJECTED],
-    ActivityStatus.APPROVED: [ActivityStatus.IN_PROGRESS, ActivityStatus.CANCELLED],
-    ActivityStatus.IN_PROGRESS: [ActivityStatus.COMPLETED],
-    ActivityStatus.REJECTED: [],
-    ActivityStatus.COMPLETED: [],
-    ActivityStatus.CANCELLED: [],
-}
-
-
-def validate_transition(current: ActivityStatus, target: ActivityStatus) -> bool:
-    """Validate if a state transition is allowed."""
-    return target in VALID_TRANSITIONS.get(current, [])
-
-
-def _is_admin(user: User) -> bool:
+def _is_admin(user: Principal) -> bool:
     return any(role.name == "ADMIN" for role in user.roles)
 
 
 async def generate_case_number(db: AsyncSession) -> str:
-    """Generate a unique case number like C-0001."""
-    result = await db.execute(select(func.count(ActivityCase.id)))
-    count = result.scalar_one() or 0
-    next_number = count + 1
+    """Generate a unique case number like C-0001.
+
+    Numbers come from a sequence, so concurrent creates never get the same
+    one and nothing is locked; a rolled-back create leaves a gap. Numbers
+    widen past C-9999 as needed.
+    """
+    next_number = await db.scalar(select(CASE_NUMBER_SEQUENCE.next_value()))
     return f"C-{next_number:04d}"
 
 
@@ -56,7 +49,7 @@ async def get_activity_type(db: AsyncSession, activity_type_id: Optional[str]) -
     return activity_type
 
 
-async def create_activity(db: AsyncSession, creator: User, data) -> ActivityCase:
+async def create_activity(db: AsyncSession, creator: Principal, data) -> ActivityCase:
     activity_type = await get_activity_type(db, data.activity_type_id)
     risk_level = data.risk_level or activity_type.default_risk_level
     risk_level_value = risk_level.value if hasattr(risk_level, "value") else risk_level
@@ -66,7 +59,7 @@ async def create_activity(db: AsyncSession, creator: User, data) -> ActivityCase
         case_number=case_number,
         title=data.title,
         description=data.description,
-        activity_type_id=activity_type.id,
+        activity_type=activity_type,
         status=ActivityStatus.DRAFT,
         risk_level=RiskLevel(risk_level_value),
         risk_assessment=None,
@@ -81,50 +74,101 @@ async def create_activity(db: AsyncSession, creator: User, data) -> ActivityCase
 
     db.add(activity)
     await db.flush()
-    await db.refresh(activity)
-    return await get_activity(db, activity.id)
+    return activity
+
+
+def search_tsquery(search: str):
+    """Prefix ``tsquery`` matching every word of ``search``, or None if it has none.
+
+    Each word matches as a prefix (``word:*``), so partially typed input
+    already finds results.
+    """
+    words = re.findall(r"\w+", search.lower())
+    if not words:
+        return None
+    return func.to_tsquery(SEARCH_CONFIG, " & ".join(f"{word}:*" for word in words))
 
 
 async def list_activities(
     db: AsyncSession,
-    page: int,
     per_page: int,
+    page: int = 1,
+    cursor: Optional[str] = None,
     status: Optional[ActivityStatus] = None,
     creator_id: Optional[str] = None,
     search: Optional[str] = None,
-) -> tuple[list[ActivityCase], int]:
-    query = select(ActivityCase).options(selectinload(ActivityCase.activity_type))
+    count_mode: str = "exact",
+) -> tuple[list[ActivityCase], int, Optional[str]]:
+    """One page of activities, the total and the next page's cursor.
+
+    Activities are listed newest first, or by search rank (then newest
+    first) when ``search`` is given. With ``cursor`` the page is found by
+    seeking on the sort key; ``page`` is then only echoed back. Without
+    one, ``page`` falls back to OFFSET so existing page-number clients
+    keep working.
+    """
+    query = select(ActivityCase)
 
     if status:
         query = query.where(ActivityCase.status == status)
     if creator_id:
         query = query.where(ActivityCase.creator_id == creator_id)
-    if search:
-        pattern = f"%{search}%"
-        query = query.where(
-            (ActivityCase.title.ilike(pattern)) | (ActivityCase.description.ilike(pattern))
+
+    sort_key = [ActivityCase.created_at, ActivityCase.id]
+    cursor_types = [datetime, str]
+    tsquery = search_tsquery(search) if search else None
+    if tsquery is not None:
+        search_vector = ActivityCase.__table__.c.search_vector
+        query = query.where(search_vector.bool_op("@@")(tsquery))
+        # Double precision so the rank survives the cursor round trip exactly.
+        sort_key.insert(0, cast(func.ts_rank(search_vector, tsquery), Double))
+        cursor_types.insert(0, float)
+
+    total = await _count_activities(db, query, count_mode, (status, creator_id, search))
+
+    page_query = (
+        query.add_columns(*sort_key)
+        .options(selectinload(ActivityCase.activity_type))
+        .order_by(*(column.desc() for column in sort_key))
+        .limit(per_page + 1)
+    )
+    if cursor:
+        page_query = page_query.where(
+            after_cursor(sort_key, decode_cursor(cursor, cursor_types), descending=True)
         )
+    elif page > 1:
+        page_query = page_query.offset((page - 1) * per_page)
 
-    total_query = select(func.count()).select_from(query.subquery())
-    total = (await db.execute(total_query)).scalar_one()
+    result = await db.execute(page_query)
+    rows, next_cursor = cursor_page(result.all(), per_page, lambda row: tuple(row)[1:])
+    return [row[0] for row in rows], total, next_cursor
 
-    query = query.order_by(ActivityCase.created_at.desc()).offset((page - 1) * per_page).limit(per_page)
-    result = await db.execute(query)
-    activities = result.scalars().all()
 
-    return activities, total
+async def _count_activities(db: AsyncSession, query, count_mode: str, filters: tuple) -> int:
+    if count_mode not in COUNT_MODES:
+        raise ValueError(f"Unknown count mode '{count_mode}', expected one of: {', '.join(COUNT_MODES)}")
+    if count_mode == "estimated":
+        return await estimate_row_count(db, query)
+    if count_mode == "cached":
+        total = activity_count_cache.get(filters)
+        if total is None:
+            total = (await db.execute(select(func.count()).select_from(query.subquery()))).scalar_one()
+            activity_count_cache.set(filters, total)
+        return total
+    return (await db.execute(select(func.count()).select_from(query.subquery()))).scalar_one()
 
 
 async def get_activity(db: AsyncSession, activity_id: str) -> Optional[ActivityCase]:
+    """Activity with its type, in one query."""
     result = await db.execute(
         select(ActivityCase)
-        .options(selectinload(ActivityCase.activity_type))
+        .options(joinedload(ActivityCase.activity_type))
         .where(ActivityCase.id == activity_id)
     )
     return result.scalar_one_or_none()
 
 
-async def update_activity(db: AsyncSession, activity_id: str, user: User, data) -> ActivityCase:
+async def update_activity(db: AsyncSession, activity_id: str, user: Principal, data) -> ActivityCase:
     activity = await get_activity(db, activity_id)
     if not activity:
         raise ValueError("Activity not found")
@@ -154,12 +198,14 @@ async def update_activity(db: AsyncSession, activity_id: str, user: User, data)
     for field, value in update_data.items():
         setattr(activity, field, value)
 
-    await db.flush()
-    await db.refresh(activity)
-    return await get_activity(db, activity.id)
+    try:
+        await db.flush()
+    except StaleDataError as exc:
+        raise ActivityConflict("Activity was changed by another request; reload it and retry") from exc
+    return activity
 
 
-async def delete_activity(db: AsyncSession, activity_id: str, user: User) -> ActivityCase:
+async def delete_activity(db: AsyncSession, activity_id: str, user: Principal) -> ActivityCase:
     activity = await get_activity(db, activity_id)
     if not activity:
         raise ValueError("Activity not found")
@@ -170,13 +216,10 @@ async def delete_activity(db: AsyncSession, activity_id: str, user: User) -> Act
     if activity.creator_id != user.id and not _is_admin(user):
         raise PermissionError("Only the creator or ADMIN can delete this activity")
 
-    activity.status = ActivityStatus.CANCELLED
-    await db.flush()
-    await db.refresh(activity)
-    return await get_activity(db, activity.id)
+    return await transition_activity(db, activity, ActivityStatus.CANCELLED, user.id)
 
 
-async def submit_activity(db: AsyncSession, activity_id: str, user: User) -> ActivityCase:
+async def submit_activity(db: AsyncSession, activity_id: str, user: Principal) -> ActivityCase:
     activity = await get_activity(db, activity_id)
     if not activity:
         raise ValueError("Activity not found")
@@ -184,30 +227,18 @@ async def submit_activity(db: AsyncSession, activity_id: str, user: User) -> Act
     if activity.creator_id != user.id:
         raise PermissionError("Only the creator can submit this activity")
 
-    if activity.status != ActivityStatus.DRAFT:
-        raise ValueError("Activity is not in DRAFT status")
-
-    activity.status = ActivityStatus.PENDING_APPROVAL
-    await db.flush()
-    await db.refresh(activity)
-    return await get_activity(db, activity.id)
+    return await transition_activity(db, activity, ActivityStatus.PENDING_APPROVAL, user.id)
 
 
-async def start_activity(db: AsyncSession, activity_id: str, user: User) -> ActivityCase:
+async def start_activity(db: AsyncSession, activity_id: str, user: Principal) -> ActivityCase:
     activity = await get_activity(db, activity_id)
     if not activity:
         raise ValueError("Activity not found")
 
-    if activity.status != ActivityStatus.APPROVED:
-        raise ValueError("Activity is not in APPROVED status")
-
     if activity.creator_id != user.id and not _is_admin(user):
         raise PermissionError("Only the creator or ADMIN can start this activity")
 
-    activity.status = ActivityStatus.IN_PROGRESS
-    await db.flush()
-    await db.refresh(activity)
-    return await get_activity(db, activity.id)
+    return await transition_activity(db, activity, ActivityStatus.IN_PROGRESS, user.id)
 
 
 async def list_participants(db: AsyncSession, activity_id: str) -> list[dict]:
@@ -0,0 +1,213 @@
+"""Activity status transitions, applied as guarded UPDATEs."""
+
+from datetime import datetime, timezone
+from typing import Any, Optional, Sequence
+from sqlalchemy import ColumnElement, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.background import PeriodicJob
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.activity import ActivityCase, ActivityStatus
+from app.models.approval import ApprovalAction, ApprovalWorkflow
+from app.services.audit_service import log_action
+from app.services.decision_cache import decision_cache
+
+
+VALID_TRANSITIONS = {
+    ActivityStatus.DRAFT: [ActivityStatus.PENDING_APPROVAL, ActivityStatus.CANCELLED],
+    ActivityStatus.PENDING_APPROVAL: [ActivityStatus.APPROVED, ActivityStatus.REJECTED, ActivityStatus.CANCELLED],
+    ActivityStatus.APPROVED: [ActivityStatus.IN_PROGRESS, ActivityStatus.CANCELLED],
+    ActivityStatus.IN_PROGRESS: [ActivityStatus.COMPLETED, ActivityStatus.CANCELLED],
+    ActivityStatus.REJECTED: [],
+    ActivityStatus.COMPLETED: [],
+    ActivityStatus.CANCELLED: [],
+}
+
+# Audit action of a transition into each status.
+_AUDIT_ACTIONS = {
+    ActivityStatus.PENDING_APPROVAL: "activity:submit",
+    ActivityStatus.APPROVED: "activity:approve",
+    ActivityStatus.REJECTED: "activity:reject",
+    ActivityStatus.IN_PROGRESS: "activity:start",
+    ActivityStatus.COMPLETED: "activity:complete",
+    ActivityStatus.CANCELLED: "activity:delete",
+}
+
+# Transitions that are part of the approval workflow; the others are
+# only audited.
+_WORKFLOW_ACTIONS = {
+    ActivityStatus.PENDING_APPROVAL: ApprovalAction.SUBMITTED,
+    ActivityStatus.APPROVED: ApprovalAction.APPROVED,
+    ActivityStatus.REJECTED: ApprovalAction.REJECTED,
+    ActivityStatus.CANCELLED: ApprovalAction.CANCELLED,
+}
+
+# Activities auto-completed per job run, so one run stays a short transaction.
+AUTOCOMPLETE_BATCH_SIZE = 500
+
+
+class InvalidTransition(ValueError):
+    """Target status cannot be reached from the activity's status."""
+
+
+class ActivityConflict(Exception):
+    """Activity was changed by someone else since it was loaded."""
+
+
+def validate_transition(current: ActivityStatus, target: ActivityStatus) -> bool:
+    """Validate if a state transition is allowed."""
+    return target in VALID_TRANSITIONS.get(current, [])
+
+
+def _check_transition(current: ActivityStatus, target: ActivityStatus) -> None:
+    if not validate_transition(current, target):
+        raise InvalidTransition(f"Activity cannot move from {current.value} to {target.value}")
+
+
+async def _record_transitions(
+    db: AsyncSession,
+    activity_ids: Sequence[str],
+    current: ActivityStatus,
+    target: ActivityStatus,
+    actor_id: Optional[str],
+    comment: Optional[str],
+    audit_values: Optional[dict],
+) -> None:
+    # Added to the session, so they are flushed together, one multi-row
+    # INSERT per table, in the transaction of the status change.
+    now = datetime.now(timezone.utc)
+    workflow_action = _WORKFLOW_ACTIONS.get(target)
+    for activity_id in activity_ids:
+        # Workflow entries need an actor; system transitions are only audited.
+        if workflow_action is not None and actor_id is not None:
+            db.add(
+                ApprovalWorkflow(
+                    activity_id=activity_id,
+                    action=workflow_action,
+                    actor_id=actor_id,
+                    comment=comment,
+                    action_at=now,
+                    previous_status=current,
+                    new_status=target,
+                )
+            )
+        await log_action(
+            db=db,
+            user_id=actor_id,
+            action=_AUDIT_ACTIONS[target],
+            resource_type="activity",
+            resource_id=activity_id,
+            old_values={"status": current.value},
+            new_values={"status": target.value, **(audit_values or {})},
+        )
+        decision_cache.invalidate_resource(activity_id)
+
+
+async def transition_activity(
+    db: AsyncSession,
+    activity: ActivityCase,
+    target: ActivityStatus,
+    actor_id: Optional[str],
+    *,
+    changes: Optional[dict[str, Any]] = None,
+    comment: Optional[str] = None,
+    audit_values: Optional[dict] = None,
+) -> ActivityCase:
+    """Move ``activity`` to ``target`` in the caller's transaction.
+
+    One ``UPDATE ... WHERE id AND status AND version`` applies the status
+    and ``changes`` only if the row is still in the status and version
+    ``activity`` was loaded with; otherwise ActivityConflict is raised and
+    nothing is written. ``activity`` is updated in place from RETURNING.
+    The workflow and audit entries are written with the same flush.
+    """
+    current = ActivityStatus(activity.status)
+    _check_transition(current, target)
+    changes = changes or {}
+
+    row = (
+        await db.execute(
+            update(ActivityCase)
+            .where(
+                (ActivityCase.id == activity.id)
+                & (ActivityCase.status == current)
+                & (ActivityCase.version == activity.version)
+            )
+            .values(status=target, version=ActivityCase.version + 1, **changes)
+            .returning(ActivityCase.version, ActivityCase.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+    ).one_or_none()
+    if row is None:
+        raise ActivityConflict("Activity was changed by another request; reload it and retry")
+
+    for key, value in {**changes, "status": target, "version": row.version, "updated_at": row.updated_at}.items():
+        set_committed_value(activity, key, value)
+    await _record_transitions(db, [activity.id], current, target, actor_id, comment, audit_values)
+    return activity
+
+
+async def transition_activities(
+    db: AsyncSession,
+    criteria: Sequence[ColumnElement[bool]],
+    current: ActivityStatus,
+    target: ActivityStatus,
+    actor_id: Optional[str] = None,
+    *,
+    comment: Optional[str] = None,
+    audit_values: Optional[dict] = None,
+) -> list[str]:
+    """Move every activity in ``current`` that matches ``criteria`` to ``target``.
+
+    One UPDATE for all of them, in the caller's transaction. Rows a
+    concurrent transaction moves out of ``current`` first are skipped.
+    Returns the ids of the activities that were moved.
+    """
+    _check_transition(current, target)
+    activity_ids = list(
+        await db.scalars(
+            update(ActivityCase)
+            .where(ActivityCase.status == current, *criteria)
+            .values(status=target, version=ActivityCase.version + 1)
+            .returning(ActivityCase.id)
+            .execution_options(synchronize_session=False)
+        )
+    )
+    await _record_transitions(db, activity_ids, current, target, actor_id, comment, audit_values)
+    return activity_ids
+
+
+async def complete_ended_activities() -> int:
+    """Complete a batch of IN_PROGRESS activities whose end date has passed.
+
+    Rows locked by another worker's run are skipped. Returns the number
+    of activities completed.
+    """
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        ended = (
+            select(ActivityCase.id)
+            .where((ActivityCase.status == ActivityStatus.IN_PROGRESS) & (ActivityCase.end_date <= now))
+            .limit(AUTOCOMPLETE_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        completed = await transition_activities(
+            db,
+            [ActivityCase.id.in_(ended.scalar_subquery())],
+            ActivityStatus.IN_PROGRESS,
+            ActivityStatus.COMPLETED,
+            audit_values={"reason": "end date passed"},
+        )
+        await db.commit()
+    if completed:
+        print(f"Auto-completed {len(completed)} activities past their end date")
+    return len(completed)
+
+
+activity_autocomplete_job = PeriodicJob(
+    "activity_autocomplete",
+    interval_seconds=settings.ACTIVITY_AUTOCOMPLETE_INTERVAL_SECONDS,
+    func=complete_ended_activities,
+)
@@ -5,15 +5,17 @@ from typing import Optional
 from fastapi import HTTPException, status
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 from app.models.activity import ActivityCase, ActivityStatus
-from app.models.approval import ApprovalWorkflow, ApprovalAction
-from app.services.audit_service import log_action
+from app.services.activity_transitions import ActivityConflict, transition_activity
 
 
 async def get_activity(db: AsyncSession, activity_id: str) -> Optional[ActivityCase]:
     result = await db.execute(
-        select(ActivityCase).where(ActivityCase.id == activity_id)
+        select(ActivityCase)
+        .options(joinedload(ActivityCase.activity_type))
+        .where(ActivityCase.id == activity_id)
     )
     return result.scalar_one_or_none()
 
@@ -34,46 +36,50 @@ def _ensure_not_creator(activity: ActivityCase, user_id: str) -> None:
         )
 
 
-async def approve_activity(
+async def _decide(
     db: AsyncSession,
     activity_id: str,
-    approver_id: str,
-    comment: Optional[str] = None,
+    actor_id: str,
+    target: ActivityStatus,
+    changes: dict,
+    comment: Optional[str],
+    audit_values: Optional[dict] = None,
 ) -> ActivityCase:
     activity = await get_activity(db, activity_id)
     if not activity:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Activity not found")
 
     _ensure_pending(activity)
-    _ensure_not_creator(activity, approver_id)
-
-    activity.status = ActivityStatus.APPROVED
-    activity.approved_by_id = approver_id
-    activity.approved_at = datetime.now(timezone.utc)
-
-    workflow = ApprovalWorkflow(
-        activity_id=activity_id,
-        action=ApprovalAction.APPROVED,
-        actor_id=approver_id,
-        comment=comment,
-        action_at=datetime.now(timezone.utc),
-        previous_status=ActivityStatus.PENDING_APPROVAL,
-        new_status=ActivityStatus.APPROVED,
-    )
-    db.add(workflow)
-
-    await log_action(
-        db=db,
-        user_id=approver_id,
-        action="activity:approve",
-        resource_type="activity",
-        resource_id=activity_id,
-        new_values={"status": ActivityStatus.APPROVED.value},
-    )
+    _ensure_not_creator(activity, actor_id)
+
+    try:
+        return await transition_activity(
+            db,
+            activity,
+            target,
+            actor_id,
+            changes=changes,
+            comment=comment,
+            audit_values=audit_values,
+        )
+    except ActivityConflict as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
 
-    await db.flush()
-    await db.refresh(activity)
-    return activity
+
+async def approve_activity(
+    db: AsyncSession,
+    activity_id: str,
+    approver_id: str,
+    comment: Optional[str] = None,
+) -> ActivityCase:
+    return await _decide(
+        db,
+        activity_id,
+        approver_id,
+        ActivityStatus.APPROVED,
+        {"approved_by_id": approver_id, "approved_at": datetime.now(timezone.utc)},
+        comment,
+    )
 
 
 async def reject_activity(
@@ -82,41 +88,19 @@ async def reject_activity(
     rejector_id: str,
     reason: str,
 ) -> ActivityCase:
-    activity = await get_activity(db, activity_id)
-    if not activity:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Activity not found")
-
-    _ensure_pending(activity)
-    _ensure_not_creator(activity, rejector_id)
-
-    activity.status = ActivityStatus.REJECTED
-    activity.rejected_by_id = rejector_id
-    activity.rejected_at = datetime.now(timezone.utc)
-    activity.rejection_reason = reason
-
-    workflow = ApprovalWorkflow(
-        activity_id=activity_id,
-        action=ApprovalAction.REJECTED,
-        actor_id=rejector_id,
-        comment=reason,
-        action_at=datetime.now(timezone.utc),
-        previous_status=ActivityStatus.PENDING_APPROVAL,
-        new_status=ActivityStatus.REJECTED,
+    return await _decide(
+        db,
+        activity_id,
+        rejector_id,
+        ActivityStatus.REJECTED,
+        {
+            "rejected_by_id": rejector_id,
+            "rejected_at": datetime.now(timezone.utc),
+            "rejection_reason": reason,
+        },
+        reason,
+        audit_values={"reason": reason},
     )
-    db.add(workflow)
-
-    await log_action(
-        db=db,
-        user_id=rejector_id,
-        action="activity:reject",
-        resource_type="activity",
-        resource_id=activity_id,
-        new_values={"status": ActivityStatus.REJECTED.value, "reason": reason},
-    )
-
-    await db.flush()
-    await db.refresh(activity)
-    return activity
 
 
 async def list_pending_approvals(db: AsyncSession, page: int, per_page: int) -> tuple[list[ActivityCase], int]:
@@ -0,0 +1,180 @@
+"""Per-activity attendance counters maintained alongside status changes."""
+
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+from sqlalchemy import event, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.background import PeriodicJob
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.activity import ActivityCase, ActivityStatus
+from app.models.attendance import AttendanceCounter, AttendanceRecord, AttendanceStatus
+
+
+COUNTER_COLUMNS = ("total", "checked_in", "checked_out", "absent")
+
+# Status counted by each per-status column; "total" counts every record.
+_STATUS_COLUMNS = {
+    AttendanceStatus.CHECKED_IN: "checked_in",
+    AttendanceStatus.CHECKED_OUT: "checked_out",
+    AttendanceStatus.ABSENT: "absent",
+}
+
+# Only activities that can still change are reconciled.
+RECONCILE_STATUSES = (ActivityStatus.APPROVED, ActivityStatus.IN_PROGRESS)
+# Counters checked per job run, so one run stays a short transaction.
+RECONCILE_BATCH_SIZE = 200
+
+# (activity_id, previous status or None for a new record, new status)
+Transition = tuple[str, Optional[str], str]
+
+# Deltas written in the current transaction, per activity, for listeners
+# that act once it commits (see pop_committed_deltas).
+_PENDING_DELTAS_KEY = "attendance_counters.pending_deltas"
+
+
+async def record_transitions(db: AsyncSession, transitions: Iterable[Transition]) -> None:
+    """Apply the counter deltas of ``transitions`` in the caller's transaction.
+
+    One ``INSERT ... ON CONFLICT DO UPDATE`` adds the deltas for every
+    activity involved. Call it after the attendance rows themselves have
+    been written, so that a transaction takes the counter row lock last and
+    holds it only until commit.
+    """
+    deltas: dict[str, dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTER_COLUMNS, 0))
+    for activity_id, previous, new in transitions:
+        delta = deltas[activity_id]
+        if previous is None:
+            delta["total"] += 1
+        elif previous in _STATUS_COLUMNS:
+            delta[_STATUS_COLUMNS[previous]] -= 1
+        if new in _STATUS_COLUMNS:
+            delta[_STATUS_COLUMNS[new]] += 1
+
+    rows = [
+        {"activity_id": activity_id, **delta}
+        for activity_id, delta in sorted(deltas.items())
+        if any(delta.values())
+    ]
+    if not rows:
+        return
+    pending = db.info.setdefault(_PENDING_DELTAS_KEY, {})
+    for row in rows:
+        totals = pending.setdefault(row["activity_id"], dict.fromkeys(COUNTER_COLUMNS, 0))
+        for name in COUNTER_COLUMNS:
+            totals[name] += row[name]
+
+    # Rows are sorted so concurrent multi-activity writers lock in one order.
+    statement = pg_insert(AttendanceCounter).values(rows)
+    await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[AttendanceCounter.activity_id],
+            set_={
+                **{
+                    name: getattr(AttendanceCounter, name) + getattr(statement.excluded, name)
+                    for name in COUNTER_COLUMNS
+                },
+                "updated_at": func.now(),
+            },
+        )
+    )
+
+
+def pop_committed_deltas(session: Session) -> dict[str, dict[str, int]]:
+    """Counter deltas of the transaction ``session`` just committed, per activity.
+
+    Meant to be called from an ``after_commit`` listener; each delta is
+    returned once.
+    """
+    return session.info.pop(_PENDING_DELTAS_KEY, {})
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_deltas(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING_DELTAS_KEY, None)
+
+
+async def read_attendance_stats(db: AsyncSession, activity_id: str) -> dict:
+    """Attendance stats of an activity, read from its counter row."""
+    # No row means the activity has no attendance records yet.
+    counter = await db.get(AttendanceCounter, activity_id)
+    total = counter.total if counter else 0
+    checked_in = counter.checked_in if counter else 0
+    checked_out = counter.checked_out if counter else 0
+    absent = counter.absent if counter else 0
+    attendance_rate = round((checked_in / total * 100), 2) if total else 0.0
+
+    return {
+        "activity_id": activity_id,
+        "total_registered": total,
+        "checked_in": checked_in,
+        "checked_out": checked_out,
+        "absent": absent,
+        "attendance_rate": attendance_rate,
+    }
+
+
+def _count_records():
+    return select(
+        AttendanceRecord.activity_id,
+        func.count().label("total"),
+        *(
+            func.count().filter(AttendanceRecord.status == status).label(name)
+            for status, name in _STATUS_COLUMNS.items()
+        ),
+    ).group_by(AttendanceRecord.activity_id)
+
+
+async def reconcile_counters() -> int:
+    """Check a batch of counters against ``attendance_records`` and fix drift.
+
+    Counters are locked before the records are counted. Writers update the
+    counter last in their transaction, so any change not yet visible to
+    the count is applied on top of the corrected value once this commits.
+    Counters are visited least recently reconciled first. Returns the
+    number of counters that had drifted.
+    """
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        counters = (
+            await db.scalars(
+                select(AttendanceCounter)
+                .join(ActivityCase, ActivityCase.id == AttendanceCounter.activity_id)
+                .where(ActivityCase.status.in_(RECONCILE_STATUSES))
+                .order_by(AttendanceCounter.reconciled_at.asc().nulls_first())
+                .limit(RECONCILE_BATCH_SIZE)
+                .with_for_update(of=AttendanceCounter, skip_locked=True)
+            )
+        ).all()
+        if not counters:
+            return 0
+
+        result = await db.execute(
+            _count_records().where(AttendanceRecord.activity_id.in_([c.activity_id for c in counters]))
+        )
+        actual = {row.activity_id: row for row in result}
+
+        drifted = 0
+        for counter in counters:
+            row = actual.get(counter.activity_id)
+            expected = {name: getattr(row, name) if row else 0 for name in COUNTER_COLUMNS}
+            stored = {name: getattr(counter, name) for name in COUNTER_COLUMNS}
+            if stored != expected:
+                drifted += 1
+                print(f"Attendance counters for activity {counter.activity_id} drifted: {stored} -> {expected}")
+                for name, value in expected.items():
+                    setattr(counter, name, value)
+            counter.reconciled_at = now
+        await db.commit()
+    return drifted
+
+
+counter_reconcile_job = PeriodicJob(
+    "attendance_counter_reconcile",
+    interval_seconds=settings.ATTENDANCE_COUNTER_RECONCILE_INTERVAL_SECONDS,
+    func=reconcile_counters,
+)
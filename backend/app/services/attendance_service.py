@@ -1,22 +1,48 @@
 """Attendance service layer."""
 
 from datetime import datetime, timedelta, timezone
-import secrets
+from typing import AsyncIterator, Sequence
 from fastapi import HTTPException, status
-from sqlalchemy import case, func, select
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.pagination import InvalidCursor, after_cursor, cursor_page, decode_cursor
 from app.models.activity import ActivityCase, ActivityStatus
-from app.models.attendance import AttendanceRecord, AttendanceSession, AttendanceStatus, QRCode
-from app.models.user import User
-from app.services.qrcode_service import generate_qr_code, validate_qr_code
+from app.models.attendance import AttendanceRecord, AttendanceSession, AttendanceStatus, GateRotation, QRCode
+from app.services.attendance_counters import read_attendance_stats, record_transitions
+from app.services.attendance_stream import Subscription, attendance_broker
+from app.services.checkin_batcher import checkin_batcher
+from app.services.gate_rotation_service import generate_windows
+from app.services.gate_sync_service import ScanEvent, ScanResult, apply_scan_events
+from app.services.principal_cache import Principal
+from app.services.qrcode_service import generate_qr_code, new_session_token, validate_qr_code
+from app.services.resource_loader import LoadedResources
+from app.services.session_registry import discard_after_commit, lookup_session
 
 
-def _is_admin(user: User) -> bool:
+# Rows fetched per round trip by record exports.
+EXPORT_BATCH_SIZE = 1000
+
+
+def _is_admin(user: Principal) -> bool:
     return any(role.name == "ADMIN" for role in user.roles)
 
 
-async def _get_activity(db: AsyncSession, activity_id: str) -> ActivityCase:
+async def _get_activity(
+    db: AsyncSession,
+    activity_id: str,
+    preloaded: LoadedResources | None = None,
+) -> ActivityCase:
+    if preloaded and preloaded.activity and preloaded.matches(activity_id):
+        if preloaded.activity in db:
+            return preloaded.activity
+        return await db.merge(preloaded.activity, load=False)
+
     result = await db.execute(select(ActivityCase).where(ActivityCase.id == activity_id))
     activity = result.scalar_one_or_none()
     if not activity:
@@ -24,45 +50,126 @@ async def _get_activity(db: AsyncSession, activity_id: str) -> ActivityCase:
     return activity
 
 
+async def _get_attendance(
+    db: AsyncSession,
+    activity_id: str,
+    user_id: str,
+    preloaded: LoadedResources | None = None,
+) -> AttendanceRecord | None:
+    if preloaded and preloaded.matches(activity_id, user_id):
+        if preloaded.attendance is None or preloaded.attendance in db:
+            return preloaded.attendance
+        return await db.merge(preloaded.attendance, load=False)
+
+    result = await db.execute(
+        select(AttendanceRecord).where(
+            (AttendanceRecord.activity_id == activity_id) & (AttendanceRecord.user_id == user_id)
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+async def _insert_registration(
+    db: AsyncSession,
+    activity_id: str,
+    user_id: str,
+    notes: str | None = None,
+) -> AttendanceRecord | None:
+    """Insert a REGISTERED record; None if the user already has one."""
+    result = await db.scalars(
+        pg_insert(AttendanceRecord)
+        .values(
+            activity_id=activity_id,
+            user_id=user_id,
+            status=AttendanceStatus.REGISTERED,
+            registered_at=datetime.now(timezone.utc),
+            notes=notes,
+            location_verified=False,
+        )
+        .on_conflict_do_nothing(constraint="uq_attendance_activity_user")
+        .returning(AttendanceRecord)
+    )
+    return result.one_or_none()
+
+
+async def _reserve_seat(db: AsyncSession, activity: ActivityCase) -> None:
+    """Take one seat with a single conditional UPDATE, or raise if full.
+
+    The capacity check and increment happen in the database, so concurrent
+    registrations neither lose updates nor trip check_participants_limit.
+    """
+    result = await db.execute(
+        update(ActivityCase)
+        .where(
+            (ActivityCase.id == activity.id)
+            & (ActivityCase.current_participants < ActivityCase.max_participants)
+        )
+        .values(current_participants=ActivityCase.current_participants + 1)
+        .returning(ActivityCase.current_participants)
+        .execution_options(synchronize_session=False)
+    )
+    reserved = result.scalar_one_or_none()
+    if reserved is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Activity is full")
+    set_committed_value(activity, "current_participants", reserved)
+
+
+async def _update_attendance(db: AsyncSession, attendance: AttendanceRecord, **values) -> None:
+    """Apply ``values`` with a single UPDATE guarded on the loaded status.
+
+    Concurrent scans of the same record can only move it out of that
+    status once, so the counter transition the caller records afterwards
+    is applied exactly once; the scan that lost the race gets a 409.
+    """
+    row = (
+        await db.execute(
+            update(AttendanceRecord)
+            .where((AttendanceRecord.id == attendance.id) & (AttendanceRecord.status == attendance.status))
+            .values(**values)
+            .returning(AttendanceRecord.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+    ).one_or_none()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Attendance record was changed by another request"
+        )
+    for key, value in {**values, "updated_at": row.updated_at}.items():
+        set_committed_value(attendance, key, value)
+
+
 async def register_for_activity(
     db: AsyncSession,
     activity_id: str,
-    user: User,
+    user: Principal,
     notes: str | None = None,
+    preloaded: LoadedResources | None = None,
 ) -> AttendanceRecord:
-    activity = await _get_activity(db, activity_id)
+    activity = await _get_activity(db, activity_id, preloaded)
 
     if activity.status not in [ActivityStatus.APPROVED, ActivityStatus.IN_PROGRESS]:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Activity is not open for registration")
 
-    existing = await db.execute(
-        select(AttendanceRecord).where(
-            (AttendanceRecord.activity_id == activity_id) & (AttendanceRecord.user_id == user.id)
-        )
-    )
-    if existing.scalar_one_or_none():
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Already registered")
-
     if activity.current_participants >= activity.max_participants:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Activity is full")
 
-    record = AttendanceRecord(
-        activity_id=activity_id,
-        user_id=user.id,
-        status=AttendanceStatus.REGISTERED,
-        registered_at=datetime.now(timezone.utc),
-        notes=notes,
-        location_verified=False,
-    )
+    record = await _insert_registration(db, activity_id, user.id, notes)
+    if record is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Already registered")
 
-    activity.current_participants += 1
-    db.add(record)
-    await db.flush()
-    await db.refresh(record)
+    # Raising here rolls back the insert above with the request transaction.
+    await _reserve_seat(db, activity)
+    await record_transitions(db, [(activity_id, None, AttendanceStatus.REGISTERED)])
     return record
 
 
-async def check_in(db: AsyncSession, user: User, qr_code: str, notes: str | None = None) -> AttendanceRecord:
+async def check_in(
+    db: AsyncSession,
+    user: Principal,
+    qr_code: str,
+    notes: str | None = None,
+    preloaded: LoadedResources | None = None,
+) -> AttendanceRecord:
     payload = validate_qr_code(qr_code)
     activity_id = payload.get("event_id") or payload.get("activity_id")
     gate_id = payload.get("gate_id")
@@ -70,41 +177,26 @@ async def check_in(db: AsyncSession, user: User, qr_code: str, notes: str | None
     if not activity_id or not gate_id or not session_token:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid QR code payload")
 
-    activity = await _get_activity(db, activity_id)
+    activity = await _get_activity(db, activity_id, preloaded)
     if activity.status != ActivityStatus.IN_PROGRESS:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Activity is not currently in progress")
 
-    session_result = await db.execute(
-        select(AttendanceSession).where(
-            (AttendanceSession.session_token == session_token)
-            & (AttendanceSession.activity_id == activity_id)
-            & (AttendanceSession.gate_id == gate_id)
-            & (AttendanceSession.expires_at >= datetime.now(timezone.utc))
-        )
-    )
-    session = session_result.scalar_one_or_none()
+    session = await lookup_session(db, session_token, activity_id, gate_id)
     if not session:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="QR code has expired")
 
-    record = await db.execute(
-        select(AttendanceRecord).where(
-            (AttendanceRecord.activity_id == activity_id) & (AttendanceRecord.user_id == user.id)
-        )
-    )
-    attendance = record.scalar_one_or_none()
+    attendance = await _get_attendance(db, activity_id, user.id, preloaded)
+    registered_now = False
     if not attendance:
         if activity.current_participants >= activity.max_participants:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Activity is full")
-        attendance = AttendanceRecord(
-            activity_id=activity_id,
-            user_id=user.id,
-            status=AttendanceStatus.REGISTERED,
-            registered_at=datetime.now(timezone.utc),
-            location_verified=False,
-        )
-        activity.current_participants += 1
-        db.add(attendance)
-        await db.flush()
+        attendance = await _insert_registration(db, activity_id, user.id)
+        if attendance is None:
+            # Registered concurrently since the lookup above.
+            attendance = await _get_attendance(db, activity_id, user.id)
+        else:
+            await _reserve_seat(db, activity)
+            registered_now = True
 
     if attendance.status == AttendanceStatus.CANCELLED:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Registration is cancelled")
@@ -112,90 +204,159 @@ async def check_in(db: AsyncSession, user: User, qr_code: str, notes: str | None
     if attendance.status in [AttendanceStatus.CHECKED_IN, AttendanceStatus.CHECKED_OUT]:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Already checked in")
 
-    attendance.status = AttendanceStatus.CHECKED_IN
-    attendance.checked_in_at = datetime.now(timezone.utc)
-    attendance.qr_code_used = qr_code
-    attendance.check_in_method = "QR"
-    attendance.check_in_gate_id = gate_id
-    attendance.notes = notes
-
-    await db.flush()
-    await db.refresh(attendance)
+    if settings.CHECKIN_BATCH_ENABLED and not registered_now and attendance.status == AttendanceStatus.REGISTERED:
+        # The batcher only checks in REGISTERED records; other statuses
+        # (e.g. ABSENT) and walk-in registrations above stay on this
+        # request's transaction.
+        # Nothing has been written on this session, so end its read-only
+        # transaction and hand the connection back to the pool for the
+        # batch writer instead of holding it while the batch is pending.
+        await db.commit()
+        record = await checkin_batcher.submit(
+            attendance.id,
+            checked_in_at=datetime.now(timezone.utc),
+            gate_id=gate_id,
+            qr_code=qr_code,
+            notes=notes,
+        )
+        if record is None:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Already checked in")
+        return record
+
+    previous_status = None if registered_now else attendance.status
+    await _update_attendance(
+        db,
+        attendance,
+        status=AttendanceStatus.CHECKED_IN,
+        checked_in_at=datetime.now(timezone.utc),
+        qr_code_used=qr_code,
+        check_in_method="QR",
+        check_in_gate_id=gate_id,
+        notes=notes,
+    )
+    await record_transitions(db, [(activity_id, previous_status, AttendanceStatus.CHECKED_IN)])
     return attendance
 
 
-async def check_out(db: AsyncSession, user: User, qr_code: str, notes: str | None = None) -> AttendanceRecord:
+async def check_out(
+    db: AsyncSession,
+    user: Principal,
+    qr_code: str,
+    notes: str | None = None,
+    preloaded: LoadedResources | None = None,
+) -> AttendanceRecord:
     payload = validate_qr_code(qr_code)
     activity_id = payload.get("event_id") or payload.get("activity_id")
     if not activity_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid QR code payload")
 
-    record = await db.execute(
-        select(AttendanceRecord).where(
-            (AttendanceRecord.activity_id == activity_id) & (AttendanceRecord.user_id == user.id)
-        )
-    )
-    attendance = record.scalar_one_or_none()
+    attendance = await _get_attendance(db, activity_id, user.id, preloaded)
     if not attendance:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Attendance record not found")
 
     if attendance.status != AttendanceStatus.CHECKED_IN:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User is not checked in")
 
-    attendance.status = AttendanceStatus.CHECKED_OUT
-    attendance.checked_out_at = datetime.now(timezone.utc)
-    attendance.notes = notes
-
-    await db.flush()
-    await db.refresh(attendance)
+    await _update_attendance(
+        db,
+        attendance,
+        status=AttendanceStatus.CHECKED_OUT,
+        checked_out_at=datetime.now(timezone.utc),
+        notes=notes,
+    )
+    await record_transitions(
+        db, [(activity_id, AttendanceStatus.CHECKED_IN, AttendanceStatus.CHECKED_OUT)]
+    )
     return attendance
 
 
-async def get_attendance_records(db: AsyncSession, activity_id: str) -> list[AttendanceRecord]:
-    await _get_activity(db, activity_id)
-    result = await db.execute(
-        select(AttendanceRecord).where(AttendanceRecord.activity_id == activity_id)
+async def get_attendance_records(
+    db: AsyncSession,
+    activity_id: str,
+    limit: int,
+    cursor: str | None = None,
+    preloaded: LoadedResources | None = None,
+) -> tuple[list[AttendanceRecord], str | None]:
+    """One page of an activity's records in registration order, and the next cursor."""
+    await _get_activity(db, activity_id, preloaded)
+
+    sort_key = (AttendanceRecord.registered_at, AttendanceRecord.id)
+    query = (
+        select(AttendanceRecord)
+        .where(AttendanceRecord.activity_id == activity_id)
+        .order_by(*sort_key)
+        .limit(limit + 1)
     )
-    return result.scalars().all()
+    if cursor:
+        try:
+            position = decode_cursor(cursor, (datetime, str))
+        except InvalidCursor as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from exc
+        query = query.where(after_cursor(sort_key, position))
 
+    records = (await db.scalars(query)).all()
+    return cursor_page(records, limit, lambda record: (record.registered_at, record.id))
 
-async def get_attendance_stats(db: AsyncSession, activity_id: str) -> dict:
-    await _get_activity(db, activity_id)
 
-    result = await db.execute(
-        select(
-            func.count().label("total"),
-            func.sum(case((AttendanceRecord.status == AttendanceStatus.CHECKED_IN, 1), else_=0)).label("checked_in"),
-            func.sum(case((AttendanceRecord.status == AttendanceStatus.CHECKED_OUT, 1), else_=0)).label("checked_out"),
-            func.sum(case((AttendanceRecord.status == AttendanceStatus.ABSENT, 1), else_=0)).label("absent"),
-        ).where(AttendanceRecord.activity_id == activity_id)
-    )
-    stats = result.one()
-    total = stats.total or 0
-    checked_in = stats.checked_in or 0
-    checked_out = stats.checked_out or 0
-    absent = stats.absent or 0
-    attendance_rate = round((checked_in / total * 100), 2) if total else 0.0
-
-    return {
-        "activity_id": activity_id,
-        "total_registered": total,
-        "checked_in": checked_in,
-        "checked_out": checked_out,
-        "absent": absent,
-        "attendance_rate": attendance_rate,
-    }
+async def export_attendance_records(
+    db: AsyncSession,
+    activity_id: str,
+    preloaded: LoadedResources | None = None,
+) -> AsyncIterator[Sequence[AttendanceRecord]]:
+    """Batches of every record of an activity, read through a server-side cursor.
+
+    The activity is checked here, before a response starts. The returned
+    iterator uses its own session, so the export neither depends on nor
+    holds the request's connection.
+    """
+    await _get_activity(db, activity_id, preloaded)
+    await db.commit()
+    return _stream_attendance_records(activity_id)
+
+
+async def _stream_attendance_records(activity_id: str) -> AsyncIterator[Sequence[AttendanceRecord]]:
+    async with AsyncSessionLocal() as session:
+        result = await session.stream_scalars(
+            select(AttendanceRecord)
+            .where(AttendanceRecord.activity_id == activity_id)
+            .order_by(AttendanceRecord.registered_at, AttendanceRecord.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for batch in result.partitions():
+            yield batch
+
+
+async def get_attendance_stats(
+    db: AsyncSession,
+    activity_id: str,
+    preloaded: LoadedResources | None = None,
+) -> dict:
+    await _get_activity(db, activity_id, preloaded)
+
+    return await read_attendance_stats(db, activity_id)
+
+
+async def subscribe_attendance(
+    db: AsyncSession,
+    activity_id: str,
+    preloaded: LoadedResources | None = None,
+) -> Subscription:
+    await _get_activity(db, activity_id, preloaded)
+    # End the read-only transaction so a long-lived stream holds no connection.
+    await db.commit()
+    return attendance_broker.subscribe(activity_id)
 
 
 async def generate_activity_qr(
     db: AsyncSession,
     activity_id: str,
-    user: User,
+    user: Principal,
     code_type: str,
     max_uses: int | None,
     gate_id: str,
+    preloaded: LoadedResources | None = None,
 ) -> QRCode:
-    activity = await _get_activity(db, activity_id)
+    activity = await _get_activity(db, activity_id, preloaded)
 
     if activity.creator_id != user.id and not _is_admin(user):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to generate QR codes")
@@ -204,7 +365,7 @@ async def generate_activity_qr(
 
     now = datetime.now(timezone.utc)
     expires_at = now + timedelta(seconds=60)
-    session_token = secrets.token_hex(32)
+    session_token = new_session_token()
     jwt_string = generate_qr_code(activity_id, gate_id, session_token, code_type, expires_at)
 
     session = AttendanceSession(
@@ -233,6 +394,134 @@ async def generate_activity_qr(
     return qr
 
 
+async def register_gate(
+    db: AsyncSession,
+    activity_id: str,
+    gate_id: str,
+    user: Principal,
+    code_type: str,
+    window_seconds: int | None = None,
+    windows_ahead: int | None = None,
+    preloaded: LoadedResources | None = None,
+) -> GateRotation:
+    activity = await _get_activity(db, activity_id, preloaded)
+
+    if activity.creator_id != user.id and not _is_admin(user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to manage gates")
+    if activity.status != ActivityStatus.IN_PROGRESS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Activity is not in progress")
+
+    result = await db.execute(
+        select(GateRotation)
+        .where((GateRotation.activity_id == activity_id) & (GateRotation.gate_id == gate_id))
+        .with_for_update()
+    )
+    rotation = result.scalar_one_or_none()
+    if rotation and rotation.is_active:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Gate is already registered")
+
+    now = datetime.now(timezone.utc)
+    if rotation is None:
+        rotation = GateRotation(activity_id=activity_id, gate_id=gate_id)
+        db.add(rotation)
+    rotation.code_type = code_type
+    rotation.window_seconds = window_seconds or settings.GATE_ROTATION_WINDOW_SECONDS
+    rotation.windows_ahead = windows_ahead or settings.GATE_ROTATION_WINDOWS_AHEAD
+    rotation.generated_until = now
+    rotation.is_active = True
+    rotation.created_by_id = user.id
+    generate_windows(db, rotation, now, rotation.windows_ahead)
+
+    try:
+        await db.flush()
+    except IntegrityError as exc:
+        # Registered concurrently since the lookup above.
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Gate is already registered") from exc
+    return rotation
+
+
+async def get_current_gate_code(db: AsyncSession, activity_id: str, gate_id: str) -> QRCode:
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        select(QRCode)
+        .where(
+            (QRCode.activity_id == activity_id)
+            & (QRCode.gate_id == gate_id)
+            & (QRCode.valid_from <= now)
+            & (QRCode.valid_until > now)
+            & QRCode.is_active.is_(True)
+        )
+        .order_by(QRCode.valid_from.desc())
+        .limit(1)
+    )
+    qr = result.scalar_one_or_none()
+    if not qr:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No current QR code for this gate")
+    return qr
+
+
+async def close_gate(
+    db: AsyncSession,
+    activity_id: str,
+    gate_id: str,
+    user: Principal,
+    preloaded: LoadedResources | None = None,
+) -> GateRotation:
+    activity = await _get_activity(db, activity_id, preloaded)
+    if activity.creator_id != user.id and not _is_admin(user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to manage gates")
+
+    result = await db.execute(
+        select(GateRotation).where((GateRotation.activity_id == activity_id) & (GateRotation.gate_id == gate_id))
+    )
+    rotation = result.scalar_one_or_none()
+    if not rotation or not rotation.is_active:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Gate is not registered")
+
+    # Revoke the current and all pre-generated windows of this gate.
+    now = datetime.now(timezone.utc)
+    rotation.is_active = False
+    await db.execute(
+        update(QRCode)
+        .where((QRCode.activity_id == activity_id) & (QRCode.gate_id == gate_id) & (QRCode.valid_until > now))
+        .values(is_active=False)
+        .execution_options(synchronize_session=False)
+    )
+    revoked = await db.scalars(
+        delete(AttendanceSession)
+        .where(
+            (AttendanceSession.activity_id == activity_id)
+            & (AttendanceSession.gate_id == gate_id)
+            & (AttendanceSession.expires_at > now)
+        )
+        .returning(AttendanceSession.session_token)
+        .execution_options(synchronize_session=False)
+    )
+    # Other workers' registries keep the revoked tokens for at most
+    # SESSION_REGISTRY_TTL_SECONDS, then find them gone from the table.
+    discard_after_commit(db, list(revoked))
+    await db.flush()
+    return rotation
+
+
+async def sync_gate_scans(
+    db: AsyncSession,
+    activity_id: str,
+    user: Principal,
+    events: list[ScanEvent],
+    preloaded: LoadedResources | None = None,
+) -> list[ScanResult]:
+    activity = await _get_activity(db, activity_id, preloaded)
+
+    if activity.creator_id != user.id and not _is_admin(user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to sync gate scans")
+    # Uploads may arrive after the activity has ended.
+    if activity.status not in (ActivityStatus.IN_PROGRESS, ActivityStatus.COMPLETED):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Activity has not started")
+
+    return await apply_scan_events(db, activity, events)
+
+
 async def validate_qr(db: AsyncSession, qr_code: str) -> QRCode:
     result = await db.execute(select(QRCode).where(QRCode.code == qr_code))
     qr = result.scalar_one_or_none()
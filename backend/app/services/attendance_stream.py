@@ -0,0 +1,133 @@
+"""In-process fan-out of live attendance updates to stream subscribers."""
+
+import asyncio
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.background import PeriodicJob
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.services.attendance_counters import pop_committed_deltas, read_attendance_stats
+
+
+# (event name, data); None tells a subscriber the broker is closing.
+StreamEvent = Optional[tuple[str, dict]]
+
+
+@dataclass(eq=False)
+class Subscription:
+    """One subscriber's bounded queue of events for an activity."""
+    activity_id: str
+    queue: asyncio.Queue = field(repr=False)
+    dropped: int = 0
+
+    async def get(self) -> StreamEvent:
+        return await self.queue.get()
+
+    def put(self, item: StreamEvent) -> None:
+        # A subscriber that falls behind loses its oldest events; the next
+        # snapshot brings it back in line.
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(item)
+
+
+@dataclass(eq=False)
+class _Channel:
+    subscribers: set[Subscription] = field(default_factory=set)
+    producer: Optional[PeriodicJob] = None
+    snapshot: Optional[dict] = None
+
+
+class AttendanceBroker:
+    """Publish attendance deltas and stat snapshots to every subscriber of an activity.
+
+    Deltas are published by this process's writers once their transaction
+    commits. Snapshots come from one producer per activity with at least
+    one subscriber, which reads the counter row every
+    ``snapshot_interval`` seconds, so the database load of a stream does
+    not grow with its number of viewers. Snapshots are read from the
+    database and therefore also reflect writes made by other workers.
+    """
+
+    def __init__(self, snapshot_interval: float, queue_size: int) -> None:
+        self.snapshot_interval = snapshot_interval
+        self.queue_size = queue_size
+        self.published = 0
+        self._channels: dict[str, _Channel] = {}
+
+    def subscribe(self, activity_id: str) -> Subscription:
+        subscription = Subscription(activity_id, asyncio.Queue(maxsize=self.queue_size))
+        channel = self._channels.get(activity_id)
+        if channel is None:
+            channel = self._channels[activity_id] = _Channel()
+            channel.producer = PeriodicJob(
+                f"attendance_stream:{activity_id}",
+                interval_seconds=self.snapshot_interval,
+                func=partial(self._publish_snapshot, activity_id),
+            )
+            channel.producer.start()
+        elif channel.snapshot is not None:
+            subscription.put(("snapshot", channel.snapshot))
+        channel.subscribers.add(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        channel = self._channels.get(subscription.activity_id)
+        if channel is None:
+            return
+        channel.subscribers.discard(subscription)
+        if not channel.subscribers:
+            del self._channels[subscription.activity_id]
+            await channel.producer.stop()
+
+    def publish(self, activity_id: str, event_name: str, data: dict) -> None:
+        channel = self._channels.get(activity_id)
+        if channel is None:
+            return
+        if event_name == "snapshot":
+            channel.snapshot = data
+        self.published += 1
+        for subscription in channel.subscribers:
+            subscription.put((event_name, data))
+
+    async def _publish_snapshot(self, activity_id: str) -> None:
+        async with AsyncSessionLocal() as db:
+            snapshot = await read_attendance_stats(db, activity_id)
+        self.publish(activity_id, "snapshot", snapshot)
+
+    async def close(self) -> None:
+        """Stop every producer and end every subscriber's stream."""
+        channels, self._channels = self._channels, {}
+        for channel in channels.values():
+            await channel.producer.stop()
+            for subscription in channel.subscribers:
+                subscription.put(None)
+
+    def stats(self) -> dict:
+        return {
+            "channels": len(self._channels),
+            "subscribers": sum(len(channel.subscribers) for channel in self._channels.values()),
+            "published": self.published,
+            "dropped": sum(
+                subscription.dropped
+                for channel in self._channels.values()
+                for subscription in channel.subscribers
+            ),
+        }
+
+
+attendance_broker = AttendanceBroker(
+    snapshot_interval=settings.ATTENDANCE_STREAM_SNAPSHOT_SECONDS,
+    queue_size=settings.ATTENDANCE_STREAM_QUEUE_SIZE,
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_deltas(session: Session) -> None:
+    for activity_id, delta in pop_committed_deltas(session).items():
+        attendance_broker.publish(activity_id, "delta", {"activity_id": activity_id, **delta})
@@ -0,0 +1,158 @@
+"""Write batching for gate check-ins."""
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import DateTime, String, Text, column, update, values
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.attendance import AttendanceRecord, AttendanceStatus
+from app.services.attendance_counters import record_transitions
+
+
+@dataclass
+class _PendingCheckIn:
+    attendance_id: str
+    checked_in_at: datetime
+    gate_id: str
+    qr_code: str
+    notes: Optional[str]
+    future: asyncio.Future = field(repr=False)
+
+
+class CheckInBatcher:
+    """Coalesce check-ins of existing REGISTERED records into one UPDATE.
+
+    Callers ``await submit(...)`` and get back their own updated record, or
+    None if the record was no longer REGISTERED when the batch ran. A batch
+    is written when ``max_size`` items are queued or ``max_delay_ms`` after
+    the first one, whichever comes first, using its own session and a single
+    ``UPDATE ... FROM (VALUES ...) RETURNING``, one counter upsert and one
+    commit.
+    """
+
+    def __init__(self, max_size: int, max_delay_ms: float) -> None:
+        self.max_size = max_size
+        self.max_delay = max_delay_ms / 1000
+        self.batches = 0
+        self.items = 0
+        self._pending: list[_PendingCheckIn] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(
+        self,
+        attendance_id: str,
+        checked_in_at: datetime,
+        gate_id: str,
+        qr_code: str,
+        notes: Optional[str] = None,
+    ) -> Optional[AttendanceRecord]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(
+            _PendingCheckIn(attendance_id, checked_in_at, gate_id, qr_code, notes, future)
+        )
+        if len(self._pending) >= self.max_size:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush_now)
+        return await future
+
+    def _flush_now(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._write(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _write(self, batch: list[_PendingCheckIn]) -> None:
+        # A record submitted twice in one batch is only updated once; the
+        # later submission sees it as no longer REGISTERED.
+        unique: dict[str, _PendingCheckIn] = {}
+        for item in batch:
+            unique.setdefault(item.attendance_id, item)
+
+        rows = values(
+            column("id", String),
+            column("checked_in_at", DateTime(timezone=True)),
+            column("gate_id", String),
+            column("qr_code", Text),
+            column("notes", Text),
+            name="batch",
+        ).data([
+            (item.attendance_id, item.checked_in_at, item.gate_id, item.qr_code, item.notes)
+            for item in unique.values()
+        ])
+        statement = (
+            update(AttendanceRecord)
+            .where(
+                (AttendanceRecord.id == rows.c.id)
+                & (AttendanceRecord.status == AttendanceStatus.REGISTERED)
+            )
+            .values(
+                status=AttendanceStatus.CHECKED_IN,
+                checked_in_at=rows.c.checked_in_at,
+                qr_code_used=rows.c.qr_code,
+                check_in_method="QR",
+                check_in_gate_id=rows.c.gate_id,
+                notes=rows.c.notes,
+            )
+            .returning(AttendanceRecord)
+            .execution_options(synchronize_session=False)
+        )
+
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.scalars(statement)
+                updated = {record.id: record for record in result.all()}
+                await record_transitions(
+                    session,
+                    [
+                        (record.activity_id, AttendanceStatus.REGISTERED, AttendanceStatus.CHECKED_IN)
+                        for record in updated.values()
+                    ],
+                )
+                await session.commit()
+        except Exception as exc:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(exc)
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        for item in batch:
+            if item.future.done():
+                continue
+            if unique[item.attendance_id] is item:
+                item.future.set_result(updated.get(item.attendance_id))
+            else:
+                item.future.set_result(None)
+
+    async def close(self) -> None:
+        """Write anything still queued and wait for in-flight batches."""
+        self._flush_now()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.CHECKIN_BATCH_ENABLED,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "pending": len(self._pending),
+        }
+
+
+checkin_batcher = CheckInBatcher(
+    max_size=settings.CHECKIN_BATCH_MAX_SIZE,
+    max_delay_ms=settings.CHECKIN_BATCH_MAX_DELAY_MS,
+)
@@ -0,0 +1,62 @@
+"""Cache of list totals keyed by the list's filters."""
+
+from collections import OrderedDict
+import time
+from typing import Hashable, Optional
+
+from app.core.config import settings
+
+
+class CountCache:
+    """Bounded LRU of row counts with a per-entry TTL.
+
+    Entries are never invalidated, only aged out, so a cached total may be
+    up to ``ttl_seconds`` behind the table. It backs the ``cached`` count
+    mode of list endpoints, which trades that staleness for not counting
+    on every page request.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[int, float]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[int]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        count, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return count
+
+    def set(self, key: Hashable, count: int) -> None:
+        self._entries[key] = (count, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+activity_count_cache = CountCache(
+    max_size=settings.ACTIVITY_COUNT_CACHE_MAX_SIZE,
+    ttl_seconds=settings.ACTIVITY_COUNT_CACHE_TTL_SECONDS,
+)
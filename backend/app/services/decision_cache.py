@@ -0,0 +1,133 @@
+"""In-process TTL + LRU cache for PEP policy decisions."""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+import time
+from typing import TYPE_CHECKING, Hashable, Optional
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from app.services.opa_client import PolicyDecision, PolicyInput
+
+
+# Input fields read by the Rego policies under policy/policies. Anything else
+# (timestamps, user agent, IP address) is volatile and left out of the key.
+# Keep these in sync when a policy starts reading a new attribute.
+SUBJECT_KEY_FIELDS = ("role",)
+RESOURCE_KEY_FIELDS = ("id", "status", "activity_status")
+CONTEXT_KEY_FIELDS = ("is_checked_in", "is_participant")
+
+
+def _pick(data: dict, fields: tuple[str, ...]) -> tuple:
+    return tuple(data.get(field) for field in fields)
+
+
+def decision_key(policy_input: "PolicyInput") -> Hashable:
+    """Build the canonical cache key for a policy input.
+
+    The policies only compare ``subject.id`` against ``resource.creator_id``,
+    so the subject id is folded into an ``is_creator`` flag. This lets every
+    non-creator with the same role share one cached decision per resource.
+    """
+    subject = policy_input.subject or {}
+    resource = policy_input.resource or {}
+    context = policy_input.context or {}
+
+    is_creator = None
+    if "creator_id" in resource:
+        is_creator = subject.get("id") == resource["creator_id"]
+
+    return (
+        policy_input.action,
+        _pick(subject, SUBJECT_KEY_FIELDS),
+        is_creator,
+        _pick(resource, RESOURCE_KEY_FIELDS),
+        _pick(context, CONTEXT_KEY_FIELDS),
+    )
+
+
+@dataclass
+class _CacheEntry:
+    decision: "PolicyDecision"
+    expires_at: float
+    resource_id: Optional[str]
+
+
+class DecisionCache:
+    """Bounded LRU of policy decisions with a per-entry TTL."""
+
+    def __init__(self, max_size: int, ttl_seconds: float) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, _CacheEntry] = OrderedDict()
+        self._by_resource: dict[str, set[Hashable]] = {}
+
+    def get(self, policy_input: "PolicyInput") -> Optional["PolicyDecision"]:
+        key = decision_key(policy_input)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.decision
+
+    def set(self, policy_input: "PolicyInput", decision: "PolicyDecision") -> None:
+        key = decision_key(policy_input)
+        resource_id = (policy_input.resource or {}).get("id")
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _CacheEntry(
+            decision=decision,
+            expires_at=time.monotonic() + self.ttl_seconds,
+            resource_id=resource_id,
+        )
+        if resource_id is not None:
+            self._by_resource.setdefault(resource_id, set()).add(key)
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate_resource(self, resource_id: str) -> None:
+        """Drop every cached decision about the given resource."""
+        for key in self._by_resource.pop(resource_id, set()):
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_resource.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None or entry.resource_id is None:
+            return
+        keys = self._by_resource.get(entry.resource_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_resource[entry.resource_id]
+
+
+decision_cache = DecisionCache(
+    max_size=settings.POLICY_CACHE_MAX_SIZE,
+    ttl_seconds=settings.POLICY_CACHE_TTL_SECONDS,
+)
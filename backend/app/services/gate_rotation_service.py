@@ -0,0 +1,132 @@
+"""Pre-generation of rotating gate QR code windows."""
+
+from datetime import datetime, timedelta, timezone
+import math
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.background import PeriodicJob
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.activity import ActivityCase, ActivityStatus
+from app.models.attendance import AttendanceSession, GateRotation, QRCode
+from app.services.qrcode_service import generate_qr_code, new_session_token
+
+
+# Rotations topped up per job run, so one run stays a short transaction.
+TOP_UP_BATCH_SIZE = 200
+
+
+def generate_windows(
+    db: AsyncSession,
+    rotation: GateRotation,
+    start: datetime,
+    count: int,
+) -> list[QRCode]:
+    """Add ``count`` consecutive windows starting at ``start`` to the session.
+
+    Each window gets its own session token and QR code, valid from the
+    window's start (the JWT ``nbf``) to its end. The rows are inserted in
+    one batch per table on the next flush.
+    """
+    window = timedelta(seconds=rotation.window_seconds)
+    sessions: list[AttendanceSession] = []
+    codes: list[QRCode] = []
+    for index in range(count):
+        valid_from = start + index * window
+        valid_until = valid_from + window
+        session_token = new_session_token()
+        sessions.append(
+            AttendanceSession(
+                activity_id=rotation.activity_id,
+                gate_id=rotation.gate_id,
+                session_token=session_token,
+                expires_at=valid_until,
+            )
+        )
+        codes.append(
+            QRCode(
+                activity_id=rotation.activity_id,
+                code=generate_qr_code(
+                    rotation.activity_id,
+                    rotation.gate_id,
+                    session_token,
+                    rotation.code_type,
+                    valid_until,
+                    not_before=valid_from,
+                ),
+                valid_from=valid_from,
+                valid_until=valid_until,
+                is_active=True,
+                max_uses=None,
+                current_uses=0,
+                code_type=rotation.code_type,
+                generated_by_id=rotation.created_by_id,
+                gate_id=rotation.gate_id,
+                session_token=session_token,
+            )
+        )
+    db.add_all(sessions)
+    db.add_all(codes)
+    if count:
+        rotation.generated_until = start + count * window
+    return codes
+
+
+def windows_needed(rotation: GateRotation, now: datetime) -> tuple[datetime, int]:
+    """Start and number of windows that bring ``rotation`` back to its full lead."""
+    start = max(rotation.generated_until, now)
+    horizon = now + timedelta(seconds=rotation.window_seconds * rotation.windows_ahead)
+    count = math.ceil((horizon - start).total_seconds() / rotation.window_seconds)
+    return start, max(count, 0)
+
+
+async def top_up_rotations() -> int:
+    """Extend every active rotation that has used up half of its lead.
+
+    Due rotations are locked with ``FOR UPDATE SKIP LOCKED``, so several
+    workers can run this job at once without generating the same window
+    twice. Rotations of activities that are no longer IN_PROGRESS are
+    deactivated. Returns the number of windows generated.
+    """
+    now = datetime.now(timezone.utc)
+    half_lead = func.make_interval(
+        0, 0, 0, 0, 0, 0, GateRotation.window_seconds * GateRotation.windows_ahead / 2
+    )
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(GateRotation)
+            .where(
+                GateRotation.is_active.is_(True)
+                & GateRotation.activity_id.in_(
+                    select(ActivityCase.id).where(ActivityCase.status != ActivityStatus.IN_PROGRESS)
+                )
+            )
+            .values(is_active=False)
+            .execution_options(synchronize_session=False)
+        )
+
+        result = await db.scalars(
+            select(GateRotation)
+            .where(
+                GateRotation.is_active.is_(True)
+                & (GateRotation.generated_until < now + half_lead)
+            )
+            .order_by(GateRotation.generated_until)
+            .limit(TOP_UP_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        generated = 0
+        for rotation in result.all():
+            start, count = windows_needed(rotation, now)
+            generate_windows(db, rotation, start, count)
+            generated += count
+        await db.commit()
+    return generated
+
+
+gate_rotation_job = PeriodicJob(
+    "gate_rotation_top_up",
+    interval_seconds=settings.GATE_ROTATION_TOPUP_INTERVAL_SECONDS,
+    func=top_up_rotations,
+)
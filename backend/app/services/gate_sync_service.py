@@ -0,0 +1,323 @@
+"""Bulk reconciliation of gate scans collected while offline."""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+import hashlib
+import hmac
+from typing import Optional
+from uuid import uuid4
+from sqlalchemy import DateTime, String, Text, column, delete, select, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.models.activity import ActivityCase
+from app.models.attendance import AttendanceRecord, AttendanceSession, AttendanceStatus
+from app.models.user import User
+from app.services.attendance_counters import record_transitions
+from app.services.qrcode_service import QRCodeError, decode_qr_code
+
+
+SYNC_CHECK_IN_METHOD = "QR_OFFLINE"
+
+# Per-item outcomes. DUPLICATE is a success: the scan is already reflected
+# in the attendance record, which is what a replayed upload looks like.
+SYNC_CHECKED_IN = "CHECKED_IN"
+SYNC_DUPLICATE = "DUPLICATE"
+SYNC_REJECTED = "REJECTED"
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_CHECK_IN_CODE_TYPES = ("CHECK_IN", "BOTH")
+
+
+@dataclass(frozen=True)
+class ScanEvent:
+    """One scan recorded by a gate device."""
+    event_id: str
+    user_id: str
+    qr_code: str
+    scanned_at: datetime
+    gate_id: str
+    signature: str
+
+
+@dataclass
+class ScanResult:
+    index: int
+    event_id: str
+    user_id: str
+    status: str
+    reason: Optional[str] = None
+    record_id: Optional[str] = None
+
+
+def _rejection(index: int, event: ScanEvent, reason: str) -> ScanResult:
+    return ScanResult(index, event.event_id, event.user_id, SYNC_REJECTED, reason)
+
+
+def gate_sync_key(activity_id: str, gate_id: str) -> str:
+    """Key a gate device signs its offline scans with."""
+    message = f"gate-sync:{activity_id}:{gate_id}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def scan_signature_message(event: ScanEvent) -> bytes:
+    """Canonical bytes covered by a scan's signature.
+
+    ``scanned_at`` is signed as whole Unix milliseconds so that clients
+    do not have to reproduce a particular ISO-8601 rendering.
+    """
+    scanned_ms = (event.scanned_at - _EPOCH) // timedelta(milliseconds=1)
+    return "\n".join(
+        (event.event_id, event.user_id, event.gate_id, str(scanned_ms), event.qr_code)
+    ).encode()
+
+
+def sign_scan_event(sync_key: str, event: ScanEvent) -> str:
+    return hmac.new(sync_key.encode(), scan_signature_message(event), hashlib.sha256).hexdigest()
+
+
+def _verify_events(
+    activity_id: str,
+    events: list[ScanEvent],
+    results: list[Optional[ScanResult]],
+) -> list[tuple[int, ScanEvent, str]]:
+    """Signature and QR checks that need no database access.
+
+    Returns ``(index, event, session_token)`` for every event that passed.
+    """
+    now = datetime.now(timezone.utc)
+    latest_scan = now + timedelta(seconds=settings.GATE_SYNC_MAX_CLOCK_SKEW_SECONDS)
+    keys: dict[str, bytes] = {}
+    passed = []
+    for index, event in enumerate(events):
+        key = keys.get(event.gate_id)
+        if key is None:
+            key = keys[event.gate_id] = gate_sync_key(activity_id, event.gate_id).encode()
+        expected = hmac.new(key, scan_signature_message(event), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, event.signature.lower()):
+            results[index] = _rejection(index, event, "Invalid scan signature")
+            continue
+        if event.scanned_at > latest_scan:
+            results[index] = _rejection(index, event, "Scan time is in the future")
+            continue
+
+        try:
+            payload = decode_qr_code(event.qr_code, verify_exp=False)
+        except QRCodeError:
+            results[index] = _rejection(index, event, "Invalid QR code")
+            continue
+        payload_activity = payload.get("event_id") or payload.get("activity_id")
+        if payload_activity != activity_id or payload.get("gate_id") != event.gate_id:
+            results[index] = _rejection(index, event, "QR code was issued for another activity or gate")
+            continue
+        if payload.get("type", "CHECK_IN") not in _CHECK_IN_CODE_TYPES:
+            results[index] = _rejection(index, event, "QR code is not a check-in code")
+            continue
+        scanned_at = event.scanned_at.timestamp()
+        if not payload.get("nbf", scanned_at) <= scanned_at < payload.get("exp", scanned_at + 1):
+            results[index] = _rejection(index, event, "Scan time is outside the QR code's validity window")
+            continue
+        passed.append((index, event, payload.get("session_token")))
+    return passed
+
+
+async def apply_scan_events(
+    db: AsyncSession,
+    activity: ActivityCase,
+    events: list[ScanEvent],
+) -> list[ScanResult]:
+    """Validate and apply a batch of offline scans in the caller's transaction.
+
+    Every check is one query for the whole batch: session windows, users,
+    existing records, the check-in UPDATE, the walk-in INSERT and the seat
+    reservation. Replaying a batch is safe: scans already applied come
+    back as DUPLICATE and change nothing.
+    """
+    results: list[Optional[ScanResult]] = [None] * len(events)
+    candidates = _verify_events(activity.id, events, results)
+
+    # Session windows: the scan must fall inside a session issued for its gate.
+    tokens = {token for _, _, token in candidates if token}
+    sessions = {}
+    if tokens:
+        rows = await db.execute(
+            select(AttendanceSession.session_token, AttendanceSession.gate_id, AttendanceSession.expires_at).where(
+                (AttendanceSession.activity_id == activity.id)
+                & AttendanceSession.session_token.in_(tokens)
+            )
+        )
+        sessions = {token: (gate_id, expires_at) for token, gate_id, expires_at in rows}
+
+    in_window = []
+    for index, event, token in candidates:
+        session = sessions.get(token)
+        if session is None or session[0] != event.gate_id or event.scanned_at > session[1]:
+            results[index] = _rejection(index, event, "QR code session not found for this gate and scan time")
+            continue
+        in_window.append((index, event))
+
+    user_ids = {event.user_id for _, event in in_window}
+    active_users = set()
+    if user_ids:
+        active_users = set(
+            await db.scalars(select(User.id).where(User.id.in_(user_ids) & User.is_active.is_(True)))
+        )
+
+    # One scan per user counts: the earliest. Later ones in the batch are duplicates.
+    first_scan: dict[str, tuple[int, ScanEvent]] = {}
+    for index, event in sorted(in_window, key=lambda item: item[1].scanned_at):
+        if event.user_id not in active_users:
+            results[index] = _rejection(index, event, "Unknown or inactive user")
+        elif event.user_id in first_scan:
+            results[index] = ScanResult(
+                index, event.event_id, event.user_id, SYNC_DUPLICATE, "Duplicate scan in batch"
+            )
+        else:
+            first_scan[event.user_id] = (index, event)
+
+    existing = {}
+    if first_scan:
+        rows = await db.execute(
+            select(AttendanceRecord.user_id, AttendanceRecord.id, AttendanceRecord.status).where(
+                (AttendanceRecord.activity_id == activity.id)
+                & AttendanceRecord.user_id.in_(first_scan)
+            )
+        )
+        existing = {user_id: (record_id, record_status) for user_id, record_id, record_status in rows}
+
+    to_check_in: list[tuple[int, ScanEvent, str, str]] = []
+    walk_ins: list[tuple[int, ScanEvent]] = []
+    for user_id, (index, event) in first_scan.items():
+        if user_id not in existing:
+            walk_ins.append((index, event))
+            continue
+        record_id, record_status = existing[user_id]
+        if record_status in (AttendanceStatus.CHECKED_IN, AttendanceStatus.CHECKED_OUT):
+            results[index] = ScanResult(
+                index, event.event_id, user_id, SYNC_DUPLICATE, "Already checked in", record_id
+            )
+        elif record_status == AttendanceStatus.CANCELLED:
+            results[index] = _rejection(index, event, "Registration is cancelled")
+        else:
+            to_check_in.append((index, event, record_id, record_status))
+
+    transitions = []
+    if to_check_in:
+        rows = values(
+            column("id", String),
+            column("checked_in_at", DateTime(timezone=True)),
+            column("gate_id", String),
+            column("qr_code", Text),
+            column("status", AttendanceRecord.status.type),
+            name="scans",
+        ).data([
+            (record_id, event.scanned_at, event.gate_id, event.qr_code, record_status)
+            for _, event, record_id, record_status in to_check_in
+        ])
+        updated = set(
+            await db.scalars(
+                update(AttendanceRecord)
+                .where(
+                    (AttendanceRecord.id == rows.c.id)
+                    # Only from the status read above, so the counter deltas are exact.
+                    & (AttendanceRecord.status == rows.c.status)
+                )
+                .values(
+                    status=AttendanceStatus.CHECKED_IN,
+                    checked_in_at=rows.c.checked_in_at,
+                    qr_code_used=rows.c.qr_code,
+                    check_in_method=SYNC_CHECK_IN_METHOD,
+                    check_in_gate_id=rows.c.gate_id,
+                )
+                .returning(AttendanceRecord.id)
+                .execution_options(synchronize_session=False)
+            )
+        )
+        for index, event, record_id, record_status in to_check_in:
+            if record_id in updated:
+                transitions.append((activity.id, record_status, AttendanceStatus.CHECKED_IN))
+                results[index] = ScanResult(
+                    index, event.event_id, event.user_id, SYNC_CHECKED_IN, record_id=record_id
+                )
+            else:
+                results[index] = _rejection(index, event, "Attendance record changed during sync; retry the upload")
+
+    if walk_ins:
+        admitted = await _apply_walk_ins(db, activity, walk_ins, results)
+        transitions.extend((activity.id, None, AttendanceStatus.CHECKED_IN) for _ in range(admitted))
+
+    await record_transitions(db, transitions)
+    return results
+
+
+async def _apply_walk_ins(
+    db: AsyncSession,
+    activity: ActivityCase,
+    walk_ins: list[tuple[int, ScanEvent]],
+    results: list[Optional[ScanResult]],
+) -> int:
+    """Insert walk-in check-ins up to the free seats; returns how many were admitted."""
+    # Insert before reserving seats, in the same order as
+    # register_for_activity, so the two never wait on each other in a cycle.
+    inserted = {
+        user_id: record_id
+        for record_id, user_id in await db.execute(
+            pg_insert(AttendanceRecord)
+            .values([
+                {
+                    "id": str(uuid4()),
+                    "activity_id": activity.id,
+                    "user_id": event.user_id,
+                    "status": AttendanceStatus.CHECKED_IN,
+                    "registered_at": event.scanned_at,
+                    "checked_in_at": event.scanned_at,
+                    "qr_code_used": event.qr_code,
+                    "check_in_method": SYNC_CHECK_IN_METHOD,
+                    "check_in_gate_id": event.gate_id,
+                    "location_verified": False,
+                }
+                for _, event in walk_ins
+            ])
+            .on_conflict_do_nothing(constraint="uq_attendance_activity_user")
+            .returning(AttendanceRecord.id, AttendanceRecord.user_id)
+        )
+    }
+
+    current, maximum = (
+        await db.execute(
+            select(ActivityCase.current_participants, ActivityCase.max_participants)
+            .where(ActivityCase.id == activity.id)
+            .with_for_update()
+        )
+    ).one()
+    seats = max(maximum - current, 0)
+
+    admitted = [(index, event) for index, event in walk_ins if event.user_id in inserted]
+    over_capacity = admitted[seats:]
+    admitted = admitted[:seats]
+    if admitted:
+        await db.execute(
+            update(ActivityCase)
+            .where(ActivityCase.id == activity.id)
+            .values(current_participants=ActivityCase.current_participants + len(admitted))
+        )
+        set_committed_value(activity, "current_participants", current + len(admitted))
+    if over_capacity:
+        await db.execute(
+            delete(AttendanceRecord).where(
+                AttendanceRecord.id.in_([inserted[event.user_id] for _, event in over_capacity])
+            )
+        )
+
+    for index, event in walk_ins:
+        if event.user_id not in inserted:
+            results[index] = _rejection(index, event, "Attendance record changed during sync; retry the upload")
+    for index, event in admitted:
+        results[index] = ScanResult(
+            index, event.event_id, event.user_id, SYNC_CHECKED_IN, record_id=inserted[event.user_id]
+        )
+    for index, event in over_capacity:
+        results[index] = _rejection(index, event, "Activity is full")
+    return len(admitted)
@@ -0,0 +1,214 @@
+"""In-process evaluator for the casecheck.authz Rego policies.
+
+This is a native Python port of ``policy/policies/*.rego`` used when
+``POLICY_ENGINE=local``. It follows Rego's undefined-value semantics: a
+comparison that touches a missing input attribute is false, so neither the
+rule nor its negated form fires. Any change to the Rego policies must be
+mirrored here.
+"""
+
+from typing import Any
+
+
+_UNDEFINED = object()
+
+PARTICIPANT_ROLES = ("USER", "GUEST", "ADMIN")
+
+
+def _get(document: Any, key: str) -> Any:
+    if isinstance(document, dict) and key in document:
+        return document[key]
+    return _UNDEFINED
+
+
+def _eq(left: Any, right: Any) -> bool:
+    if left is _UNDEFINED or right is _UNDEFINED:
+        return False
+    # JSON booleans never equal numbers in Rego, unlike Python's True == 1.
+    return isinstance(left, bool) == isinstance(right, bool) and left == right
+
+
+def _neq(left: Any, right: Any) -> bool:
+    if left is _UNDEFINED or right is _UNDEFINED:
+        return False
+    return not _eq(left, right)
+
+
+def _member(value: Any, options: tuple) -> bool:
+    return any(_eq(value, option) for option in options)
+
+
+class _PolicyInput:
+    """Attribute accessors for the fields the policies read."""
+
+    def __init__(self, document: dict) -> None:
+        subject = _get(document, "subject")
+        resource = _get(document, "resource")
+        context = _get(document, "context")
+        self.action = _get(document, "action")
+        self.subject_id = _get(subject, "id")
+        self.role = _get(subject, "role")
+        self.creator_id = _get(resource, "creator_id")
+        self.status = _get(resource, "status")
+        self.activity_status = _get(resource, "activity_status")
+        self.is_checked_in = _get(context, "is_checked_in")
+        self.is_participant = _get(context, "is_participant")
+
+    def is_action(self, action: str) -> bool:
+        return _eq(self.action, action)
+
+
+def _activity(inp: _PolicyInput) -> tuple[bool, set[str]]:
+    allow = False
+    reasons: set[str] = set()
+    is_creator = _eq(inp.subject_id, inp.creator_id)
+    not_creator = _neq(inp.subject_id, inp.creator_id)
+
+    if inp.is_action("activity:create"):
+        allow |= _member(inp.role, ("USER", "ADMIN"))
+        if not _member(inp.role, ("USER", "ADMIN")):
+            reasons.add("Only USER or ADMIN can create activities")
+
+    if inp.is_action("activity:read"):
+        allow |= _member(inp.status, ("APPROVED", "IN_PROGRESS", "COMPLETED"))
+        allow |= is_creator
+        allow |= _eq(inp.role, "ADMIN")
+
+    if inp.is_action("activity:update"):
+        allow |= is_creator and _eq(inp.status, "DRAFT")
+        if not_creator:
+            reasons.add("Only the creator can update this activity")
+        if _neq(inp.status, "DRAFT"):
+            reasons.add("Cannot update activity in this status")
+        if _eq(inp.status, "REJECTED"):
+            reasons.add("REJECTED activities are immutable")
+
+    if inp.is_action("activity:delete"):
+        allow |= is_creator and _eq(inp.status, "DRAFT")
+        if not_creator:
+            reasons.add("Only the creator can delete this activity")
+        if _neq(inp.status, "DRAFT"):
+            reasons.add("Can only delete DRAFT activities")
+
+    if inp.is_action("activity:submit"):
+        allow |= is_creator and _eq(inp.status, "DRAFT")
+        if not_creator:
+            reasons.add("Only the creator can submit for approval")
+        if _neq(inp.status, "DRAFT"):
+            reasons.add("Only DRAFT activities can be submitted")
+
+    if inp.is_action("activity:start"):
+        allow |= (_eq(inp.role, "ADMIN") or is_creator) and _eq(inp.status, "APPROVED")
+        if _neq(inp.role, "ADMIN") and not_creator:
+            reasons.add("Only the creator or ADMIN can start this activity")
+        if _neq(inp.status, "APPROVED"):
+            reasons.add("Only APPROVED activities can be started")
+
+    if inp.is_action("activity:list"):
+        allow = True
+
+    return allow, reasons
+
+
+def _approval(inp: _PolicyInput) -> tuple[bool, set[str]]:
+    allow = False
+    reasons: set[str] = set()
+
+    for verb, past in (("approve", "approved"), ("reject", "rejected")):
+        if not inp.is_action(f"activity:{verb}"):
+            continue
+        allow |= (
+            _eq(inp.role, "ADMIN")
+            and _neq(inp.subject_id, inp.creator_id)
+            and _eq(inp.status, "PENDING_APPROVAL")
+        )
+        if _neq(inp.role, "ADMIN"):
+            reasons.add(f"Only ADMIN can {verb} activities")
+        if _eq(inp.subject_id, inp.creator_id):
+            reasons.add(f"Separation of Duties: Cannot {verb} your own activity")
+        if _neq(inp.status, "PENDING_APPROVAL"):
+            reasons.add(f"Only PENDING_APPROVAL activities can be {past}")
+
+    return allow, reasons
+
+
+def _attendance(inp: _PolicyInput) -> tuple[bool, set[str]]:
+    allow = False
+    reasons: set[str] = set()
+    is_participant_role = _member(inp.role, PARTICIPANT_ROLES)
+
+    if inp.is_action("attendance:register"):
+        allow |= is_participant_role and _member(inp.status, ("APPROVED", "IN_PROGRESS"))
+        if not _member(inp.status, ("APPROVED", "IN_PROGRESS")):
+            reasons.add("Can only register for APPROVED or IN_PROGRESS activities")
+
+    if inp.is_action("attendance:checkin"):
+        allow |= is_participant_role and _eq(inp.activity_status, "IN_PROGRESS")
+        if _neq(inp.activity_status, "IN_PROGRESS"):
+            reasons.add("Activity is not currently in progress")
+
+    if inp.is_action("attendance:checkout"):
+        allow |= is_participant_role and _eq(inp.is_checked_in, True)
+        if _neq(inp.is_checked_in, True):
+            reasons.add("Must be checked in first")
+
+    if inp.is_action("attendance:generate_qr"):
+        allow |= _eq(inp.subject_id, inp.creator_id) or _eq(inp.role, "ADMIN")
+        if _neq(inp.subject_id, inp.creator_id) and _neq(inp.role, "ADMIN"):
+            reasons.add("Only creator or ADMIN can generate QR codes")
+
+    if inp.is_action("attendance:manage_gates"):
+        allow |= _eq(inp.subject_id, inp.creator_id) or _eq(inp.role, "ADMIN")
+        if _neq(inp.subject_id, inp.creator_id) and _neq(inp.role, "ADMIN"):
+            reasons.add("Only creator or ADMIN can manage gates")
+
+    if inp.is_action("attendance:sync"):
+        allow |= _eq(inp.subject_id, inp.creator_id) or _eq(inp.role, "ADMIN")
+        if _neq(inp.subject_id, inp.creator_id) and _neq(inp.role, "ADMIN"):
+            reasons.add("Only creator or ADMIN can sync gate scans")
+
+    if inp.is_action("attendance:view"):
+        allow |= _eq(inp.subject_id, inp.creator_id)
+        allow |= _eq(inp.role, "ADMIN")
+        allow |= _eq(inp.is_participant, True)
+
+    if inp.is_action("attendance:validate_qr"):
+        allow |= is_participant_role
+
+    return allow, reasons
+
+
+def _user(inp: _PolicyInput) -> tuple[bool, set[str]]:
+    allow = inp.is_action("user:read_self") or inp.is_action("user:update_self")
+    reasons: set[str] = set()
+
+    for action, reason in (
+        ("user:list", "Only ADMIN can list users"),
+        ("user:read", "Only ADMIN can view other user profiles"),
+        ("user:manage", "Only ADMIN can manage users"),
+        ("system:metrics", "Only ADMIN can view runtime metrics"),
+    ):
+        if not inp.is_action(action):
+            continue
+        allow |= _eq(inp.role, "ADMIN")
+        if _neq(inp.role, "ADMIN"):
+            reasons.add(reason)
+
+    return allow, reasons
+
+
+# Same order as the ``reasons`` concatenation in casecheck.authz (main.rego).
+_PACKAGES = (_activity, _approval, _attendance, _user)
+
+
+def evaluate_policy(document: dict) -> dict:
+    """Evaluate ``data.casecheck.authz.response`` for an input document."""
+    inp = _PolicyInput(document)
+    allow = False
+    reasons: list[str] = []
+    for package in _PACKAGES:
+        package_allow, package_reasons = package(inp)
+        allow = allow or package_allow
+        # Iterating a Rego set yields its members in sorted order.
+        reasons.extend(sorted(package_reasons))
+    return {"allow": allow, "reasons": reasons}
@@ -1,9 +1,12 @@
 """OPA (Open Policy Agent) client for policy evaluation."""
 
+import asyncio
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Protocol
 import httpx
 from app.core.config import settings
+from app.services.decision_cache import DecisionCache, decision_cache as default_decision_cache
+from app.services.local_policy import evaluate_policy
 
 
 @dataclass
@@ -23,53 +26,249 @@ class PolicyInput:
     context: dict
 
 
-class OPAClient:
-    """Client for communicating with OPA server."""
+class PolicyEvaluationError(Exception):
+    """Raised by a policy backend when no decision could be obtained."""
+
+
+class PolicyBackend(Protocol):
+    """Evaluates ``casecheck.authz.response`` for a raw input document."""
+
+    name: str
+
+    async def start(self) -> None: ...
+
+    async def close(self) -> None: ...
+
+    async def query(self, input_document: dict) -> Any: ...
+
+    def snapshot(self) -> dict: ...
+
+
+@dataclass
+class OPAClientMetrics:
+    """Connection usage counters for the pooled OPA client."""
+    requests: int = 0
+    connections_opened: int = 0
+    errors: int = 0
+
+    @property
+    def connections_reused(self) -> int:
+        return max(self.requests - self.connections_opened, 0)
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": self.connections_reused,
+            "errors": self.errors,
+            "reuse_ratio": round(self.connections_reused / self.requests, 4) if self.requests else 0.0,
+        }
+
+
+class HTTPPolicyBackend:
+    """Queries an OPA server over a pooled, keep-alive HTTP client.
+
+    A single ``httpx.AsyncClient`` is shared by every evaluation so the PEP
+    reuses connections instead of reconnecting per decision. The client is
+    opened by ``start()`` during application startup (or lazily on first use)
+    and released by ``close()`` on shutdown.
+    """
+
+    name = "opa"
 
     def __init__(self, opa_url: str | None = None, policy_path: str | None = None) -> None:
         self.opa_url = opa_url or settings.OPA_URL
         self.policy_path = policy_path or settings.OPA_POLICY_PATH
+        self.metrics = OPAClientMetrics()
+        self._client: httpx.AsyncClient | None = None
 
-    async def evaluate(self, policy_input: PolicyInput) -> PolicyDecision:
-        input_data = {
-            "input": {
-                "subject": policy_input.subject,
-                "action": policy_input.action,
-                "resource": policy_input.resource,
-                "context": policy_input.context,
-            }
-        }
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = self._build_client()
 
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.opa_url}{self.policy_path}",
-                    json=input_data,
-                    timeout=5.0,
-                )
-                response.raise_for_status()
-                result = response.json().get("result", {})
+    async def close(self) -> None:
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
 
-            if isinstance(result, bool):
-                return PolicyDecision(allow=result, reasons=[])
+    def _build_client(self) -> httpx.AsyncClient:
+        # HTTP/2 against a plain http:// OPA URL uses prior knowledge (h2c),
+        # which requires OPA to be started with ``--h2c``.
+        return httpx.AsyncClient(
+            base_url=self.opa_url,
+            http2=settings.OPA_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.OPA_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPA_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.OPA_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=settings.OPA_TIMEOUT_SECONDS,
+        )
 
-            return PolicyDecision(
-                allow=result.get("allow", False),
-                reasons=result.get("reasons", []),
-                obligations=result.get("obligations"),
+    async def _trace(self, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.metrics.connections_opened += 1
+
+    async def query(self, input_document: dict) -> Any:
+        if self._client is None:
+            await self.start()
+
+        try:
+            response = await self._client.post(
+                self.policy_path,
+                json={"input": input_document},
+                extensions={"trace": self._trace},
             )
+            self.metrics.requests += 1
+            response.raise_for_status()
+            return response.json().get("result", {})
         except httpx.HTTPError as exc:
+            self.metrics.errors += 1
+            raise PolicyEvaluationError(str(exc)) from exc
+
+    def snapshot(self) -> dict:
+        return self.metrics.snapshot()
+
+
+class LocalPolicyBackend:
+    """Evaluates the policies in-process with the native Rego port."""
+
+    name = "local"
+
+    def __init__(self) -> None:
+        self.evaluations = 0
+
+    async def start(self) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+    async def query(self, input_document: dict) -> Any:
+        self.evaluations += 1
+        return evaluate_policy(input_document)
+
+    def snapshot(self) -> dict:
+        return {"evaluations": self.evaluations}
+
+
+POLICY_BACKENDS: dict[str, type] = {
+    HTTPPolicyBackend.name: HTTPPolicyBackend,
+    LocalPolicyBackend.name: LocalPolicyBackend,
+}
+
+
+def build_policy_backend(engine: str | None = None) -> PolicyBackend:
+    engine = engine or settings.POLICY_ENGINE
+    backend_class = POLICY_BACKENDS.get(engine)
+    if backend_class is None:
+        raise ValueError(
+            f"Unknown POLICY_ENGINE '{engine}', expected one of: {', '.join(POLICY_BACKENDS)}"
+        )
+    return backend_class()
+
+
+class OPAClient:
+    """Policy decision client in front of a pluggable evaluation backend.
+
+    ``POLICY_ENGINE`` selects the backend: ``opa`` queries the OPA sidecar at
+    ``OPA_URL`` and ``local`` evaluates the same rules in-process. Successful
+    decisions are memoized in ``decision_cache`` when caching is enabled.
+    """
+
+    def __init__(
+        self,
+        backend: PolicyBackend | None = None,
+        decision_cache: DecisionCache | None = None,
+    ) -> None:
+        self.backend = backend or build_policy_backend()
+        self.decision_cache = decision_cache
+
+    async def start(self) -> None:
+        await self.backend.start()
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+    def snapshot(self) -> dict:
+        return {"backend": self.backend.name, **self.backend.snapshot()}
+
+    async def evaluate(self, policy_input: PolicyInput) -> PolicyDecision:
+        if self.decision_cache is not None:
+            cached = self.decision_cache.get(policy_input)
+            if cached is not None:
+                return cached
+
+        input_document = {
+            "subject": policy_input.subject,
+            "action": policy_input.action,
+            "resource": policy_input.resource,
+            "context": policy_input.context,
+        }
+
+        try:
+            result = await self.backend.query(input_document)
+        except PolicyEvaluationError as exc:
             print(f"OPA evaluation error: {exc}")
             return PolicyDecision(
                 allow=False,
                 reasons=["Policy evaluation failed - defaulting to deny"],
             )
 
-    async def evaluate_batch(self, inputs: list[PolicyInput]) -> list[PolicyDecision]:
-        return [await self.evaluate(inp) for inp in inputs]
+        if isinstance(result, bool):
+            decision = PolicyDecision(allow=result, reasons=[])
+        else:
+            decision = PolicyDecision(
+                allow=result.get("allow", False),
+                reasons=result.get("reasons", []),
+                obligations=result.get("obligations"),
+            )
+
+        if self.decision_cache is not None:
+            self.decision_cache.set(policy_input, decision)
+        return decision
+
+    async def evaluate_batch(
+        self,
+        inputs: list[PolicyInput],
+        concurrency: int | None = None,
+    ) -> list[PolicyDecision]:
+        """Evaluate many inputs concurrently, returning decisions in input order.
+
+        At most ``concurrency`` evaluations are in flight at once. A failure
+        on one input is isolated to that input and denies it.
+        """
+        semaphore = asyncio.Semaphore(concurrency or settings.OPA_BATCH_CONCURRENCY)
+
+        async def evaluate_one(policy_input: PolicyInput) -> PolicyDecision:
+            async with semaphore:
+                return await self.evaluate(policy_input)
+
+        results = await asyncio.gather(
+            *(evaluate_one(inp) for inp in inputs),
+            return_exceptions=True,
+        )
+
+        decisions = []
+        for result in results:
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, BaseException):
+                print(f"OPA batch evaluation error: {result}")
+                decisions.append(
+                    PolicyDecision(
+                        allow=False,
+                        reasons=["Policy evaluation failed - defaulting to deny"],
+                    )
+                )
+            else:
+                decisions.append(result)
+        return decisions
 
 
-opa_client = OPAClient()
+opa_client = OPAClient(
+    decision_cache=default_decision_cache if settings.POLICY_CACHE_ENABLED else None,
+)
 
 
 async def check_permission(
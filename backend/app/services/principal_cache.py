@@ -0,0 +1,189 @@
+"""Cache of authenticated-user principals keyed by token subject."""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+import time
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.models.user import User
+
+
+@dataclass(frozen=True)
+class PrincipalRole:
+    """Immutable copy of a role assigned to a principal."""
+    id: str
+    name: str
+    description: Optional[str]
+    is_system: bool
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Immutable snapshot of the authenticated user.
+
+    Carries the same fields as ``UserResponse`` so endpoints can serialize
+    it directly; it is detached from any session and safe to share between
+    requests.
+    """
+    id: str
+    username: str
+    email: str
+    full_name: str
+    phone: Optional[str]
+    department: Optional[str]
+    is_active: bool
+    is_verified: bool
+    last_login_at: Optional[datetime]
+    profile_image_url: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    roles: tuple[PrincipalRole, ...]
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            full_name=user.full_name,
+            phone=user.phone,
+            department=user.department,
+            is_active=user.is_active,
+            is_verified=user.is_verified,
+            last_login_at=user.last_login_at,
+            profile_image_url=user.profile_image_url,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+            roles=tuple(
+                PrincipalRole(
+                    id=role.id,
+                    name=role.name,
+                    description=role.description,
+                    is_system=role.is_system,
+                )
+                for role in user.roles
+            ),
+        )
+
+
+class PrincipalCache:
+    """Bounded LRU of principals with a per-entry TTL.
+
+    Every invalidation bumps the user's generation. A caller that loads a
+    User after a miss reads ``generation()`` first and passes it to
+    ``set()``, which drops the principal if the user was invalidated while
+    it was being loaded, so a load that raced a commit cannot re-cache the
+    pre-commit state.
+
+    The store is per process: an invalidation only reaches the worker that
+    made the change, and other workers serve their cached principal until
+    it expires, so their view of a user is up to ``ttl_seconds`` stale. A
+    shared store (e.g. Redis with pub/sub invalidation) can replace this
+    class as long as it keeps the ``get``/``generation``/``set``/
+    ``invalidate`` interface.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale_sets = 0
+        self._entries: OrderedDict[str, tuple[Principal, float]] = OrderedDict()
+        # Generations of recently invalidated users, bounded like the
+        # entries. Users without one report the highest evicted generation,
+        # so eviction never makes a generation go back to an earlier value.
+        self._generations: OrderedDict[str, int] = OrderedDict()
+        self._generation_floor = 0
+        self._last_generation = 0
+
+    def get(self, user_id: str) -> Optional[Principal]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        principal, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return principal
+
+    def generation(self, user_id: str) -> int:
+        return self._generations.get(user_id, self._generation_floor)
+
+    def set(self, principal: Principal, generation: Optional[int] = None) -> None:
+        """Cache ``principal`` unless its user was invalidated since ``generation``."""
+        if generation is not None and generation != self.generation(principal.id):
+            self.stale_sets += 1
+            return
+        self._entries[principal.id] = (principal, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(principal.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        self._last_generation += 1
+        self._generations[user_id] = self._last_generation
+        self._generations.move_to_end(user_id)
+        while len(self._generations) > self.max_size:
+            _, evicted = self._generations.popitem(last=False)
+            self._generation_floor = max(self._generation_floor, evicted)
+        if self._entries.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._generation_floor = self._last_generation = self._last_generation + 1
+        self._generations.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "stale_sets": self.stale_sets,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+# Any flushed change to a User row (profile fields, is_active, last_login_at or
+# its roles collection) drops the cached principal once the transaction
+# commits. The invalidation also bumps the user's generation, so a request
+# that loaded the User before the commit cannot re-cache it (see
+# PrincipalCache.set).
+_CHANGED_USERS_KEY = "principal_cache.changed_user_ids"
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _mark_user_changed(mapper, connection, target: User) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED_USERS_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session) -> None:
+    for user_id in session.info.pop(_CHANGED_USERS_KEY, ()):
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changed_users(session: Session, previous_transaction) -> None:
+    session.info.pop(_CHANGED_USERS_KEY, None)
@@ -0,0 +1,73 @@
+"""Cache of verified QR code payloads keyed by the code's digest."""
+
+from collections import OrderedDict
+import hashlib
+import time
+from typing import Optional
+
+from app.core.config import settings
+
+
+class QRPayloadCache:
+    """Bounded LRU of verified QR payloads, each kept until its own ``exp``.
+
+    A rotating gate code is scanned by every attendee at that gate during
+    its lifetime, and each check-in decodes it in both the PEP and the
+    attendance service. Caching the verified payload means the signature
+    is checked once per process per code. Only authentic, already-valid
+    payloads are stored, and an entry is dropped once the code expires,
+    so a hit is exactly as valid as a fresh verification would be.
+
+    Returned payloads are shared between callers and must not be mutated.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+
+    @staticmethod
+    def _key(qr_code: str) -> bytes:
+        return hashlib.sha256(qr_code.encode()).digest()
+
+    def get(self, qr_code: str) -> Optional[dict]:
+        key = self._key(qr_code)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        payload, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return payload
+
+    def set(self, qr_code: str, payload: dict) -> None:
+        expires_at = payload.get("exp")
+        if not isinstance(expires_at, (int, float)) or expires_at <= time.time():
+            return
+        key = self._key(qr_code)
+        self._entries[key] = (payload, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.QR_PAYLOAD_CACHE_ENABLED,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+qr_payload_cache = QRPayloadCache(max_size=settings.QR_PAYLOAD_CACHE_MAX_SIZE)
@@ -1,11 +1,75 @@
-"""QR code generation and validation service."""
+"""QR code generation and validation service.
 
+Two payload formats are understood:
+
+- ``compact`` (``CC1-`` prefix): a versioned binary record with a
+  truncated HMAC-SHA256 tag, encoded as unpadded base32 so the QR code
+  can use alphanumeric mode::
+
+      version:u8  type:u8  nbf:u32  exp:u32  activity:16s  token:16s
+      gate_len:u8  gate:gate_len  tag:12s
+
+- ``jwt``: the original signed JWT, still accepted for codes issued
+  before the compact format.
+
+``QR_PAYLOAD_FORMAT`` selects what new codes are issued as; both are
+always verified.
+"""
+
+import base64
+import hashlib
+import hmac
 import secrets
+import struct
+import time
 from datetime import datetime, timezone
+from uuid import UUID
 import jwt
 from fastapi import HTTPException
 
 from app.core.config import settings
+from app.services.qr_payload_cache import qr_payload_cache
+
+
+QR_PAYLOAD_FORMATS = ("jwt", "compact")
+
+COMPACT_PREFIX = "CC1-"
+COMPACT_VERSION = 1
+COMPACT_TOKEN_BYTES = 16
+COMPACT_TAG_BYTES = 12
+CODE_TYPES = ("CHECK_IN", "CHECK_OUT", "BOTH")
+
+_COMPACT_HEADER = struct.Struct(">BBII16s16sB")
+# base64.b32decode is pure Python; mapping the RFC 4648 alphabet onto the
+# digits int() understands decodes a payload in C. Characters outside the
+# alphabet map to "!" so int() rejects them.
+_BASE32_TO_INT_DIGITS = str.maketrans(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ234567abcdefghijklmnopqrstuvwxyz0189",
+    "0123456789ABCDEFGHIJKLMNOPQRSTUV0123456789ABCDEFGHIJKLMNOP!!!!",
+)
+_COMPACT_KEY = hmac.digest(settings.SECRET_KEY.encode(), b"casecheck-qr-compact-v1", hashlib.sha256)
+
+
+class QRCodeError(ValueError):
+    """QR code payload is malformed, forged or not yet valid."""
+
+
+class QRCodeExpired(QRCodeError):
+    """QR code payload is authentic but past its expiry."""
+
+
+def _payload_format() -> str:
+    if settings.QR_PAYLOAD_FORMAT not in QR_PAYLOAD_FORMATS:
+        raise ValueError(
+            f"Unknown QR_PAYLOAD_FORMAT '{settings.QR_PAYLOAD_FORMAT}', "
+            f"expected one of: {', '.join(QR_PAYLOAD_FORMATS)}"
+        )
+    return settings.QR_PAYLOAD_FORMAT
+
+
+def new_session_token() -> str:
+    """Random session token sized for the configured payload format."""
+    return secrets.token_hex(COMPACT_TOKEN_BYTES if _payload_format() == "compact" else 32)
 
 
 def generate_qr_code(
@@ -14,8 +78,14 @@ def generate_qr_code(
     session_token: str,
     code_type: str,
     expires_at: datetime,
+    not_before: datetime | None = None,
 ) -> str:
     now = datetime.now(timezone.utc)
+    if _payload_format() == "compact":
+        return encode_compact_payload(
+            activity_id, gate_id, session_token, code_type, not_before or now, expires_at
+        )
+
     jti = secrets.token_urlsafe(16)
 
     payload = {
@@ -25,7 +95,7 @@ def generate_qr_code(
         "session_token": session_token,
         "type": code_type,
         "jti": jti,
-        "nbf": now,
+        "nbf": not_before or now,
         "exp": expires_at,
     }
 
@@ -33,15 +103,122 @@ def generate_qr_code(
     return jwt_string
 
 
-def validate_qr_code(jwt_string: str) -> dict:
+def encode_compact_payload(
+    activity_id: str,
+    gate_id: str,
+    session_token: str,
+    code_type: str,
+    not_before: datetime,
+    expires_at: datetime,
+) -> str:
+    token = bytes.fromhex(session_token)
+    gate = gate_id.encode()
+    if len(token) != COMPACT_TOKEN_BYTES:
+        raise ValueError(f"Compact QR codes need a {COMPACT_TOKEN_BYTES}-byte session token")
+    if len(gate) > 255:
+        raise ValueError("Gate ID is too long for a compact QR code")
+
+    record = _COMPACT_HEADER.pack(
+        COMPACT_VERSION,
+        CODE_TYPES.index(code_type),
+        int(not_before.timestamp()),
+        int(expires_at.timestamp()),
+        UUID(activity_id).bytes,
+        token,
+        len(gate),
+    ) + gate
+    tag = hmac.digest(_COMPACT_KEY, record, hashlib.sha256)[:COMPACT_TAG_BYTES]
+    return COMPACT_PREFIX + base64.b32encode(record + tag).decode().rstrip("=")
+
+
+def _decode_compact_payload(qr_code: str, verify_exp: bool) -> dict:
+    encoded = qr_code[len(COMPACT_PREFIX):]
+    # int() also parses non-ASCII digits (e.g. "\u0663"), which the
+    # translation table leaves in place.
+    if not (encoded.isascii() and encoded.isalnum()):
+        raise QRCodeError("Malformed compact QR code")
+    size, padding_bits = divmod(len(encoded) * 5, 8)
     try:
-        payload = jwt.decode(
-            jwt_string,
+        value = int(encoded.translate(_BASE32_TO_INT_DIGITS), 32)
+    except ValueError as exc:
+        raise QRCodeError("Malformed compact QR code") from exc
+    if padding_bits >= 5 or value & ((1 << padding_bits) - 1):
+        raise QRCodeError("Malformed compact QR code")
+    raw = (value >> padding_bits).to_bytes(size, "big")
+
+    tag_at = len(raw) - COMPACT_TAG_BYTES
+    if tag_at < _COMPACT_HEADER.size:
+        raise QRCodeError("Malformed compact QR code")
+    view = memoryview(raw)
+    expected = hmac.digest(_COMPACT_KEY, view[:tag_at], hashlib.sha256)
+    if not hmac.compare_digest(memoryview(expected)[:COMPACT_TAG_BYTES], view[tag_at:]):
+        raise QRCodeError("Compact QR code signature mismatch")
+
+    version, type_index, nbf, exp, activity, token, gate_length = _COMPACT_HEADER.unpack_from(raw)
+    if version != COMPACT_VERSION or type_index >= len(CODE_TYPES) or _COMPACT_HEADER.size + gate_length != tag_at:
+        raise QRCodeError("Unsupported compact QR code")
+
+    # Same boundaries as PyJWT: usable from nbf, expired once exp is reached.
+    now = time.time()
+    if nbf > now:
+        raise QRCodeError("QR code is not yet valid")
+    if verify_exp and exp <= now:
+        raise QRCodeExpired("QR code has expired")
+
+    activity_hex = activity.hex()
+    return {
+        "activity_id": (
+            f"{activity_hex[:8]}-{activity_hex[8:12]}-{activity_hex[12:16]}"
+            f"-{activity_hex[16:20]}-{activity_hex[20:]}"
+        ),
+        "gate_id": view[_COMPACT_HEADER.size:tag_at].tobytes().decode(),
+        "session_token": token.hex(),
+        "type": CODE_TYPES[type_index],
+        "nbf": nbf,
+        "exp": exp,
+    }
+
+
+def decode_qr_code(qr_code: str, verify_exp: bool = True) -> dict:
+    """Verified payload of a compact or JWT QR code.
+
+    Raises ``QRCodeExpired`` for an authentic but expired code and
+    ``QRCodeError`` for anything else that does not verify. Payloads that
+    verify and have not expired are cached until their ``exp``, so the PEP
+    and the attendance service verify a given code once per process.
+    """
+    if settings.QR_PAYLOAD_CACHE_ENABLED:
+        payload = qr_payload_cache.get(qr_code)
+        if payload is not None:
+            return payload
+
+    payload = _verify_qr_code(qr_code, verify_exp)
+    if settings.QR_PAYLOAD_CACHE_ENABLED:
+        qr_payload_cache.set(qr_code, payload)
+    return payload
+
+
+def _verify_qr_code(qr_code: str, verify_exp: bool) -> dict:
+    if qr_code.startswith(COMPACT_PREFIX):
+        return _decode_compact_payload(qr_code, verify_exp)
+
+    try:
+        return jwt.decode(
+            qr_code,
             settings.SECRET_KEY,
             algorithms=[settings.ALGORITHM],
+            options={"verify_exp": verify_exp},
         )
-        return payload
     except jwt.ExpiredSignatureError as exc:
-        raise HTTPException(status_code=400, detail="QR code has expired") from exc
+        raise QRCodeExpired("QR code has expired") from exc
     except jwt.InvalidTokenError as exc:
+        raise QRCodeError("Invalid QR code") from exc
+
+
+def validate_qr_code(qr_code: str) -> dict:
+    try:
+        return decode_qr_code(qr_code)
+    except QRCodeExpired as exc:
+        raise HTTPException(status_code=400, detail="QR code has expired") from exc
+    except QRCodeError as exc:
         raise HTTPException(status_code=400, detail="Invalid QR code") from exc
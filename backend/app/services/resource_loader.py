@@ -0,0 +1,62 @@
+"""Request-scoped loading of the rows a policy decision depends on."""
+
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.activity import ActivityCase
+from app.models.attendance import AttendanceRecord
+
+
+@dataclass
+class LoadedResources:
+    """Activity (and the caller's attendance row) fetched by the PEP.
+
+    Stored on ``request.state.loaded_resources`` so the service layer can
+    reuse the rows instead of querying them again.
+    """
+    activity_id: str
+    user_id: Optional[str]
+    activity: Optional[ActivityCase]
+    attendance: Optional[AttendanceRecord]
+
+    def matches(self, activity_id: str, user_id: Optional[str] = None) -> bool:
+        if self.activity_id != activity_id:
+            return False
+        return user_id is None or self.user_id == user_id
+
+
+async def load_activity_resources(
+    db: AsyncSession,
+    activity_id: str,
+    user_id: Optional[str] = None,
+) -> LoadedResources:
+    """Fetch an activity and, optionally, one user's attendance in one query."""
+    if user_id is None:
+        result = await db.execute(select(ActivityCase).where(ActivityCase.id == activity_id))
+        return LoadedResources(
+            activity_id=activity_id,
+            user_id=None,
+            activity=result.scalar_one_or_none(),
+            attendance=None,
+        )
+
+    result = await db.execute(
+        select(ActivityCase, AttendanceRecord)
+        .outerjoin(
+            AttendanceRecord,
+            and_(
+                AttendanceRecord.activity_id == ActivityCase.id,
+                AttendanceRecord.user_id == user_id,
+            ),
+        )
+        .where(ActivityCase.id == activity_id)
+    )
+    row = result.one_or_none()
+    return LoadedResources(
+        activity_id=activity_id,
+        user_id=user_id,
+        activity=row[0] if row else None,
+        attendance=row[1] if row else None,
+    )
@@ -0,0 +1,180 @@
+"""In-memory registry of active attendance sessions."""
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import math
+import time
+from typing import Optional
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.models.attendance import AttendanceSession
+
+
+@dataclass(frozen=True, slots=True)
+class ActiveSession:
+    """Gate session a QR code was issued for."""
+    activity_id: str
+    gate_id: str
+    expires_at: float
+
+
+class SessionRegistry:
+    """Active attendance sessions keyed by session token.
+
+    An entry lives until its session expires or for ``ttl_seconds``,
+    whichever is sooner. Entries are evicted by an expiry wheel: each token
+    is filed under the ``tick_seconds`` bucket its entry expires in, and
+    every access drops the buckets whose time has passed, so eviction costs
+    O(expired) and never scans live entries.
+
+    The store is per process. ``lookup_session`` falls back to the
+    ``attendance_sessions`` table on a miss and fills the registry from it,
+    so sessions created by another worker are served from memory after
+    their first scan here. Revocations (``close_gate``) only reach the
+    registry of the worker that made them; other workers keep accepting a
+    revoked token until their entry expires, which ``ttl_seconds`` bounds
+    even for windows pre-generated far ahead. A shared store can replace
+    this class as long as it keeps the ``add``/``get``/``discard``
+    interface.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, tick_seconds: float = 1.0) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.tick_seconds = tick_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Token -> (session, time the entry expires).
+        self._entries: dict[str, tuple[ActiveSession, float]] = {}
+        self._wheel: dict[int, list[str]] = {}
+        self._cursor: Optional[int] = None
+
+    def _tick(self, timestamp: float) -> int:
+        return math.floor(timestamp / self.tick_seconds)
+
+    def _evict_expired(self, now: float) -> None:
+        current = self._tick(now)
+        if self._cursor is None or not self._wheel:
+            self._cursor = current
+            return
+        if current - self._cursor > len(self._wheel):
+            expired = [tick for tick in self._wheel if tick < current]
+        else:
+            expired = [tick for tick in range(self._cursor, current) if tick in self._wheel]
+        for tick in expired:
+            for token in self._wheel.pop(tick):
+                entry = self._entries.get(token)
+                # The token may have been re-added with a later expiry.
+                if entry is not None and self._tick(entry[1]) == tick:
+                    del self._entries[token]
+                    self.evictions += 1
+        self._cursor = current
+
+    def add(self, token: str, activity_id: str, gate_id: str, expires_at: datetime) -> None:
+        now = time.time()
+        self._evict_expired(now)
+        expires = expires_at.timestamp()
+        if expires <= now or (token not in self._entries and len(self._entries) >= self.max_size):
+            return
+        evict_at = min(expires, now + self.ttl_seconds)
+        self._entries[token] = (ActiveSession(activity_id, gate_id, expires), evict_at)
+        self._wheel.setdefault(self._tick(evict_at), []).append(token)
+
+    def get(self, token: str) -> Optional[ActiveSession]:
+        now = time.time()
+        self._evict_expired(now)
+        entry = self._entries.get(token)
+        if entry is None or entry[1] < now:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def discard(self, token: str) -> None:
+        self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._wheel.clear()
+        self._cursor = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.SESSION_REGISTRY_ENABLED,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+session_registry = SessionRegistry(
+    max_size=settings.SESSION_REGISTRY_MAX_SIZE,
+    ttl_seconds=settings.SESSION_REGISTRY_TTL_SECONDS,
+)
+
+
+async def lookup_session(
+    db: AsyncSession,
+    session_token: str,
+    activity_id: str,
+    gate_id: str,
+) -> Optional[ActiveSession]:
+    """Unexpired session for ``session_token`` issued for this activity and gate."""
+    entry = session_registry.get(session_token) if settings.SESSION_REGISTRY_ENABLED else None
+    if entry is None:
+        result = await db.execute(
+            select(AttendanceSession).where(
+                (AttendanceSession.session_token == session_token)
+                & (AttendanceSession.expires_at >= datetime.now(timezone.utc))
+            )
+        )
+        row = result.scalar_one_or_none()
+        if row is None:
+            return None
+        entry = ActiveSession(row.activity_id, row.gate_id, row.expires_at.timestamp())
+        if settings.SESSION_REGISTRY_ENABLED:
+            session_registry.add(session_token, row.activity_id, row.gate_id, row.expires_at)
+
+    if entry.activity_id != activity_id or entry.gate_id != gate_id:
+        return None
+    return entry
+
+
+# AttendanceSession rows inserted through the ORM are registered once their
+# transaction commits, so a rolled-back QR generation never becomes scannable.
+# Revoked tokens are likewise dropped only after the delete has committed.
+_NEW_SESSIONS_KEY = "session_registry.new_sessions"
+_REVOKED_TOKENS_KEY = "session_registry.revoked_tokens"
+
+
+def discard_after_commit(db: AsyncSession, session_tokens: list[str]) -> None:
+    """Drop ``session_tokens`` from the registry once ``db`` commits."""
+    db.info.setdefault(_REVOKED_TOKENS_KEY, []).extend(session_tokens)
+
+
+@event.listens_for(AttendanceSession, "after_insert")
+def _mark_session_inserted(mapper, connection, target: AttendanceSession) -> None:
+    session = object_session(target)
+    if session is not None and settings.SESSION_REGISTRY_ENABLED:
+        session.info.setdefault(_NEW_SESSIONS_KEY, []).append(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _register_committed_sessions(session: Session) -> None:
+    for row in session.info.pop(_NEW_SESSIONS_KEY, ()):
+        session_registry.add(row.session_token, row.activity_id, row.gate_id, row.expires_at)
+    for token in session.info.pop(_REVOKED_TOKENS_KEY, ()):
+        session_registry.discard(token)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_uncommitted_sessions(session: Session, previous_transaction) -> None:
+    session.info.pop(_NEW_SESSIONS_KEY, None)
+    session.info.pop(_REVOKED_TOKENS_KEY, None)
@@ -59,6 +59,40 @@ denial_reasons["Only creator or ADMIN can generate QR codes"] if {
     input.subject.role != "ADMIN"
 }
 
+# MANAGE GATES
+allow if {
+    input.action == "attendance:manage_gates"
+    input.subject.id == input.resource.creator_id
+}
+
+allow if {
+    input.action == "attendance:manage_gates"
+    input.subject.role == "ADMIN"
+}
+
+denial_reasons["Only creator or ADMIN can manage gates"] if {
+    input.action == "attendance:manage_gates"
+    input.subject.id != input.resource.creator_id
+    input.subject.role != "ADMIN"
+}
+
+# SYNC OFFLINE GATE SCANS
+allow if {
+    input.action == "attendance:sync"
+    input.subject.id == input.resource.creator_id
+}
+
+allow if {
+    input.action == "attendance:sync"
+    input.subject.role == "ADMIN"
+}
+
+denial_reasons["Only creator or ADMIN can sync gate scans"] if {
+    input.action == "attendance:sync"
+    input.subject.id != input.resource.creator_id
+    input.subject.role != "ADMIN"
+}
+
 # VIEW ATTENDANCE
 allow if {
     input.action == "attendance:view"
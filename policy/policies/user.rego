@@ -47,3 +47,14 @@ denial_reasons["Only ADMIN can manage users"] if {
     input.action == "user:manage"
     input.subject.role != "ADMIN"
 }
+
+# RUNTIME METRICS
+allow if {
+    input.action == "system:metrics"
+    input.subject.role == "ADMIN"
+}
+
+denial_reasons["Only ADMIN can view runtime metrics"] if {
+    input.action == "system:metrics"
+    input.subject.role != "ADMIN"
+}
@@ -90,3 +90,69 @@ test_non_creator_cannot_generate_qr if {
         "context": {}
     }
 }
+
+# Creator can manage gates
+
+test_creator_can_manage_gates if {
+    attendance.allow with input as {
+        "action": "attendance:manage_gates",
+        "subject": {"id": "user-1", "role": "USER"},
+        "resource": {"creator_id": "user-1"},
+        "context": {}
+    }
+}
+
+# Admin can manage gates
+
+test_admin_can_manage_gates if {
+    attendance.allow with input as {
+        "action": "attendance:manage_gates",
+        "subject": {"id": "admin-1", "role": "ADMIN"},
+        "resource": {"creator_id": "user-1"},
+        "context": {}
+    }
+}
+
+# Non-creator non-admin cannot manage gates
+
+test_non_creator_cannot_manage_gates if {
+    not attendance.allow with input as {
+        "action": "attendance:manage_gates",
+        "subject": {"id": "user-2", "role": "USER"},
+        "resource": {"creator_id": "user-1"},
+        "context": {}
+    }
+}
+
+# Creator can sync gate scans
+
+test_creator_can_sync_gate_scans if {
+    attendance.allow with input as {
+        "action": "attendance:sync",
+        "subject": {"id": "user-1", "role": "USER"},
+        "resource": {"creator_id": "user-1"},
+        "context": {}
+    }
+}
+
+# Admin can sync gate scans
+
+test_admin_can_sync_gate_scans if {
+    attendance.allow with input as {
+        "action": "attendance:sync",
+        "subject": {"id": "admin-1", "role": "ADMIN"},
+        "resource": {"creator_id": "user-1"},
+        "context": {}
+    }
+}
+
+# Participant cannot sync gate scans
+
+test_participant_cannot_sync_gate_scans if {
+    not attendance.allow with input as {
+        "action": "attendance:sync",
+        "subject": {"id": "user-2", "role": "USER"},
+        "resource": {"creator_id": "user-1"},
+        "context": {}
+    }
+}
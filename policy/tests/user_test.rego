@@ -0,0 +1,26 @@
+package casecheck.authz.user_test
+
+import future.keywords.if
+import data.casecheck.authz.user
+
+# ADMIN can read runtime metrics
+
+test_admin_can_view_metrics if {
+    user.allow with input as {
+        "action": "system:metrics",
+        "subject": {"id": "admin-1", "role": "ADMIN"},
+        "resource": {},
+        "context": {}
+    }
+}
+
+# USER cannot read runtime metrics
+
+test_user_cannot_view_metrics if {
+    not user.allow with input as {
+        "action": "system:metrics",
+        "subject": {"id": "user-1", "role": "USER"},
+        "resource": {},
+        "context": {}
+    }
+}
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""Concurrency check for case number allocation in POST /v1/activities.
+
+Creates ACTIVITIES draft activities at once (at most CONCURRENCY in
+flight) and checks that every create succeeded on its first attempt and
+that every case number is distinct and well-formed. Reports throughput
+and latency percentiles.
+
+Usage:
+  BASE_URL=http://localhost:8000 \\
+  ADMIN_USERNAME=admin ADMIN_PASSWORD=... python scripts/bench_case_numbers.py
+"""
+
+import asyncio
+import os
+import re
+import sys
+import time
+import uuid
+
+import httpx
+
+
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:8000")
+ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME", "")
+ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "")
+ACTIVITIES = int(os.environ.get("ACTIVITIES", "2000"))
+CONCURRENCY = int(os.environ.get("CONCURRENCY", "100"))
+CASE_NUMBER = re.compile(r"^C-\d{4,}$")
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> dict:
+    response = await client.post("/v1/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['data']['access_token']}"}
+
+
+async def create_activity(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    headers: dict,
+    activity_type_id: str,
+    tag: str,
+    index: int,
+) -> tuple[float, int, str]:
+    async with semaphore:
+        started = time.perf_counter()
+        response = await client.post(
+            "/v1/activities",
+            headers=headers,
+            json={
+                "title": f"Case number bench {tag} {index}",
+                "description": "Throwaway activity created by bench_case_numbers.py",
+                "activity_type_id": activity_type_id,
+                "start_date": "2030-01-01T08:00:00Z",
+                "end_date": "2030-01-01T18:00:00Z",
+                "location": "Bench",
+                "max_participants": 10,
+            },
+        )
+        elapsed = time.perf_counter() - started
+    case_number = response.json()["data"]["case_number"] if response.status_code == 201 else ""
+    return elapsed, response.status_code, case_number
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+async def main() -> int:
+    if not ADMIN_USERNAME or not ADMIN_PASSWORD:
+        print("ERROR: ADMIN_USERNAME and ADMIN_PASSWORD are required.")
+        return 1
+
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(base_url=BASE_URL, limits=limits, timeout=60) as client:
+        admin = await login(client, ADMIN_USERNAME, ADMIN_PASSWORD)
+        response = await client.get("/v1/activities/types", headers=admin)
+        response.raise_for_status()
+        activity_type_id = response.json()["data"][0]["id"]
+
+        print(f"==> Creating {ACTIVITIES} activities with concurrency {CONCURRENCY}...")
+        tag = uuid.uuid4().hex[:6]
+        semaphore = asyncio.Semaphore(CONCURRENCY)
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(create_activity(client, semaphore, admin, activity_type_id, tag, index) for index in range(ACTIVITIES))
+        )
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _, _ in results)
+    failures = sum(1 for _, status_code, _ in results if status_code != 201)
+    case_numbers = [case_number for _, status_code, case_number in results if status_code == 201]
+    duplicates = len(case_numbers) - len(set(case_numbers))
+    malformed = sum(1 for case_number in case_numbers if not CASE_NUMBER.match(case_number))
+    print(f"requests:   {len(results)} ({failures} failed)")
+    print(f"duplicates: {duplicates}")
+    print(f"malformed:  {malformed}")
+    print(f"throughput: {len(results) / elapsed:.1f} req/s")
+    print(f"p50:        {percentile(latencies, 0.50) * 1000:.1f} ms")
+    print(f"p99:        {percentile(latencies, 0.99) * 1000:.1f} ms")
+    return 0 if failures == 0 and duplicates == 0 and malformed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
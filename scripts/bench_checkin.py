@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""Load generator for POST /v1/attendance/check-in.
+
+Creates USERS throwaway participants, registers them for ACTIVITY_ID, then
+fires all of their check-ins at once (at most CONCURRENCY in flight) and
+reports throughput and latency percentiles. Run it once against a server
+started with CHECKIN_BATCH_ENABLED=false and once with it set to true to
+compare per-request commits with batched commits.
+
+Usage:
+  BASE_URL=http://localhost:8000 ACTIVITY_ID=... \\
+  ADMIN_USERNAME=admin ADMIN_PASSWORD=... python scripts/bench_checkin.py
+
+The activity must be APPROVED or IN_PROGRESS, owned by the admin account
+(or the admin must be ADMIN) and have at least USERS free seats.
+"""
+
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+import httpx
+
+
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:8000")
+ACTIVITY_ID = os.environ.get("ACTIVITY_ID", "")
+ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME", "")
+ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "")
+GATE_ID = os.environ.get("GATE_ID", "main")
+USERS = int(os.environ.get("USERS", "500"))
+CONCURRENCY = int(os.environ.get("CONCURRENCY", "100"))
+PASSWORD = "Bench-Passw0rd"
+
+
+async def post_with_retry(client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+    # Idle keep-alive connections may be closed by the server just as they
+    # are reused (setup requests are slow because of password hashing).
+    for _ in range(2):
+        try:
+            return await client.post(url, **kwargs)
+        except httpx.TransportError:
+            pass
+    return await client.post(url, **kwargs)
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> dict:
+    response = await post_with_retry(client, "/v1/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['data']['access_token']}"}
+
+
+async def create_participant(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, tag: str, index: int) -> dict:
+    username = f"bench{tag}{index}"
+    async with semaphore:
+        response = await post_with_retry(
+            client,
+            "/v1/auth/register",
+            json={
+                "username": username,
+                "email": f"{username}@bench.example.com",
+                "full_name": "Bench User",
+                "password": PASSWORD,
+            },
+        )
+        response.raise_for_status()
+        headers = await login(client, username, PASSWORD)
+        response = await post_with_retry(
+            client, "/v1/attendance/register", headers=headers, json={"activity_id": ACTIVITY_ID}
+        )
+        response.raise_for_status()
+    return headers
+
+
+async def check_in(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, headers: dict, qr_code: str) -> tuple[float, int]:
+    async with semaphore:
+        started = time.perf_counter()
+        response = await post_with_retry(client, "/v1/attendance/check-in", headers=headers, json={"qr_code": qr_code})
+        return time.perf_counter() - started, response.status_code
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+async def main() -> int:
+    if not ACTIVITY_ID or not ADMIN_USERNAME or not ADMIN_PASSWORD:
+        print("ERROR: ACTIVITY_ID, ADMIN_USERNAME and ADMIN_PASSWORD are required.")
+        return 1
+
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(base_url=BASE_URL, limits=limits, timeout=60) as client:
+        admin = await login(client, ADMIN_USERNAME, ADMIN_PASSWORD)
+
+        print(f"==> Creating and registering {USERS} participants...")
+        tag = uuid.uuid4().hex[:6]
+        setup_semaphore = asyncio.Semaphore(min(CONCURRENCY, 20))
+        participants = await asyncio.gather(
+            *(create_participant(client, setup_semaphore, tag, index) for index in range(USERS))
+        )
+
+        await post_with_retry(client, f"/v1/activities/{ACTIVITY_ID}/start", headers=admin)
+        response = await post_with_retry(
+            client,
+            "/v1/attendance/qr-code",
+            headers=admin,
+            json={"activity_id": ACTIVITY_ID, "gate_id": GATE_ID},
+        )
+        response.raise_for_status()
+        qr_code = response.json()["data"]["code"]
+
+        print(f"==> Firing {USERS} check-ins with concurrency {CONCURRENCY}...")
+        semaphore = asyncio.Semaphore(CONCURRENCY)
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(check_in(client, semaphore, headers, qr_code) for headers in participants)
+        )
+        elapsed = time.perf_counter() - started
+
+        metrics = (await client.get("/metrics", headers=admin)).json()
+
+    latencies = sorted(latency for latency, _ in results)
+    failures = sum(1 for _, status_code in results if status_code != 200)
+    print(f"requests:   {len(results)} ({failures} failed)")
+    print(f"throughput: {len(results) / elapsed:.1f} req/s")
+    print(f"p50:        {percentile(latencies, 0.50) * 1000:.1f} ms")
+    print(f"p99:        {percentile(latencies, 0.99) * 1000:.1f} ms")
+    print(f"batcher:    {metrics.get('checkin_batcher')}")
+    return 0 if failures == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
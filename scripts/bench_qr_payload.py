@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""Micro-benchmark of QR payload formats.
+
+Measures encode and verify cost of the compact and JWT payloads produced
+by app.services.qrcode_service, and the QR symbol each one needs at error
+correction level M: compact payloads fit alphanumeric mode, JWTs need byte
+mode.
+
+Usage (from the repository root):
+  PYTHONPATH=backend python scripts/bench_qr_payload.py
+"""
+
+import os
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SECRET_KEY", "bench-secret-key")
+
+from app.core.config import settings  # noqa: E402
+from app.services import qrcode_service  # noqa: E402
+
+
+ITERATIONS = int(os.environ.get("ITERATIONS", "20000"))
+
+# Character capacity per QR version (1-40) at error correction level M.
+ALPHANUMERIC_CAPACITY_M = (
+    20, 38, 61, 90, 122, 154, 178, 221, 262, 311, 366, 419, 483, 528, 600, 656, 734, 816, 909, 970,
+    1035, 1134, 1248, 1326, 1451, 1542, 1637, 1732, 1839, 1994, 2113, 2238, 2369, 2506, 2632, 2780,
+    2894, 3054, 3220, 3391,
+)
+BYTE_CAPACITY_M = (
+    14, 26, 42, 62, 84, 106, 122, 152, 180, 213, 251, 287, 331, 362, 412, 450, 504, 560, 624, 666,
+    711, 779, 857, 911, 997, 1059, 1125, 1190, 1264, 1370, 1452, 1538, 1628, 1722, 1809, 1911,
+    1989, 2099, 2213, 2331,
+)
+ALPHANUMERIC_CHARSET = set("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:")
+
+
+def qr_symbol(code: str) -> tuple[str, int, int]:
+    """Encoding mode, version and modules per side needed for ``code``."""
+    if set(code) <= ALPHANUMERIC_CHARSET:
+        mode, capacity = "alphanumeric", ALPHANUMERIC_CAPACITY_M
+    else:
+        mode, capacity = "byte", BYTE_CAPACITY_M
+    for version, limit in enumerate(capacity, start=1):
+        if len(code) <= limit:
+            return mode, version, 17 + 4 * version
+    raise ValueError(f"{len(code)} characters do not fit in any QR version")
+
+
+def bench(payload_format: str) -> None:
+    settings.QR_PAYLOAD_FORMAT = payload_format
+    activity_id = str(uuid.uuid4())
+    session_token = qrcode_service.new_session_token()
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=60)
+
+    def encode() -> str:
+        return qrcode_service.generate_qr_code(activity_id, "main", session_token, "CHECK_IN", expires_at)
+
+    code = encode()
+    assert qrcode_service.decode_qr_code(code)["session_token"] == session_token
+
+    encode_us = timeit.timeit(encode, number=ITERATIONS) / ITERATIONS * 1e6
+    verify_us = timeit.timeit(lambda: qrcode_service.decode_qr_code(code), number=ITERATIONS) / ITERATIONS * 1e6
+    mode, version, modules = qr_symbol(code)
+    print(
+        f"{payload_format:8s} {len(code):5d} chars  encode {encode_us:6.2f} us  verify {verify_us:6.2f} us  "
+        f"QR {mode} v{version} ({modules}x{modules} modules)"
+    )
+
+
+def main() -> int:
+    print(f"{ITERATIONS} iterations per measurement")
+    for payload_format in ("compact", "jwt"):
+        bench(payload_format)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+"""Concurrency check for seat reservation in POST /v1/attendance/register.
+
+Creates an approved activity with SEATS seats and USERS throwaway
+participants, then fires all of their registrations at once (at most
+CONCURRENCY in flight), with every DUPLICATE_EVERY-th participant
+registering twice. Checks that
+
+- no more than SEATS registrations succeeded and the activity is full,
+- the activity's seat count, its attendance counter total and the number
+  of attendance records all equal the number of successful registrations,
+- every failed registration was rejected as full (400) or as a duplicate
+  (409).
+
+Reports throughput and latency percentiles.
+
+Usage:
+  BASE_URL=http://localhost:8000 \\
+  ADMIN_USERNAME=admin ADMIN_PASSWORD=... python scripts/bench_registration.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+import httpx
+
+
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:8000")
+ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME", "")
+ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "")
+SEATS = int(os.environ.get("SEATS", "100"))
+USERS = int(os.environ.get("USERS", "300"))
+DUPLICATE_EVERY = int(os.environ.get("DUPLICATE_EVERY", "10"))
+CONCURRENCY = int(os.environ.get("CONCURRENCY", "100"))
+# Participants are created with less concurrency: password hashing holds a
+# database connection per request, and the setup is not what is measured.
+SETUP_CONCURRENCY = int(os.environ.get("SETUP_CONCURRENCY", "10"))
+PASSWORD = "Bench-Passw0rd"
+
+
+async def post_with_retry(client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+    # Idle keep-alive connections may be closed by the server just as they
+    # are reused (setup requests are slow because of password hashing).
+    for _ in range(2):
+        try:
+            return await client.post(url, **kwargs)
+        except httpx.TransportError:
+            pass
+    return await client.post(url, **kwargs)
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> dict:
+    response = await post_with_retry(client, "/v1/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['data']['access_token']}"}
+
+
+async def create_user(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, tag: str, index: int) -> dict:
+    username = f"reg{tag}{index}"
+    async with semaphore:
+        response = await post_with_retry(
+            client,
+            "/v1/auth/register",
+            json={
+                "username": username,
+                "email": f"{username}@bench.example.com",
+                "full_name": "Bench User",
+                "password": PASSWORD,
+            },
+        )
+        response.raise_for_status()
+        return await login(client, username, PASSWORD)
+
+
+async def create_activity(client: httpx.AsyncClient, admin: dict, creator: dict) -> str:
+    response = await client.get("/v1/activities/types", headers=creator)
+    response.raise_for_status()
+    activity_type_id = response.json()["data"][0]["id"]
+    response = await client.post(
+        "/v1/activities",
+        headers=creator,
+        json={
+            "title": "Registration bench",
+            "description": "Throwaway activity created by bench_registration.py",
+            "activity_type_id": activity_type_id,
+            "start_date": "2030-01-01T08:00:00Z",
+            "end_date": "2030-01-01T18:00:00Z",
+            "location": "Bench",
+            "max_participants": SEATS,
+        },
+    )
+    response.raise_for_status()
+    activity_id = response.json()["data"]["id"]
+    (await client.post(f"/v1/activities/{activity_id}/submit", headers=creator)).raise_for_status()
+    (await client.post(f"/v1/activities/{activity_id}/approve", headers=admin, json={"comment": "bench"})).raise_for_status()
+    return activity_id
+
+
+async def register(
+    client: httpx.AsyncClient, semaphore: asyncio.Semaphore, headers: dict, activity_id: str
+) -> tuple[float, int, str]:
+    async with semaphore:
+        started = time.perf_counter()
+        response = await post_with_retry(
+            client, "/v1/attendance/register", headers=headers, json={"activity_id": activity_id}
+        )
+        elapsed = time.perf_counter() - started
+    detail = "" if response.status_code == 201 else response.json().get("detail", "")
+    return elapsed, response.status_code, detail
+
+
+async def count_records(client: httpx.AsyncClient, headers: dict, activity_id: str) -> int:
+    rows = 0
+    async with client.stream("GET", f"/v1/attendance/activity/{activity_id}/export", headers=headers) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            rows += bool(line.strip())
+    return rows
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+async def main() -> int:
+    if not ADMIN_USERNAME or not ADMIN_PASSWORD:
+        print("ERROR: ADMIN_USERNAME and ADMIN_PASSWORD are required.")
+        return 1
+
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(base_url=BASE_URL, limits=limits, timeout=120) as client:
+        admin = await login(client, ADMIN_USERNAME, ADMIN_PASSWORD)
+        tag = uuid.uuid4().hex[:6]
+
+        print(f"==> Creating {USERS} participants and a {SEATS}-seat activity...")
+        semaphore = asyncio.Semaphore(SETUP_CONCURRENCY)
+        participants = await asyncio.gather(*(create_user(client, semaphore, tag, index) for index in range(USERS)))
+        creator = await create_user(client, semaphore, tag, USERS)
+        activity_id = await create_activity(client, admin, creator)
+
+        semaphore = asyncio.Semaphore(CONCURRENCY)
+        attempts = participants + participants[::DUPLICATE_EVERY] if DUPLICATE_EVERY > 0 else participants
+        print(f"==> Firing {len(attempts)} registrations with concurrency {CONCURRENCY}...")
+        started = time.perf_counter()
+        results = await asyncio.gather(*(register(client, semaphore, headers, activity_id) for headers in attempts))
+        elapsed = time.perf_counter() - started
+
+        response = await client.get(f"/v1/activities/{activity_id}", headers=creator)
+        response.raise_for_status()
+        seats = response.json()["data"]["current_participants"]
+        response = await client.get(f"/v1/attendance/activity/{activity_id}/stats", headers=creator)
+        response.raise_for_status()
+        counted = response.json()["data"]["total_registered"]
+        rows = await count_records(client, creator, activity_id)
+
+    latencies = sorted(latency for latency, _, _ in results)
+    registered = sum(1 for _, status_code, _ in results if status_code == 201)
+    full = sum(1 for _, status_code, detail in results if status_code == 400 and detail == "Activity is full")
+    duplicates = sum(1 for _, status_code, _ in results if status_code == 409)
+    unexpected = len(results) - registered - full - duplicates
+    print(f"requests:   {len(results)} ({registered} registered, {full} full, {duplicates} duplicate, {unexpected} unexpected)")
+    print(f"seats:      {seats} of {SEATS}")
+    print(f"counter:    {counted}")
+    print(f"records:    {rows}")
+    print(f"throughput: {len(results) / elapsed:.1f} req/s")
+    print(f"p50:        {percentile(latencies, 0.50) * 1000:.1f} ms")
+    print(f"p99:        {percentile(latencies, 0.99) * 1000:.1f} ms")
+
+    failures = []
+    if seats > SEATS or registered > SEATS:
+        failures.append("more seats taken than the activity has")
+    if not seats == counted == rows == registered:
+        failures.append("seat count, counter total, records and successful registrations differ")
+    if unexpected:
+        failures.append("registrations failed with an unexpected status")
+    if USERS >= SEATS and seats != SEATS:
+        failures.append("activity was not filled although enough participants registered")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
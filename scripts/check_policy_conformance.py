@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+"""Conformance check between the Rego policies and the local policy port.
+
+Replays every case in policy/tests/*.rego through each policy backend the
+application can use (POLICY_ENGINE=opa and POLICY_ENGINE=local), on the
+same query the PEP makes (``data.casecheck.authz.response``), and fails if
+
+- a backend's allow differs from what the Rego test expects, or
+- the backends return different responses (allow or reasons) for the
+  test input or for a variant of it with another subject role.
+
+The OPA backend needs an OPA server with policy/policies loaded, e.g.
+``opa run --server policy/policies``. Set BACKENDS=local to check the
+local backend against the test expectations alone.
+
+Usage:
+  OPA_URL=http://localhost:8181 python scripts/check_policy_conformance.py
+"""
+
+import asyncio
+import json
+import os
+from pathlib import Path
+import re
+import sys
+
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "backend"))
+
+from app.services.opa_client import POLICY_BACKENDS, PolicyEvaluationError  # noqa: E402
+
+
+BACKENDS = [name.strip() for name in os.environ.get("BACKENDS", "opa,local").split(",") if name.strip()]
+TEST_DIR = ROOT / "policy" / "tests"
+# Roles substituted into every case for the backend-to-backend comparison;
+# None removes the role from the input.
+ROLE_VARIANTS = ("ADMIN", "USER", "GUEST", None)
+
+_TEST_HEADER = re.compile(r"^test_(\w+) if \{\s*(not\s+)?(\w+)\.allow with input as ", re.MULTILINE)
+
+
+def _object_end(text: str, start: int) -> int:
+    """Index just past the ``{...}`` literal starting at ``start``."""
+    depth = 0
+    in_string = False
+    index = start
+    while index < len(text):
+        char = text[index]
+        if in_string:
+            if char == "\\":
+                index += 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return index + 1
+        index += 1
+    raise ValueError("Unterminated input object")
+
+
+def load_cases() -> list[tuple[str, bool, dict]]:
+    """(name, expected allow, input) for every test in policy/tests."""
+    cases = []
+    for path in sorted(TEST_DIR.glob("*.rego")):
+        text = path.read_text()
+        headers = list(_TEST_HEADER.finditer(text))
+        if len(headers) != text.count("\ntest_") + text.startswith("test_"):
+            raise ValueError(f"{path.name}: a test does not have the form '[not] <pkg>.allow with input as {{...}}'")
+        for header in headers:
+            start = header.end()
+            document = json.loads(text[start:_object_end(text, start)])
+            cases.append((f"{path.stem}::test_{header.group(1)}", header.group(2) is None, document))
+    return cases
+
+
+def role_variants(document: dict) -> list[dict]:
+    variants = []
+    for role in ROLE_VARIANTS:
+        subject = dict(document.get("subject", {}))
+        if subject.get("role") == role:
+            continue
+        if role is None:
+            subject.pop("role", None)
+        else:
+            subject["role"] = role
+        variants.append({**document, "subject": subject})
+    return variants
+
+
+async def main() -> int:
+    unknown = [name for name in BACKENDS if name not in POLICY_BACKENDS]
+    if not BACKENDS or unknown:
+        print(f"ERROR: BACKENDS must name some of: {', '.join(POLICY_BACKENDS)}")
+        return 1
+
+    backends = {name: POLICY_BACKENDS[name]() for name in BACKENDS}
+    cases = load_cases()
+    failures = []
+    checked = 0
+    try:
+        for backend in backends.values():
+            await backend.start()
+
+        async def responses(document: dict) -> dict[str, dict]:
+            return {name: await backend.query(document) for name, backend in backends.items()}
+
+        for name, expected, document in cases:
+            results = await responses(document)
+            checked += 1
+            for backend_name, result in results.items():
+                if result.get("allow") is not expected:
+                    failures.append(f"{name}: {backend_name} allow={result.get('allow')}, test expects {expected}")
+            if len({json.dumps(result, sort_keys=True) for result in results.values()}) > 1:
+                failures.append(f"{name}: backends disagree: {results}")
+
+            if len(backends) > 1:
+                for variant in role_variants(document):
+                    results = await responses(variant)
+                    checked += 1
+                    if len({json.dumps(result, sort_keys=True) for result in results.values()}) > 1:
+                        role = variant["subject"].get("role", "<none>")
+                        failures.append(f"{name} (role {role}): backends disagree: {results}")
+    except PolicyEvaluationError as exc:
+        print(f"ERROR: policy backend unavailable: {exc}")
+        return 1
+    finally:
+        for backend in backends.values():
+            await backend.close()
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"backends:   {', '.join(backends)}")
+    print(f"test cases: {len(cases)}")
+    print(f"checked:    {checked} inputs ({len(failures)} failed)")
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
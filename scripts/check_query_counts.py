@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""Query-count check for the activity mutation endpoints.
+
+Walks throwaway activities through create, update, submit, approve,
+reject, start and delete, and checks that no request executes more SQL
+statements than its budget. Each request's count is the difference in
+``db_sessions.statements`` reported by /metrics before and after it, so
+the server must run a single worker and nothing else may use it while
+the check runs. Budgets include the authorization lookups; the activity
+mutation itself is one load plus one write. Status transitions also
+insert their audit row and, except for start, their approval workflow
+row.
+
+Usage:
+  BASE_URL=http://localhost:8000 \\
+  ADMIN_USERNAME=admin ADMIN_PASSWORD=... python scripts/check_query_counts.py
+"""
+
+import asyncio
+import os
+import sys
+import uuid
+
+import httpx
+
+
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:8000")
+ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME", "")
+ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "")
+PASSWORD = "Bench-Passw0rd"
+
+# Maximum statements per request, authorization included.
+BUDGETS = {
+    "create": 3,
+    "update": 3,
+    "submit": 5,
+    "approve": 5,
+    "reject": 5,
+    "start": 4,
+    "delete": 5,
+}
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> dict:
+    response = await client.post("/v1/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['data']['access_token']}"}
+
+
+async def statements(client: httpx.AsyncClient, admin: dict) -> int:
+    response = await client.get("/metrics", headers=admin)
+    response.raise_for_status()
+    return response.json()["db_sessions"]["statements"]
+
+
+async def measure(
+    client: httpx.AsyncClient, admin: dict, method: str, url: str, **kwargs
+) -> tuple[int, dict]:
+    before = await statements(client, admin)
+    response = await client.request(method, url, **kwargs)
+    after = await statements(client, admin)
+    if response.status_code >= 400:
+        raise RuntimeError(f"{method} {url} failed with {response.status_code}: {response.text}")
+    return after - before, response.json()
+
+
+async def main() -> int:
+    if not ADMIN_USERNAME or not ADMIN_PASSWORD:
+        print("ERROR: ADMIN_USERNAME and ADMIN_PASSWORD are required.")
+        return 1
+
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=60) as client:
+        admin = await login(client, ADMIN_USERNAME, ADMIN_PASSWORD)
+        username = f"qc{uuid.uuid4().hex[:8]}"
+        response = await client.post(
+            "/v1/auth/register",
+            json={
+                "username": username,
+                "email": f"{username}@bench.example.com",
+                "full_name": "Query Count User",
+                "password": PASSWORD,
+            },
+        )
+        response.raise_for_status()
+        creator = await login(client, username, PASSWORD)
+        response = await client.get("/v1/activities/types", headers=creator)
+        response.raise_for_status()
+        activity_type_id = response.json()["data"][0]["id"]
+        # Warm the principal caches so every measured request sees the same state.
+        for headers in (admin, creator):
+            (await client.get("/v1/users/me", headers=headers)).raise_for_status()
+
+        payload = {
+            "title": "Query count check",
+            "description": "Throwaway activity created by check_query_counts.py",
+            "activity_type_id": activity_type_id,
+            "start_date": "2030-01-01T08:00:00Z",
+            "end_date": "2030-01-01T18:00:00Z",
+            "location": "Bench",
+            "max_participants": 10,
+        }
+        counts: list[tuple[str, int]] = []
+
+        async def create() -> str:
+            count, body = await measure(client, admin, "POST", "/v1/activities", headers=creator, json=payload)
+            counts.append(("create", count))
+            return body["data"]["id"]
+
+        async def step(name: str, method: str, url: str, headers: dict, **kwargs) -> None:
+            count, _ = await measure(client, admin, method, url, headers=headers, **kwargs)
+            counts.append((name, count))
+
+        approved = await create()
+        await step("update", "PUT", f"/v1/activities/{approved}", creator, json={"location": "Bench 2"})
+        await step("submit", "POST", f"/v1/activities/{approved}/submit", creator)
+        await step("approve", "POST", f"/v1/activities/{approved}/approve", admin, json={"comment": "ok"})
+        await step("start", "POST", f"/v1/activities/{approved}/start", creator)
+
+        rejected = await create()
+        await step("submit", "POST", f"/v1/activities/{rejected}/submit", creator)
+        await step("reject", "POST", f"/v1/activities/{rejected}/reject", admin, json={"reason": "Not this time"})
+
+        deleted = await create()
+        await step("delete", "DELETE", f"/v1/activities/{deleted}", creator)
+
+    over = 0
+    for name, count in counts:
+        ok = count <= BUDGETS[name]
+        over += not ok
+        print(f"{name:<8} {count:>3} statements (budget {BUDGETS[name]}){'' if ok else '  OVER BUDGET'}")
+    return 0 if over == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))